@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path as _Path
+
+REPO_ROOT = _Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.app.core.logging import setup_logging, logger
+from src.app.core.registry import get_store
+
+# chunks indexados antes de doc_year/doc_quarter/doc_epoch ficam de fora dos
+# filtros de data até receberem esses campos; idempotente, basta rodar uma vez
+
+def main():
+    setup_logging()
+    updated = get_store().backfill_date_fields()
+    logger.info("backfill_dates.done", updated=updated)
+
+if __name__ == "__main__":
+    main()
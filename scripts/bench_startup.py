@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path as _Path
+
+REPO_ROOT = _Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.app.core.logging import setup_logging, logger
+
+# módulos que não devem ser carregados só por importar a API
+HEAVY_MODULES = (
+    "chromadb",
+    "docling",
+    "sentence_transformers",
+    "torch",
+    "onnxruntime",
+    "langchain_openai",
+    "tiktoken",
+)
+
+IMPORT_SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+import src.app.api.main
+elapsed = time.perf_counter() - started
+print(json.dumps({"import_s": elapsed, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Mede o tempo de import da API e o cold start (processo novo até /ready)"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="repetições de cada medida (processos novos)")
+    parser.add_argument("--skip-server", action="store_true", help="mede só o tempo de import")
+    parser.add_argument("--warmup", action="store_true",
+                        help="após o /ready, chama POST /warmup e mede o warm-up dos componentes")
+    parser.add_argument("--max-ready-s", type=float, default=1.0,
+                        help="falha (exit 1) se a mediana do cold start passar deste limite")
+    return parser.parse_args()
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def measure_import() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=REPO_ROOT, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _request(url: str, method: str = "GET", timeout: float = 1.0):
+    req = urllib.request.Request(url, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None, None
+
+
+def measure_cold_start(warmup: bool, timeout_s: float = 60.0) -> dict:
+    """
+    Sobe um uvicorn novo e mede o tempo até o /ready responder 200.
+    """
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app.api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        result = {}
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn terminou com código {proc.returncode}")
+            if time.perf_counter() - started > timeout_s:
+                raise TimeoutError(f"/ready não respondeu 200 em {timeout_s}s")
+            status, _ = _request(f"{base}/ready", timeout=0.5)
+            if status == 200:
+                result["ready_s"] = time.perf_counter() - started
+                break
+            time.sleep(0.02)
+
+        if warmup:
+            warm_started = time.perf_counter()
+            status, body = _request(f"{base}/warmup", method="POST", timeout=timeout_s)
+            result["warmup_s"] = time.perf_counter() - warm_started
+            result["warm"] = bool(body and body.get("warm"))
+        return result
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def _summary(values) -> dict:
+    return {
+        "median_s": round(statistics.median(values), 3),
+        "min_s": round(min(values), 3),
+        "max_s": round(max(values), 3),
+    }
+
+
+def main():
+    args = parse_args()
+    setup_logging()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    heavy = sorted({m for run in imports for m in run["heavy"]})
+    logger.info("bench_startup.import", runs=args.runs, heavy_modules=heavy,
+                **_summary([run["import_s"] for run in imports]))
+
+    if args.skip_server:
+        return
+
+    starts = [measure_cold_start(args.warmup) for _ in range(args.runs)]
+    ready = _summary([run["ready_s"] for run in starts])
+    logger.info("bench_startup.cold_start", runs=args.runs, **ready)
+    if args.warmup:
+        logger.info("bench_startup.warmup", warm=all(run["warm"] for run in starts),
+                    **_summary([run["warmup_s"] for run in starts]))
+
+    if ready["median_s"] > args.max_ready_s:
+        logger.error("bench_startup.too_slow", median_s=ready["median_s"], max_ready_s=args.max_ready_s)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import argparse
+import inspect
+import sys
+import time
+from pathlib import Path as _Path
+
+REPO_ROOT = _Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import numpy as np
+
+from src.app.core.logging import setup_logging, logger
+from src.app.config.settings import settings
+from src.app.storage.embeddings import (
+    ONNX_MODEL_FILE,
+    ONNX_QUANTIZED_FILE,
+    TOKENIZER_FILE,
+    OnnxEmbeddings,
+)
+
+# cosseno mínimo por texto no check de paridade (também usado por tests/test_onnx_parity.py)
+MIN_PARITY_COSINE = 0.98
+
+# amostra p/ o check de paridade (curtos, longos, tabelas, números)
+PARITY_TEXTS = [
+    "Qual foi o faturamento da Apple em 2024?",
+    "Receita líquida do terceiro trimestre de 2024",
+    "Net sales increased 6% year over year, driven by Services and iPhone.",
+    "| Segmento | Q3 2024 | Q3 2023 |\n| Services | 24.2 | 21.2 |\n| iPhone | 39.3 | 39.7 |",
+    "Riscos de câmbio e taxa de juros podem afetar a margem operacional consolidada.",
+    "EBITDA ajustado de R$ 1,2 bilhão, margem de 32,5%.",
+    "Management's discussion and analysis of financial condition and results of operations. " * 20,
+    "Microsoft Cloud revenue was $36.8 billion, up 21%.",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Exporta o modelo de embeddings local (SentenceTransformer) para ONNX (+ int8)"
+    )
+    parser.add_argument("--model", default=settings.local_embedding_model,
+                        help="modelo SentenceTransformer de origem")
+    parser.add_argument("--out", type=_Path, default=settings.onnx_model_dir,
+                        help="diretório de saída (model.onnx, model_quantized.onnx, tokenizer.json)")
+    parser.add_argument("--opset", type=int, default=17, help="opset ONNX")
+    parser.add_argument("--no-quantize", action="store_true",
+                        help="não gera o modelo int8 (quantização dinâmica)")
+    parser.add_argument("--check", action="store_true",
+                        help="após exportar, compara vetores e throughput com o PyTorch")
+    parser.add_argument("--check-only", action="store_true",
+                        help="só roda o check sobre um export existente")
+    parser.add_argument("--min-cosine", type=float, default=MIN_PARITY_COSINE,
+                        help="cosseno mínimo aceito no check de paridade")
+    return parser.parse_args()
+
+
+def export(model_name: str, out: _Path, opset: int, quantize: bool) -> None:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    out.mkdir(parents=True, exist_ok=True)
+    st = SentenceTransformer(model_name, device="cpu")
+    tokenizer = st.tokenizer
+    transformer = st[0].auto_model.eval()
+
+    # tokenizer rápido (Rust) usado pelo OnnxEmbeddings
+    tokenizer.backend_tokenizer.save(str(out / TOKENIZER_FILE))
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids,
+            ).last_hidden_state
+
+    dummy = tokenizer(["exemplo de texto"], return_tensors="pt", padding=True)
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    args = tuple(dummy[name] for name in input_names)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    # exportador TorchScript (dynamic_axes); versões novas do torch usam dynamo por padrão
+    kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    started = time.perf_counter()
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(transformer),
+            args,
+            str(out / ONNX_MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            **kwargs,
+        )
+    logger.info("export_onnx.exported", model=model_name, path=str(out / ONNX_MODEL_FILE),
+                elapsed_s=round(time.perf_counter() - started, 2))
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            str(out / ONNX_MODEL_FILE),
+            str(out / ONNX_QUANTIZED_FILE),
+            weight_type=QuantType.QInt8,
+        )
+        logger.info(
+            "export_onnx.quantized",
+            path=str(out / ONNX_QUANTIZED_FILE),
+            size_mb=round((out / ONNX_QUANTIZED_FILE).stat().st_size / 2**20, 1),
+            fp32_size_mb=round((out / ONNX_MODEL_FILE).stat().st_size / 2**20, 1),
+        )
+
+
+def _throughput(embed, texts, repeats: int = 5) -> float:
+    embed(texts)  # aquecimento
+    started = time.perf_counter()
+    for _ in range(repeats):
+        embed(texts)
+    return len(texts) * repeats / (time.perf_counter() - started)
+
+
+def check(model_name: str, out: _Path, min_cosine: float) -> bool:
+    """
+    Paridade com os vetores do PyTorch (mesmo modelo): cosseno por texto,
+    mais throughput de encode de cada backend.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(model_name, device="cpu")
+    reference = st.encode(PARITY_TEXTS, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+    texts = PARITY_TEXTS * 8
+    torch_rate = _throughput(
+        lambda t: st.encode(t, batch_size=settings.local_embedding_batch_size, normalize_embeddings=True), texts
+    )
+
+    ok = True
+    variants = [("fp32", False)]
+    if (out / ONNX_QUANTIZED_FILE).exists():
+        variants.append(("int8", True))
+    for label, quantized in variants:
+        provider = OnnxEmbeddings(
+            out,
+            model_name,
+            quantized=quantized,
+            intra_op_threads=settings.onnx_intra_op_threads,
+            batch_size=settings.local_embedding_batch_size,
+            workers=settings.onnx_workers,
+            max_length=st.max_seq_length,
+        )
+        vectors = provider.embed_array(PARITY_TEXTS)
+        cosines = (vectors * reference).sum(axis=1)
+        passed = bool(cosines.min() >= min_cosine)
+        ok = ok and passed
+        logger.info(
+            "export_onnx.parity",
+            variant=label,
+            passed=passed,
+            min_cosine=round(float(cosines.min()), 5),
+            mean_cosine=round(float(cosines.mean()), 5),
+            texts_per_s=round(_throughput(provider.embed_array, texts), 1),
+            torch_texts_per_s=round(torch_rate, 1),
+        )
+    return ok
+
+
+def main():
+    args = parse_args()
+    setup_logging()
+
+    if not args.check_only:
+        export(args.model, args.out, args.opset, quantize=not args.no_quantize)
+
+    if (args.check or args.check_only) and not check(args.model, args.out, args.min_cosine):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
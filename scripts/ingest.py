@@ -1,18 +1,36 @@
+import argparse
 from pathlib import Path
 import sys
 from pathlib import Path as _Path
 
 REPO_ROOT = _Path(__file__).resolve().parents[1]
-SRC_PATH = REPO_ROOT / "src"
-sys.path.insert(0, str(SRC_PATH))
+sys.path.insert(0, str(REPO_ROOT))
 
-from app.core.logging import setup_logging, logger
-from app.config.settings import settings
-from app.ingestion.pipeline import IngestionPipeline
+from src.app.core.logging import setup_logging, logger
+from src.app.config.settings import settings
+from src.app.core.registry import get_ingestion_pipeline
+from src.app.ingestion.bulk import BulkIngestor
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingestão em lote dos PDFs de data/raw")
+    parser.add_argument("--convert-workers", type=int, default=settings.ingest_convert_workers,
+                        help="processos para conversão PDF → Markdown (Docling)")
+    parser.add_argument("--chunk-workers", type=int, default=settings.ingest_chunk_workers,
+                        help="threads para chunking + metadata")
+    parser.add_argument("--embed-workers", type=int, default=settings.ingest_embed_workers,
+                        help="threads para chamadas de embedding")
+    parser.add_argument("--embed-batch-size", type=int, default=settings.embed_batch_size,
+                        help="textos por chamada de embedding")
+    parser.add_argument("--queue-size", type=int, default=settings.ingest_queue_size,
+                        help="tamanho máximo de cada fila entre estágios")
+    parser.add_argument("--force", action="store_true",
+                        help="reingere mesmo PDFs sem alteração no manifest")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     setup_logging()
-    pipeline = IngestionPipeline()
+    pipeline = get_ingestion_pipeline()
 
     settings.raw_dir.mkdir(parents=True, exist_ok=True)
 
@@ -21,8 +39,20 @@ def main():
         logger.info("ingest.no_pdfs", raw_dir=str(settings.raw_dir))
         return
 
-    for pdf in pdfs:
-        pipeline.ingest_pdf(pdf)
+    ingestor = BulkIngestor(
+        pipeline,
+        convert_workers=args.convert_workers,
+        chunk_workers=args.chunk_workers,
+        embed_workers=args.embed_workers,
+        embed_batch_size=args.embed_batch_size,
+        queue_size=args.queue_size,
+    )
+    report = ingestor.run(pdfs, force=args.force)
+
+    logger.info("ingest.sweep_done", total=report.total, skipped=report.skipped,
+                ingested=report.ingested, failed=report.failed, elapsed_s=report.elapsed_s)
+    if report.failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,224 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from src.app.core.logging import get_logger
+from src.app.core.metrics import CACHE_REQUESTS
+from src.app.core.types import DocumentMeta
+from src.app.core.utils import matches_where, sanitize_filters, sha1_text
+
+logger = get_logger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalização para o match exato: minúsculas, sem acentos,
+    espaços colapsados e sem pontuação final.
+    """
+    text = unicodedata.normalize("NFKD", question)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    return text.rstrip("?!. ")
+
+
+class CacheEntry(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    key: str
+    question: str
+    vector: Optional[np.ndarray] = None
+    signature: Optional[Tuple] = None
+    result: Dict[str, Any]
+    filters: Dict[str, Any]
+    created_at: float
+
+
+class CacheLookup(BaseModel):
+    """
+    Resultado de uma consulta ao cache. Em caso de miss, guarda a chave e o
+    vetor já calculados para o `store` posterior.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    key: str
+    question: str
+    vector: Optional[np.ndarray] = None
+    signature: Optional[Tuple] = None
+    result: Optional[Dict[str, Any]] = None
+    match: Optional[str] = None        # "exact" | "semantic"
+    similarity: Optional[float] = None
+
+
+class AnswerCache:
+    """
+    Cache de respostas do /ask, em memória:
+      1. match exato da pergunta normalizada
+      2. match semântico (cosseno dos embeddings) acima de `threshold`, só entre
+         perguntas com a mesma assinatura (`signature_fn`: empresas, períodos,
+         números citados); sem assinatura, o match semântico fica desligado
+    Entradas expiram por TTL, são removidas por LRU e invalidadas quando
+    a ingestão deste processo grava documentos compatíveis com os filtros da
+    resposta. Escritas de outros processos (`foreign_writes_fn`) não dizem quais
+    documentos mudaram: o cache inteiro é descartado.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        max_entries: int = 1000,
+        ttl_s: float = 3600.0,
+        threshold: float = 0.95,
+        signature_fn: Optional[Callable[[str], Tuple]] = None,
+        foreign_writes_fn: Optional[Callable[[], int]] = None,
+    ):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self.signature_fn = signature_fn
+        self.foreign_writes_fn = foreign_writes_fn
+        self._foreign_writes: Optional[int] = None
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return now - entry.created_at > self.ttl_s
+
+    def _purge_expired(self, now: float) -> None:
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            del self._entries[key]
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        try:
+            vec = self.embeddings.embed_array([question])[0]
+        except Exception as e:
+            logger.error("answer_cache.embed_failed", error=str(e))
+            return None
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _signature(self, question: str) -> Optional[Tuple]:
+        if self.signature_fn is None:
+            return None
+        try:
+            return self.signature_fn(question)
+        except Exception as e:
+            logger.error("answer_cache.signature_failed", error=str(e))
+            return None
+
+    def _sync_foreign_writes(self) -> None:
+        if self.foreign_writes_fn is None:
+            return
+        try:
+            writes = self.foreign_writes_fn()
+        except Exception as e:
+            logger.error("answer_cache.foreign_writes_failed", error=str(e))
+            return
+        with self._lock:
+            if writes == self._foreign_writes:
+                return
+            if self._foreign_writes is not None and self._entries:
+                logger.info("answer_cache.cleared", reason="foreign_write", n=len(self._entries))
+                self._entries.clear()
+            self._foreign_writes = writes
+
+    def lookup(self, question: str) -> CacheLookup:
+        normalized = normalize_question(question)
+        key = sha1_text(normalized)
+        now = time.time()
+        self._sync_foreign_writes()
+
+        # 1) match exato
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                logger.info("answer_cache.hit", match="exact")
+                CACHE_REQUESTS.inc(cache="answer", result="hit")
+                return CacheLookup(key=key, question=normalized, result=entry.result, match="exact", similarity=1.0)
+            entries = list(self._entries.values())
+
+        # 2) match semântico (embedding fora do lock), mesmas entidades e períodos
+        signature = self._signature(question)
+        candidates = [
+            e for e in entries
+            if e.vector is not None and signature is not None and e.signature == signature
+        ]
+        vector = self._embed(normalized)
+        if vector is not None and candidates:
+            matrix = np.stack([e.vector for e in candidates])
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if float(scores[best]) >= self.threshold:
+                entry = candidates[best]
+                with self._lock:
+                    if entry.key in self._entries:
+                        self._entries.move_to_end(entry.key)
+                logger.info("answer_cache.hit", match="semantic", similarity=round(float(scores[best]), 4))
+                CACHE_REQUESTS.inc(cache="answer", result="hit")
+                return CacheLookup(
+                    key=key,
+                    question=normalized,
+                    vector=vector,
+                    signature=signature,
+                    result=entry.result,
+                    match="semantic",
+                    similarity=float(scores[best]),
+                )
+
+        logger.info("answer_cache.miss")
+        CACHE_REQUESTS.inc(cache="answer", result="miss")
+        return CacheLookup(key=key, question=normalized, vector=vector, signature=signature)
+
+    def store(self, lookup: CacheLookup, result: Dict[str, Any]) -> None:
+        entry = CacheEntry(
+            key=lookup.key,
+            question=lookup.question,
+            vector=lookup.vector,
+            signature=lookup.signature,
+            result=result,
+            filters=result.get("metadata") or {},
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _affected(filters: Dict[str, Any], meta: DocumentMeta) -> bool:
+        # a resposta depende do documento se o `where` dela (o mesmo do retrieval:
+        # listas de empresas, períodos normalizados, intervalos) aceita o documento
+        doc = {
+            "company": meta.company,
+            "doc_type": meta.doc_type,
+            "doc_year": meta.doc_year,
+            "doc_quarter": meta.doc_quarter,
+            "doc_epoch": meta.doc_epoch,
+        }
+        return matches_where(sanitize_filters(filters), doc)
+
+    def invalidate(self, meta: DocumentMeta) -> int:
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if self._affected(e.filters, meta)]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.info("answer_cache.invalidated", doc_id=meta.doc_id, n_entries=len(stale))
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
@@ -1,67 +1,53 @@
-import yaml
-import json
-from langchain_openai import ChatOpenAI
-
-from src.app.core.token_logger import TokenEstimator
-from src.app.storage.chroma_store import ChromaHnswStore
-from src.app.storage.embeddings import build_embeddings
-from src.app.retrieval.chroma_retriever import ChromaRetriever
-
-from src.app.core.utils import get_unique_companies, get_metadata_fields
-
-with open("src/app/prompts/prompts.yml") as f:
-    PROMPTS = yaml.safe_load(f)
-
-planner_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
-store = ChromaHnswStore()
-embedder = build_embeddings()
-retriever = ChromaRetriever(store=store, embeddings=embedder)
-
-
-def extractor_agent(question: str, metadata_filters: dict):
-
-    estimator = TokenEstimator("extractor_planner")
-
-    # 1. coletar contexto do dataset
-    metadata_fields = get_metadata_fields(store)
-    company_values = get_unique_companies(store)
-
-    # 2. montar mensagens completas
-    messages = [
-        {
-            "role": "system",
-            "content": PROMPTS["extractor_agent"]["system"]
-        },
-        {
-            "role": "user",
-            "content": PROMPTS["extractor_agent"]["user_template"].format(
-                question=question,
-                metadata=metadata_filters,
-                metadata_fields=metadata_fields,
-                company_values=company_values
-            )
-        }
+from src.app.config.settings import settings
+from src.app.core.registry import get_context_packer, get_retriever
+from src.app.retrieval.retriever import rrf_fuse
+
+# retriever e packer vêm do registry na primeira chamada (mesmas instâncias usadas
+# pela ingestão; retriever vetorial ou híbrido, conforme settings.retriever)
+
+
+def select_for_plan(plan) -> list:
+    """
+    Executa as queries de um RetrievalPlan (planner), funde os rankings
+    por RRF e seleciona os chunks do contexto com o ContextPacker
+    (MMR + orçamento de tokens), no máximo plan.top_k.
+    """
+    filters = plan.metadata_filters.model_dump()
+    retriever = get_retriever()
+    rankings = [
+        retriever.retrieve(query=query, metadata_filters=filters, top_k=plan.top_k)
+        for query in plan.queries
     ]
-
-    # log estimado
-    estimator.log_estimated(messages)
-
-    # 3. planner LLM → gera plano JSON
-    llm_response = planner_llm.invoke(messages)
-    plan = json.loads(llm_response.content)
-
-    query_text = plan["query_embedding_text"]
-    filters = plan["filters"]
-
-    # 4. executa retrieval real
-    retrieved = retriever.retrieve(
-        query=query_text,
-        metadata_filters=filters,
-        top_k=10
-    )
-
-    # 5. concatena contexto
-    context = "\n\n".join([item["text"] for item in retrieved])
-
-    return context
+    ranked = rrf_fuse(rankings, k=settings.rrf_k)
+    return get_context_packer().select(ranked, max_chunks=plan.top_k)
+
+
+def select_for_plans(plans: list) -> list:
+    """
+    select_for_plan para vários planos de uma vez (/ask/batch):
+    todas as queries vão num único retrieve_batch (embed e consultas
+    ao Chroma em lote, sub-queries repetidas buscadas uma vez).
+    """
+    if not plans:
+        return []
+    requests = [
+        (query, plan.metadata_filters.model_dump())
+        for plan in plans
+        for query in plan.queries
+    ]
+    results = iter(get_retriever().retrieve_batch(requests, top_k=max(plan.top_k for plan in plans)))
+
+    packer = get_context_packer()
+    selected = []
+    for plan in plans:
+        rankings = [next(results)[:plan.top_k] for _ in plan.queries]
+        ranked = rrf_fuse(rankings, k=settings.rrf_k)
+        selected.append(packer.select(ranked, max_chunks=plan.top_k))
+    return selected
+
+
+def retrieve_for_plan(plan) -> str:
+    """
+    Contexto do qa_agent para um RetrievalPlan (chunks vizinhos já agrupados).
+    """
+    return get_context_packer().render(select_for_plan(plan))
@@ -0,0 +1,203 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.app.ingestion.metadata import COMPANY_HINTS, DATE_PATTERNS, DOC_TYPE_HINTS
+
+# apelidos que não aparecem nos documentos com o mesmo nome do COMPANY_HINTS
+COMPANY_ALIASES = {
+    "Amazon.com": "Amazon",
+    "AWS": "Amazon",
+    "Nvidia": "NVIDIA",
+    "Apple Inc": "Apple",
+    "Tesla Motors": "Tesla",
+    "Microsoft Corp": "Microsoft",
+    "Banco Central": "Banco Central do Brasil",
+    "BCB": "Banco Central do Brasil",
+    "Fed": "Federal Reserve",
+}
+
+# hints genéricos demais para decidir sozinhos o doc_type
+WEAK_DOC_TYPE_HINTS = {"Report", "Outlook", "Ata", "Minutes", "COPOM", "FOMC"}
+
+# pistas de pergunta analítica (comparação, causa, tendência)
+ANALYSIS_CUES = re.compile(
+    r"\b(compare|comparing|comparison|why|trend|impact|analy[sz]e|explain|"
+    r"compar[ea]|por\s*que|tend[eê]ncia|impacto|analis[ea]|an[aá]lise|explique)\w*",
+    flags=re.IGNORECASE,
+)
+
+QUARTER_PATTERN = re.compile(r"\b(Q[1-4])\s*(\d{4})\b", flags=re.IGNORECASE)
+YEAR_PATTERN = re.compile(r"\b(19|20)\d{2}\b")
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+# confiança quando a pergunta não traz nenhuma pista de metadado
+EMPTY_CONFIDENCE = 0.75
+# pistas abaixo disso (ex: "report") não viram filtro nem reduzem a confiança
+MIN_TERM_CONFIDENCE = 0.6
+
+
+class _Term(BaseModel):
+    text: str
+    field: str
+    value: str
+    confidence: float
+    case_sensitive: bool = False
+
+
+class LocalFilters(BaseModel):
+    intent: str
+    metadata_filters: Dict[str, object]
+    confidence: Dict[str, float] = Field(default_factory=dict)
+    overall: float
+
+
+class LocalFilterExtractor:
+    """
+    Extração determinística de filtros de metadados a partir da pergunta.
+
+    Reaproveita os dicionários da ingestão (COMPANY_HINTS, DOC_TYPE_HINTS,
+    DATE_PATTERNS, regra Q[1-4] YYYY) + apelidos + valores distintos da coleção
+    (catálogo de facetas), compilados num único regex de alternância.
+    Cada filtro sai com um score de confiança; o planner LLM só é
+    chamado quando `overall` fica abaixo do mínimo configurado.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._facet_key: Optional[Tuple] = None
+        self._terms: Dict[str, List[_Term]] = {}
+        self._matcher: Optional[re.Pattern] = None
+        self._dates = [re.compile(p, flags=re.IGNORECASE) for p in DATE_PATTERNS]
+
+    # ---------------------------
+    #   VOCABULÁRIO
+    # ---------------------------
+
+    def _facet_values(self) -> Dict[str, List[str]]:
+        if self.store is None:
+            return {}
+        return {f: self.store.facets.values(f) for f in ("company", "doc_type")}
+
+    def _vocabulary(self, facets: Dict[str, List[str]]) -> List[Tuple[str, _Term]]:
+        terms: List[Tuple[str, _Term]] = []
+        def term(text: str, field: str, value: str, confidence: float, case_sensitive: bool = False):
+            terms.append((text, _Term(text=text, field=field, value=value, confidence=confidence, case_sensitive=case_sensitive)))
+
+        for ticker, company in COMPANY_HINTS.items():
+            term(ticker, "company", company, 0.95, case_sensitive=True)
+            term(company, "company", company, 0.95)
+        for alias, company in COMPANY_ALIASES.items():
+            # siglas curtas ("Fed", "AWS") só contam com a grafia exata
+            term(alias, "company", company, 0.85, case_sensitive=len(alias) <= 4)
+        for key, dtype in DOC_TYPE_HINTS:
+            term(key, "doc_type", dtype, 0.5 if key in WEAK_DOC_TYPE_HINTS else 0.95)
+        for field, values in facets.items():
+            for value in values:
+                term(value, field, value, 0.9)
+        return terms
+
+    def _compiled(self) -> re.Pattern:
+        """
+        Recompila o matcher só quando os valores da coleção mudam.
+        """
+        facets = self._facet_values()
+        key = tuple((f, tuple(v)) for f, v in sorted(facets.items()))
+        with self._lock:
+            if self._matcher is None or key != self._facet_key:
+                terms: Dict[str, List[_Term]] = {}
+                for text, term in self._vocabulary(facets):
+                    terms.setdefault(text.lower(), []).append(term)
+                # termos mais longos primeiro ("Earnings Call Transcript" antes de "Earnings")
+                alternation = "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+                self._matcher = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", flags=re.IGNORECASE)
+                self._terms = terms
+                self._facet_key = key
+            return self._matcher
+
+    # ---------------------------
+    #   EXTRAÇÃO
+    # ---------------------------
+
+    def _match_terms(self, question: str) -> Dict[str, Dict[str, float]]:
+        found: Dict[str, Dict[str, float]] = {}
+        for m in self._compiled().finditer(question):
+            for term in self._terms.get(m.group(0).lower(), []):
+                if term.case_sensitive and m.group(0) != term.text:
+                    continue
+                if term.confidence < MIN_TERM_CONFIDENCE:
+                    continue
+                values = found.setdefault(term.field, {})
+                values[term.value] = max(values.get(term.value, 0.0), term.confidence)
+        return found
+
+    def _match_dates(self, question: str, filters: Dict[str, object], confidence: Dict[str, float]) -> None:
+        # mesmo formato gravado por MetadataExtractor._infer_date
+        for pattern in self._dates:
+            m = pattern.search(question)
+            if m:
+                filters["doc_date"] = m.group(0)
+                confidence["doc_date"] = 0.9
+                return
+        m = QUARTER_PATTERN.search(question)
+        if m:
+            filters["quarter"] = m.group(1).upper()
+            filters["doc_date"] = f"{m.group(1).upper()}{m.group(2)}"
+            confidence["quarter"] = confidence["doc_date"] = 0.95
+            return
+        years = set(y.group(0) for y in YEAR_PATTERN.finditer(question))
+        if len(years) == 1:
+            filters["doc_date"] = years.pop()
+            confidence["doc_date"] = 0.8
+        elif years:
+            # vários anos ("entre 2022 e 2024") → intervalo que cobre todos
+            filters["date_from"] = min(years)
+            filters["date_to"] = max(years)
+            confidence["date_from"] = confidence["date_to"] = 0.8
+
+    def signature(self, question: str) -> Tuple:
+        """
+        Entidades e períodos citados na pergunta: todos os valores reconhecidos
+        (empresas, tipos de documento), datas e números. Perguntas com embeddings
+        quase iguais mas assinaturas diferentes ("Apple 2023" x "Apple 2024",
+        "Apple" x "Microsoft") não têm a mesma resposta.
+        """
+        dates: Dict[str, object] = {}
+        self._match_dates(question, dates, {})
+        return (
+            tuple(sorted((field, tuple(sorted(values))) for field, values in self._match_terms(question).items())),
+            tuple(sorted((field, str(value)) for field, value in dates.items())),
+            tuple(sorted(set(NUMBER_PATTERN.findall(question)))),
+        )
+
+    def extract(self, question: str) -> LocalFilters:
+        filters: Dict[str, object] = {
+            "company": None,
+            "doc_type": None,
+            "doc_date": None,
+            "quarter": None,
+            "date_from": None,
+            "date_to": None,
+            "section_path": [],
+        }
+        confidence: Dict[str, float] = {}
+
+        for field, values in self._match_terms(question).items():
+            best = max(values, key=values.get)
+            filters[field] = best
+            # mais de um valor para o mesmo campo (ex: "compare Apple e Tesla") é ambíguo
+            confidence[field] = values[best] if len(values) == 1 else 0.4
+
+        self._match_dates(question, filters, confidence)
+
+        intent = "mixed" if ANALYSIS_CUES.search(question) else "retrieval"
+        overall = min(confidence.values()) if confidence else EMPTY_CONFIDENCE
+        return LocalFilters(
+            intent=intent,
+            metadata_filters=filters,
+            confidence=confidence,
+            overall=overall,
+        )
@@ -1,29 +1,57 @@
-from src.app.agents.risk_agent import risk_agent
-from src.app.agents.orchestrator import orchestrator
-from src.app.agents.extractor_agent import extractor_agent
-from src.app.agents.qa_agent import qa_agent
-import yaml
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List
 
-with open("src/app/prompts/prompts.yml", "r") as f:
-    PROMPTS = yaml.safe_load(f)
+from src.app.agents.risk_agent import risk_agent, risk_agent_async
+from src.app.agents.planner import planner, planner_async
+from src.app.agents.extractor_agent import retrieve_for_plan, select_for_plan, select_for_plans
+from src.app.agents.qa_agent import qa_agent, qa_agent_async, qa_agent_stream
+from src.app.config.settings import settings
+from src.app.core.logging import logger
+from src.app.core.metrics import BLOCKED
+from src.app.core.registry import get_answer_cache, get_context_packer, get_prompts
+from src.app.core.token_logger import track_request
+
+def _blocked():
+    BLOCKED.inc()
+    return {
+        "answer": get_prompts()["risk_agent"]["block_message"],
+        "intent": "blocked",
+        "metadata": {},
+    }
+
+def _cached(lookup):
+    return {**lookup.result, "cached": True, "cache_match": lookup.match}
+
+def _remember(cache, lookup, result):
+    # respostas bloqueadas não entram no cache
+    if cache is not None and lookup is not None and result["intent"] != "blocked":
+        cache.store(lookup, result)
+    return result
 
 def run_multi_agent(question: str):
+    cache = get_answer_cache()
+    lookup = cache.lookup(question) if cache is not None else None
+    if lookup is not None and lookup.result is not None:
+        return _cached(lookup)
+    # tokens reais de todos os agentes somados por request
+    with track_request():
+        result = _run_multi_agent(question)
+    return _remember(cache, lookup, result)
+
+def _run_multi_agent(question: str):
     
     # 1) Segurança - Prompt Injection
     if risk_agent(question):
-        return {
-            "answer": PROMPTS["risk_agent"]["block_message"],
-            "intent": "blocked",
-            "metadata": {},
-        }
+        return _blocked()
 
-    # 2) Orquestra Intenção + Filtros
-    ork = orchestrator(question)
-    intent = ork["intent"]
-    metadata = ork.get("metadata_filters", {})
+    # 2) Planner: intenção + filtros + queries numa única chamada
+    plan = planner(question)
+    intent = plan.intent
+    metadata = plan.metadata_filters.model_dump()
 
     # 3) Extrator (Busca no Chroma)
-    context = extractor_agent(question, metadata)
+    context = retrieve_for_plan(plan)
 
     # 4) QA Agent (Resposta Final)
     final_answer = qa_agent(question, context)
@@ -34,3 +62,286 @@ def run_multi_agent(question: str):
         "metadata": metadata,
         "context": context,
     }
+
+
+def _discard(task: asyncio.Task) -> None:
+    # cancela o trabalho especulativo e consome uma eventual exceção já registrada
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+async def _plan_and_retrieve(question: str):
+    # 2) Planner: intenção + filtros + queries numa única chamada
+    plan = await planner_async(question)
+
+    # 3) Extrator (Busca no Chroma) — embedding + consulta são bloqueantes → threadpool
+    context = await asyncio.to_thread(retrieve_for_plan, plan)
+    return plan, context
+
+
+async def run_multi_agent_async(question: str):
+    """
+    Versão assíncrona do pipeline, com cache de respostas na frente:
+    perguntas já respondidas (match exato ou semântico) não passam pelos agentes.
+    """
+    cache = get_answer_cache()
+    lookup = await asyncio.to_thread(cache.lookup, question) if cache is not None else None
+    if lookup is not None and lookup.result is not None:
+        return _cached(lookup)
+    # tokens reais de todos os agentes somados por request (inclui a task especulativa)
+    with track_request():
+        result = await _run_multi_agent_async(question)
+    return _remember(cache, lookup, result)
+
+
+async def _run_multi_agent_async(question: str):
+    """
+    Versão assíncrona do pipeline.
+    A checagem de risco roda em paralelo com planner + retrieval (especulativos);
+    se a pergunta for high_risk, o trabalho especulativo é cancelado.
+    O QA só roda depois que a pergunta foi considerada segura.
+    """
+    speculative = asyncio.create_task(_plan_and_retrieve(question))
+
+    # 1) Segurança - Prompt Injection
+    try:
+        high_risk = await risk_agent_async(question)
+    except BaseException:
+        _discard(speculative)
+        raise
+
+    if high_risk:
+        logger.info("pipeline.blocked", speculative_cancelled=not speculative.done())
+        _discard(speculative)
+        return _blocked()
+
+    plan, context = await speculative
+
+    # 4) QA Agent (Resposta Final)
+    final_answer = await qa_agent_async(question, context)
+
+    return {
+        "answer": final_answer,
+        "intent": plan.intent,
+        "metadata": plan.metadata_filters.model_dump(),
+        "context": context,
+    }
+
+
+# ---------------------------
+#   STREAMING (SSE do /ask)
+# ---------------------------
+
+SOURCE_FIELDS = ("company", "doc_type", "doc_date", "section_path")
+
+
+def _event(name: str, **data) -> Dict[str, Any]:
+    return {"event": name, "data": data}
+
+
+def _done(result: Dict[str, Any]) -> Dict[str, Any]:
+    return _event(
+        "done",
+        answer=result["answer"],
+        intent=result.get("intent"),
+        metadata=result.get("metadata"),
+        cached=result.get("cached", False),
+        cache_match=result.get("cache_match"),
+    )
+
+
+def _sources(selected: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    sources: List[Dict[str, Any]] = []
+    for item in selected:
+        meta = item.get("metadata") or {}
+        source = {k: meta.get(k) for k in SOURCE_FIELDS}
+        if source not in sources:
+            sources.append(source)
+    return sources
+
+
+async def _select_after(plan_task: asyncio.Task):
+    plan = await plan_task
+    return await asyncio.to_thread(select_for_plan, plan)
+
+
+async def run_multi_agent_stream(question: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Pipeline assíncrono em forma de eventos, para o /ask em streaming:
+      risk → plan (intenção + filtros) → retrieval (chunks) → token* → done
+    Planner e retrieval rodam especulativamente durante a checagem de risco,
+    como em run_multi_agent_async; os tokens do QA saem conforme são gerados.
+    """
+    cache = get_answer_cache()
+    lookup = await asyncio.to_thread(cache.lookup, question) if cache is not None else None
+    if lookup is not None and lookup.result is not None:
+        yield _done(_cached(lookup))
+        return
+
+    with track_request():
+        plan_task = asyncio.create_task(planner_async(question))
+        select_task = asyncio.create_task(_select_after(plan_task))
+        try:
+            # 1) Segurança - Prompt Injection
+            high_risk = await risk_agent_async(question)
+            yield _event("risk", passed=not high_risk)
+            if high_risk:
+                logger.info("pipeline.blocked", speculative_cancelled=not select_task.done())
+                yield _done(_blocked())
+                return
+
+            # 2) Planner
+            plan = await plan_task
+            yield _event(
+                "plan",
+                intent=plan.intent,
+                metadata_filters=plan.metadata_filters.model_dump(),
+                queries=plan.queries,
+                top_k=plan.top_k,
+            )
+
+            # 3) Extrator
+            selected = await select_task
+            context = get_context_packer().render(selected)
+            yield _event("retrieval", n_chunks=len(selected), sources=_sources(selected))
+
+            # 4) QA Agent, token a token
+            parts: List[str] = []
+            async for token in qa_agent_stream(question, context):
+                parts.append(token)
+                yield _event("token", text=token)
+        finally:
+            # cliente desconectado, bloqueio ou erro: nada especulativo fica rodando
+            _discard(select_task)
+            _discard(plan_task)
+
+    result = {
+        "answer": "".join(parts),
+        "intent": plan.intent,
+        "metadata": plan.metadata_filters.model_dump(),
+        "context": context,
+    }
+    yield _done(_remember(cache, lookup, result))
+
+
+# ---------------------------
+#   LOTE (/ask/batch)
+# ---------------------------
+
+def _failed(error: BaseException) -> Dict[str, Any]:
+    return {"answer": "", "intent": None, "metadata": {}, "error": str(error)}
+
+
+def _select_each(plans: list) -> list:
+    """
+    Retrieval do lote num único select_for_plans; se ele falhar, refaz plano
+    a plano para que só as perguntas com problema fiquem com erro.
+    Retorna, por plano, os chunks selecionados ou a exceção.
+    """
+    try:
+        return select_for_plans(plans)
+    except Exception as e:
+        logger.error("pipeline.batch_failed", stage="retrieval", error=str(e), fallback="per_plan")
+
+    selected = []
+    for plan in plans:
+        try:
+            selected.append(select_for_plan(plan))
+        except Exception as e:
+            selected.append(e)
+    return selected
+
+
+async def run_multi_agent_batch(questions: List[str], concurrency: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Várias perguntas num único pipeline:
+      1. perguntas repetidas são respondidas uma vez; cache de respostas na frente
+      2. risk + planner de cada pergunta, no máximo `concurrency` perguntas em paralelo
+      3. retrieval de todos os planos num único lote (um embed(), um
+         collection.query por filtro, sub-queries repetidas buscadas uma vez);
+         se o lote falhar, plano a plano
+      4. QA de cada pergunta, com o mesmo limite de paralelismo
+    Uma pergunta com erro não derruba o lote: o resultado dela leva "error".
+    Os resultados seguem a ordem de `questions`.
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(max(1, concurrency or settings.ask_batch_concurrency))
+    unique = list(dict.fromkeys(questions))
+    cache = get_answer_cache()
+
+    if cache is not None:
+        lookups = await asyncio.gather(*(asyncio.to_thread(cache.lookup, q) for q in unique))
+    else:
+        lookups = [None] * len(unique)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for question, lookup in zip(unique, lookups):
+        if lookup is not None and lookup.result is not None:
+            results[question] = _cached(lookup)
+        else:
+            pending.append((question, lookup))
+
+    async def screen(question: str):
+        async with semaphore:
+            return await asyncio.gather(risk_agent_async(question), planner_async(question))
+
+    async def answer(question: str, context: str):
+        async with semaphore:
+            return await qa_agent_async(question, context)
+
+    # tokens reais de todos os agentes somados para o lote inteiro
+    with track_request():
+        # 1) Segurança + Planner
+        screened = await asyncio.gather(*(screen(q) for q, _ in pending), return_exceptions=True)
+        safe = []
+        for (question, lookup), outcome in zip(pending, screened):
+            if isinstance(outcome, BaseException):
+                logger.error("pipeline.batch_failed", stage="screen", error=str(outcome))
+                results[question] = _failed(outcome)
+                continue
+            high_risk, plan = outcome
+            if high_risk:
+                results[question] = _blocked()
+            else:
+                safe.append((question, lookup, plan))
+
+        # 2) Extrator em lote (bloqueante → threadpool)
+        selected = await asyncio.to_thread(_select_each, [plan for _, _, plan in safe])
+        packer = get_context_packer()
+        retrieved = []
+        for (question, lookup, plan), items in zip(safe, selected):
+            if isinstance(items, BaseException):
+                logger.error("pipeline.batch_failed", stage="retrieval", error=str(items))
+                results[question] = _failed(items)
+            else:
+                retrieved.append((question, lookup, plan, packer.render(items)))
+
+        # 3) QA Agent
+        answers = await asyncio.gather(
+            *(answer(question, context) for question, _, _, context in retrieved),
+            return_exceptions=True,
+        )
+
+    for (question, lookup, plan, context), final_answer in zip(retrieved, answers):
+        if isinstance(final_answer, BaseException):
+            logger.error("pipeline.batch_failed", stage="qa", error=str(final_answer))
+            results[question] = _failed(final_answer)
+            continue
+        results[question] = _remember(cache, lookup, {
+            "answer": final_answer,
+            "intent": plan.intent,
+            "metadata": plan.metadata_filters.model_dump(),
+            "context": context,
+        })
+
+    logger.info(
+        "pipeline.batch",
+        n_questions=len(questions),
+        n_unique=len(unique),
+        n_cached=len(unique) - len(pending),
+        n_answered=len(retrieved),
+        elapsed_s=round(time.perf_counter() - started, 3),
+    )
+    return [results[q] for q in questions]
+
@@ -0,0 +1,141 @@
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from src.app.config.settings import settings
+from src.app.core.logging import logger
+from src.app.core.metrics import ERRORS, stage_timer
+from src.app.core.registry import get_filter_extractor, get_planner_llm, get_prompts, get_store
+from src.app.core.token_logger import TokenEstimator
+from src.app.core.utils import get_metadata_fields, get_unique_companies
+
+# limite de queries de busca por pergunta
+MAX_QUERIES = 3
+
+
+class MetadataFilters(BaseModel):
+    # sem defaults: o schema estrito da OpenAI exige todos os campos
+    company: Optional[str] = Field(description="Company name exactly as in KNOWN COMPANY VALUES, or null")
+    doc_type: Optional[str] = Field(description="Document type, or null")
+    doc_date: Optional[str] = Field(description="Document date/period as written in the question, or null")
+    quarter: Optional[str] = Field(description="Quarter like Q1..Q4, or null")
+    date_from: Optional[str] = Field(description="Start of a date range (YYYY, QnYYYY, Month YYYY or YYYY-MM-DD), or null")
+    date_to: Optional[str] = Field(description="End of a date range (same formats, inclusive), or null")
+    section_path: List[str] = Field(description="Section names hinted by the question, or []")
+
+
+class RetrievalPlan(BaseModel):
+    """
+    Saída única do planner: intenção, filtros, queries de busca e top_k.
+    """
+    intent: Literal["retrieval", "analysis", "mixed", "direct"]
+    metadata_filters: MetadataFilters
+    queries: List[str] = Field(description="1 to 3 semantic search queries")
+    top_k: int = Field(description="Number of chunks to retrieve (1-20)")
+
+    @field_validator("queries")
+    @classmethod
+    def _clean_queries(cls, queries: List[str]) -> List[str]:
+        cleaned = []
+        for q in queries:
+            q = q.strip()
+            if q and q not in cleaned:
+                cleaned.append(q)
+        return cleaned[:MAX_QUERIES]
+
+    @field_validator("top_k")
+    @classmethod
+    def _clamp_top_k(cls, top_k: int) -> int:
+        return max(1, min(top_k, settings.planner_max_top_k))
+
+
+def _build_messages(question: str, local_filters: dict) -> list:
+    store = get_store()
+    prompts = get_prompts()["planner"]
+    return [
+        {
+            "role": "system",
+            "content": prompts["system"].format(max_top_k=settings.planner_max_top_k),
+        },
+        {
+            "role": "user",
+            "content": prompts["user_template"].format(
+                question=question,
+                metadata=local_filters,
+                metadata_fields=get_metadata_fields(store),
+                company_values=get_unique_companies(store),
+            ),
+        },
+    ]
+
+
+def _plan_from_local(question: str, local) -> RetrievalPlan:
+    # plano sem LLM: filtros locais + a própria pergunta como query
+    return RetrievalPlan(
+        intent=local.intent,
+        metadata_filters=MetadataFilters(**local.metadata_filters),
+        queries=[question],
+        top_k=settings.retrieval_top_k,
+    )
+
+
+def _local(question: str):
+    """
+    Passo determinístico (LocalFilterExtractor). Se confiante, dispensa o LLM.
+    """
+    local = get_filter_extractor().extract(question)
+    confident = settings.orchestrator_local_enabled and local.overall >= settings.orchestrator_local_min_confidence
+    logger.info("planner.local", confident=confident, overall=round(local.overall, 3), confidence=local.confidence)
+    return local, confident
+
+
+def _parsed(estimator: TokenEstimator, output: dict) -> RetrievalPlan:
+    estimator.record_usage(output["raw"])
+    if output.get("parsing_error") is not None or output.get("parsed") is None:
+        raise ValueError(f"Plano inválido: {output.get('parsing_error')}")
+    return output["parsed"]
+
+
+def _finish(question: str, plan: RetrievalPlan) -> RetrievalPlan:
+    if not plan.queries:
+        plan.queries = [question]
+    logger.info("planner.plan", intent=plan.intent, n_queries=len(plan.queries), top_k=plan.top_k)
+    return plan
+
+
+def planner(question: str) -> RetrievalPlan:
+    with stage_timer("planner"):
+        local, confident = _local(question)
+        if confident:
+            return _finish(question, _plan_from_local(question, local))
+
+        estimator = TokenEstimator("planner")
+        messages = _build_messages(question, local.metadata_filters)
+        estimator.log_estimated(messages)
+
+        try:
+            plan = _parsed(estimator, get_planner_llm().invoke(messages))
+        except Exception as e:
+            logger.error("planner.fallback", error=str(e))
+            ERRORS.inc(stage="planner")
+            plan = _plan_from_local(question, local)
+        return _finish(question, plan)
+
+
+async def planner_async(question: str) -> RetrievalPlan:
+    with stage_timer("planner"):
+        local, confident = _local(question)
+        if confident:
+            return _finish(question, _plan_from_local(question, local))
+
+        estimator = TokenEstimator("planner")
+        messages = _build_messages(question, local.metadata_filters)
+        estimator.log_estimated(messages)
+
+        try:
+            plan = _parsed(estimator, await get_planner_llm().ainvoke(messages))
+        except Exception as e:
+            logger.error("planner.fallback", error=str(e))
+            ERRORS.inc(stage="planner")
+            plan = _plan_from_local(question, local)
+        return _finish(question, plan)
@@ -1,22 +1,64 @@
-import yaml
-from langchain_openai import ChatOpenAI
-from src.app.core.token_logger import TokenEstimator
+import time
+from typing import AsyncIterator
 
-with open("src/app/prompts/prompts.yml") as f:
-    PROMPTS = yaml.safe_load(f)
+from src.app.core.metrics import STAGE_SECONDS, stage_timer
+from src.app.core.registry import get_llm, get_prompts
+from src.app.core.token_logger import TokenEstimator
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+def _build_prompt(question: str, context: str) -> str:
+    prompts = get_prompts()["qa_agent"]
+    system = prompts["system"]
+    user = prompts["user_template"].format(
+        question=question,
+        context=context
+    )
+    return system + "\n\n" + user
 
 def qa_agent(question: str, context: str):
     estimator = TokenEstimator("qa_agent")
 
-    system = PROMPTS["qa_agent"]["system"]
-    user = PROMPTS["qa_agent"]["user_template"].format(
-        question=question,
-        context=context
-    )
-    prompt = system + "\n\n" + user
+    prompt = _build_prompt(question, context)
 
     estimator.log_text_estimated(prompt)
-    response = llm.invoke(prompt)
+    with stage_timer("qa"):
+        response = get_llm().invoke(prompt)
+    estimator.record_usage(response)
     return response.content
+
+async def qa_agent_async(question: str, context: str):
+    estimator = TokenEstimator("qa_agent")
+
+    prompt = _build_prompt(question, context)
+
+    estimator.log_text_estimated(prompt)
+    with stage_timer("qa"):
+        response = await get_llm().ainvoke(prompt)
+    estimator.record_usage(response)
+    return response.content
+
+async def qa_agent_stream(question: str, context: str) -> AsyncIterator[str]:
+    """
+    Mesma resposta do qa_agent, entregue token a token (streaming do LLM).
+    O usage real vem no último chunk (stream_usage) e é registrado no fim.
+    """
+    estimator = TokenEstimator("qa_agent")
+
+    prompt = _build_prompt(question, context)
+
+    estimator.log_text_estimated(prompt)
+    started = time.perf_counter()
+    first = True
+    full = None
+    llm = get_llm()
+    with stage_timer("qa"):
+        async for chunk in llm.astream(prompt, stream_usage=True):
+            full = chunk if full is None else full + chunk
+            if not chunk.content:
+                continue
+            if first:
+                # time-to-first-token do QA
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage="qa_first_token")
+                first = False
+            yield chunk.content
+    if full is not None:
+        estimator.record_usage(full)
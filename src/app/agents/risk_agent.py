@@ -1,22 +1,85 @@
-import yaml
-from langchain_openai import ChatOpenAI
+import asyncio
+from src.app.agents.risk_classifier import AMBIGUOUS, HIGH_RISK, RiskVerdict
+from src.app.config.settings import settings
+from src.app.core.logging import logger
+from src.app.core.metrics import stage_timer
+from src.app.core.registry import get_llm, get_prompts, get_risk_classifier
 from src.app.core.token_logger import TokenEstimator
 
-with open("src/app/prompts/prompts.yml") as f:
-    PROMPTS = yaml.safe_load(f)
+def _build_prompt(question: str) -> str:
+    prompts = get_prompts()["risk_agent"]
+    prompt = prompts["user_template"].format(question=question)
+    system = prompts["system"]
+    classify = prompts["classify_injection"]
+    return system + "\n\n" + prompt + "\n\n" + classify
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+def _is_high_risk(content: str) -> bool:
+    verdict = content.strip().lower()
+    return verdict == "high_risk"
+
+def _local_verdict(question: str) -> RiskVerdict | None:
+    """
+    1º estágio local (padrões + protótipos). None se desabilitado.
+    """
+    if not settings.risk_local_enabled:
+        return None
+    with stage_timer("risk_local"):
+        verdict = get_risk_classifier().classify(question)
+    logger.info("risk_classifier.verdict", **verdict.model_dump())
+    return verdict
+
+def _local_decision(verdict: RiskVerdict | None) -> bool | None:
+    # só decide localmente fora da faixa ambígua e fora do shadow mode
+    if verdict is None or verdict.label == AMBIGUOUS or settings.risk_shadow_mode:
+        return None
+    return verdict.label == HIGH_RISK
+
+def _compare(verdict: RiskVerdict | None, high_risk: bool) -> None:
+    if settings.risk_shadow_mode and verdict is not None:
+        llm_label = HIGH_RISK if high_risk else "safe"
+        logger.info(
+            "risk_classifier.shadow",
+            local=verdict.label,
+            llm=llm_label,
+            agree=verdict.label == llm_label,
+            score=verdict.score,
+            reason=verdict.reason,
+        )
 
 def risk_agent(question: str) -> bool:
+    verdict = _local_verdict(question)
+    decision = _local_decision(verdict)
+    if decision is not None:
+        return decision
+
     estimator = TokenEstimator("risk_agent")
 
-    prompt = PROMPTS["risk_agent"]["user_template"].format(question=question)
-    system = PROMPTS["risk_agent"]["system"]
-    classify = PROMPTS["risk_agent"]["classify_injection"]
-    full_prompt = system + "\n\n" + prompt + "\n\n" + classify
+    full_prompt = _build_prompt(question)
 
     estimator.log_text_estimated(full_prompt)
-    response = llm.invoke(full_prompt)
+    with stage_timer("risk"):
+        response = get_llm().invoke(full_prompt)
+    estimator.record_usage(response)
 
-    verdict = response.content.strip().lower()
-    return verdict == "high_risk"
+    high_risk = _is_high_risk(response.content)
+    _compare(verdict, high_risk)
+    return high_risk
+
+async def risk_agent_async(question: str) -> bool:
+    verdict = await asyncio.to_thread(_local_verdict, question)
+    decision = _local_decision(verdict)
+    if decision is not None:
+        return decision
+
+    estimator = TokenEstimator("risk_agent")
+
+    full_prompt = _build_prompt(question)
+
+    estimator.log_text_estimated(full_prompt)
+    with stage_timer("risk"):
+        response = await get_llm().ainvoke(full_prompt)
+    estimator.record_usage(response)
+
+    high_risk = _is_high_risk(response.content)
+    _compare(verdict, high_risk)
+    return high_risk
@@ -0,0 +1,132 @@
+import re
+import time
+import unicodedata
+from typing import TYPE_CHECKING, List, Optional
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SAFE = "safe"
+HIGH_RISK = "high_risk"
+AMBIGUOUS = "ambiguous"
+
+# ordens explícitas ao assistente (imperativo / 2ª pessoa, EN/PT) → bloqueio local
+INJECTION_PATTERNS = [
+    r"\b(ignore|disregard|forget)\s+(all\s+|any\s+)?(of\s+)?(your\s+|the\s+|these\s+|my\s+)?(previous\s+|prior\s+|above\s+|earlier\s+)?(instructions?|rules|prompts?|guidelines|directions)\b",
+    r"\b(ignore|esque[cç]a|desconsidere)\s+(todas\s+)?(as\s+|o\s+)?(suas\s+|seu\s+)?(instru[cç](ão|ões)|regras|prompt)\b",
+    r"\byou\s+are\s+now\b|\bvoc[eê]\s+agora\s+[eé]\b|\ba\s+partir\s+de\s+agora\s+voc[eê]\b",
+    r"\b(DAN\s+mode|do\s+anything\s+now)\b",
+    r"\b(reveal|print|show|dump|leak|output|repeat)\s+(me\s+)?(your\s+(system\s+)?(prompt|instructions|guardrails|rules)|(the\s+)?system\s+prompt)\b",
+    r"\b(revele|mostre|imprima|vaze|repita)\s+(o\s+)?(seu\s+prompt|suas\s+instru[cç](ões|ão)|prompt\s+do\s+sistema)\b",
+    r"\brepeat\s+(everything|all|the\s+text)\s+(above|before)\b",
+    r"\b(disable|bypass|turn\s+off)\s+(your\s+|the\s+|all\s+)?(safety|guardrails?|restrictions)\b",
+    r"</?\s*(system|assistant|instructions?)\s*>",
+]
+
+# vocabulário de injeção que também aparece em perguntas legítimas
+# ("did the board override the previous dividend rules", "the developer message
+# in the 10-K", "show the filing metadata") → nunca bloqueia localmente (vai ao LLM)
+INJECTION_HINT_PATTERNS = [
+    r"\b(ignore|disregard|forget|override)\b.{0,40}\b(previous|prior|above|all|your|the)\b.{0,20}\b(instructions?|rules|prompts?|guidelines|directions)\b",
+    r"\b(system|developer|hidden|internal)\s+(prompt|message|instructions?)\b",
+    r"\bprompt\s+do\s+sistema\b",
+    r"\bjailbreak\b",
+    r"\b(reveal|print|show|dump|leak|output)\b.{0,30}\b(instructions|embeddings|logs|metadata|guardrails)\b",
+    r"\b(revele|mostre|imprima|vaze)\b.{0,30}\b(prompt|instru[cç](ões|ão)|embeddings|logs|metadados)\b",
+    r"\b(disable|bypass|turn\s+off)\b.{0,30}\b(safety|guardrails?|filters?|restrictions)\b",
+]
+
+# sinais de contrabando de payload → nunca decididos localmente (vão ao LLM)
+SUSPICIOUS_PATTERNS = [
+    r"[\u200b-\u200f\u202a-\u202e\u2060-\u2064\ufeff]",  # zero-width / bidi
+    r"[A-Za-z0-9+/]{40,}={0,2}",                         # blobs tipo base64
+    r"```",
+    r"\b(base64|rot13|hex)\b",
+]
+
+
+class RiskVerdict(BaseModel):
+    label: str                      # safe | high_risk | ambiguous
+    score: Optional[float] = None   # sim(malicioso) - sim(seguro)
+    reason: str
+    elapsed_ms: float = 0.0
+
+
+class LocalRiskClassifier:
+    """
+    Primeiro estágio (local, CPU) da checagem de prompt injection.
+
+    1. ordens explícitas ao assistente → high_risk
+    2. vocabulário de injeção ou sinais de payload contrabandeado → ambiguous
+    3. protótipos: margem entre a similaridade com o protótipo malicioso
+       e o seguro mais próximos, comparada com `safe_margin`/`block_margin`
+
+    Só a faixa ambígua precisa do risk_agent (LLM).
+    """
+
+    def __init__(
+        self,
+        embeddings=None,
+        safe_prototypes: Optional[List[str]] = None,
+        malicious_prototypes: Optional[List[str]] = None,
+        safe_margin: float = -0.10,
+        block_margin: float = 0.15,
+    ):
+        self.embeddings = embeddings
+        self.safe_margin = safe_margin
+        self.block_margin = block_margin
+        self._injection = [re.compile(p, re.IGNORECASE | re.DOTALL) for p in INJECTION_PATTERNS]
+        self._hints = [re.compile(p, re.IGNORECASE | re.DOTALL) for p in INJECTION_HINT_PATTERNS]
+        self._suspicious = [re.compile(p, re.IGNORECASE) for p in SUSPICIOUS_PATTERNS]
+
+        self._safe = self._malicious = None
+        if embeddings is not None and safe_prototypes and malicious_prototypes:
+            self._safe = self._embed(safe_prototypes)
+            self._malicious = self._embed(malicious_prototypes)
+
+    def _embed(self, texts: List[str]) -> "np.ndarray":
+        import numpy as np
+
+        vectors = self.embeddings.embed_array(texts)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return unicodedata.normalize("NFKC", question)
+
+    def _score(self, question: str) -> float:
+        (vector,) = self._embed([question])
+        return float((self._malicious @ vector).max() - (self._safe @ vector).max())
+
+    def classify(self, question: str) -> RiskVerdict:
+        started = time.perf_counter()
+        text = self._normalize(question)
+
+        def verdict(label: str, reason: str, score: Optional[float] = None) -> RiskVerdict:
+            elapsed = round((time.perf_counter() - started) * 1000, 3)
+            return RiskVerdict(label=label, score=score, reason=reason, elapsed_ms=elapsed)
+
+        for pattern in self._injection:
+            if pattern.search(text):
+                return verdict(HIGH_RISK, "pattern")
+
+        for pattern in self._hints:
+            if pattern.search(text):
+                return verdict(AMBIGUOUS, "pattern_hint")
+
+        for pattern in self._suspicious:
+            if pattern.search(question):
+                return verdict(AMBIGUOUS, "suspicious")
+
+        if self._safe is None:
+            return verdict(AMBIGUOUS, "no_prototypes")
+
+        score = self._score(text)
+        if score <= self.safe_margin:
+            return verdict(SAFE, "prototype", score)
+        if score >= self.block_margin:
+            return verdict(HIGH_RISK, "prototype", score)
+        return verdict(AMBIGUOUS, "prototype", score)
@@ -1,15 +1,54 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.app.api.routers.ask import router as ask_router
+from src.app.api.routers.health import router as health_router
 from src.app.api.routers.ingest import router as ingest_router
+from src.app.config.settings import settings
+from src.app.core.context import AppContext
+from src.app.core.metrics import COLLECTION_SIZE, QUEUE_DEPTH, metrics
+from src.app.core.registry import get_store, registry
+from src.app.core.token_logger import accountant
+from src.app.ingestion.jobs import get_job_queue, get_job_store, stop_job_queue
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # nada pesado é construído no import: o contexto nasce aqui e os componentes
+    # (modelo de embeddings, cliente Chroma, LLM...) sob demanda ou no warm-up
+    context = AppContext(registry, settings.warm_components, require_warm=settings.ready_requires_warm)
+    app.state.context = context
+    if settings.warm_on_startup:
+        # em background: a réplica sobe sem esperar modelo/Chroma (ver /ready)
+        context.start_warmup()
+
+    # jobs pendentes de antes de um restart: os workers (threads, baratos) sobem já;
+    # sem pendências, só no primeiro upload. Os processos do Docling sobem na
+    # primeira conversão, em ambos os casos
+    if get_job_store().pending() > 0:
+        get_job_queue()
+
+    # gauges calculados na coleta do /metrics (a JobStore não inicia workers; o
+    # tamanho da coleção só aparece depois que o store foi construído por outro caminho)
+    QUEUE_DEPTH.set_function(lambda: get_job_store().pending())
+    COLLECTION_SIZE.set_function(
+        lambda: get_store().collection.count() if registry.is_built("store") else None
+    )
+    yield
+    await context.close()
+    stop_job_queue()
+    # descarrega os totais de tokens ainda não logados
+    accountant.stop()
 
 app = FastAPI(
     title="Finance Multi-Agent API",
     description="Pipeline Multi-Agentes para RAG Financeiro",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS (opcional)
@@ -22,5 +61,14 @@ app.add_middleware(
 )
 
 # Rotas principais
+app.include_router(health_router)
 app.include_router(ask_router)
 app.include_router(ingest_router)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Métricas do processo no formato texto do Prometheus.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,6 +1,13 @@
-from fastapi import APIRouter
+import json
+
+from typing import List
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from src.app.agents.pipeline import run_multi_agent
+from src.app.agents.pipeline import run_multi_agent_async, run_multi_agent_batch, run_multi_agent_stream
+from src.app.config.settings import settings
+from src.app.core.logging import logger
 
 router = APIRouter(prefix="/ask", tags=["Ask"])
 
@@ -11,14 +18,83 @@ class AskResponse(BaseModel):
     answer: str
     intent: str | None = None
     metadata_used: dict | None = None
+    cached: bool = False
+    cache_match: str | None = None
+
+class AskBatchRequest(BaseModel):
+    questions: List[str]
+    # perguntas em paralelo nos estágios LLM (padrão: ASK_BATCH_CONCURRENCY)
+    concurrency: int | None = None
+
+class AskBatchItem(AskResponse):
+    question: str
+    error: str | None = None
+
+class AskBatchResponse(BaseModel):
+    results: List[AskBatchItem]
 
 @router.post("/", response_model=AskResponse)
-def ask_question(payload: AskRequest):
+async def ask_question(payload: AskRequest):
 
-    result = run_multi_agent(payload.question)
+    result = await run_multi_agent_async(payload.question)
 
     return AskResponse(
         answer=result.get("answer"),
         intent=result.get("intent"),
         metadata_used=result.get("metadata"),
+        cached=result.get("cached", False),
+        cache_match=result.get("cache_match"),
+    )
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _stream_events(question: str):
+    try:
+        async for item in run_multi_agent_stream(question):
+            yield _sse(item["event"], item["data"])
+    except Exception as e:
+        logger.error("ask.stream_failed", error=str(e))
+        yield _sse("error", {"detail": str(e)})
+
+@router.post("/stream")
+async def ask_question_stream(payload: AskRequest):
+    """
+    Server-sent events: progresso do pipeline (risk, plan, retrieval),
+    tokens da resposta (token) e o resultado final (done).
+    """
+    return StreamingResponse(
+        _stream_events(payload.question),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
+
+@router.post("/batch", response_model=AskBatchResponse)
+async def ask_questions_batch(payload: AskBatchRequest):
+    """
+    Várias perguntas de uma vez (ex: o mesmo conjunto de KPIs por empresa),
+    com retrieval em lote e estágios LLM concorrentes.
+    """
+    if not payload.questions:
+        raise HTTPException(status_code=400, detail="Nenhuma pergunta enviada")
+    if len(payload.questions) > settings.ask_batch_max_questions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {settings.ask_batch_max_questions} perguntas por lote",
+        )
+
+    results = await run_multi_agent_batch(payload.questions, payload.concurrency)
+
+    return AskBatchResponse(results=[
+        AskBatchItem(
+            question=question,
+            answer=result.get("answer"),
+            intent=result.get("intent"),
+            metadata_used=result.get("metadata"),
+            cached=result.get("cached", False),
+            cache_match=result.get("cache_match"),
+            error=result.get("error"),
+        )
+        for question, result in zip(payload.questions, results)
+    ])
+
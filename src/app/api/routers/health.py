@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter(tags=["Health"])
+
+
+@router.get("/health")
+def health():
+    """
+    Liveness: o processo está de pé (não depende de Chroma, LLM ou modelos).
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready(request: Request):
+    """
+    Readiness: 200 quando a réplica pode receber tráfego.
+    Com READY_REQUIRES_WARM=true, responde 503 até o warm-up terminar.
+    """
+    context = getattr(request.app.state, "context", None)
+    if context is None:
+        return JSONResponse({"ready": False}, status_code=503)
+    status = context.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@router.post("/warmup")
+async def warmup(request: Request):
+    """
+    Constrói os componentes de WARM_COMPONENTS que ainda faltam e espera terminar.
+    """
+    context = getattr(request.app.state, "context", None)
+    if context is None:
+        return JSONResponse({"ready": False}, status_code=503)
+    return await context.warmup()
@@ -1,113 +1,128 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from pydantic import BaseModel
-from tempfile import NamedTemporaryFile
+import asyncio
+import hashlib
+import uuid
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Query
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Tuple
 
-from src.app.ingestion.pipeline import IngestionPipeline
+from src.app.ingestion.jobs import Job, get_job_queue, get_job_store
 from src.app.config.settings import settings
 from src.app.core.logging import logger
+from src.app.core.registry import get_manifest
+from src.app.core.utils import ensure_dir
 
 router = APIRouter(prefix="/ingest", tags=["Ingest"])
 
-class IngestionResponse(BaseModel):
-    success: bool
-    doc_id: str | None = None
-    n_chunks: int | None = None
-    message: str
-    error: str | None = None
-
-class BatchIngestionResponse(BaseModel):
-    total: int
-    successful: int
-    failed: int
-    results: List[IngestionResponse]
-
-@router.post("/pdf", response_model=IngestionResponse)
-async def upload_pdf(file: UploadFile = File(...)):
+# tamanho de cada bloco copiado do upload para o disco
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+async def _save_upload(file: UploadFile) -> Tuple[Path, str]:
+    """
+    Copia o upload em blocos para data/staged/uploads (memória constante,
+    independente do tamanho do PDF) calculando o SHA-256 durante a cópia.
+    O arquivo persistido permite que o job sobreviva a um restart da API.
+    Só a leitura do upload roda no event loop; disco e hash vão para uma thread.
+    """
+    path = settings.uploads_dir / f"{uuid.uuid4().hex}.pdf"
+    digest = hashlib.sha256()
+
+    def open_upload():
+        ensure_dir(settings.uploads_dir)
+        return path.open("wb")
+
+    def write_block(out, block: bytes) -> None:
+        digest.update(block)
+        out.write(block)
+
+    out = await asyncio.to_thread(open_upload)
+    try:
+        while True:
+            block = await file.read(UPLOAD_CHUNK_SIZE)
+            if not block:
+                break
+            await asyncio.to_thread(write_block, out, block)
+    finally:
+        await asyncio.to_thread(out.close)
+    return path, digest.hexdigest()
+
+def _upload_source(content_id: str, document_key: str | None) -> str:
+    """
+    Chave do documento no manifest. O filename do cliente não identifica o
+    documento (ex: dois "10-K.pdf" de empresas diferentes):
+      - `document_key` explícito → novas versões substituem a anterior
+      - sem chave → cada conteúdo distinto é um documento próprio
+    """
+    if document_key and document_key.strip():
+        return f"key:{document_key.strip()}"
+    return f"upload:{content_id}"
+
+async def _upload_entry(file: UploadFile, document_key: str | None = None) -> Dict:
+    """
+    Entrada do job para um upload. PDFs com bytes idênticos a um documento
+    já ingerido não chegam a ser enfileirados (nem passam pelo Docling).
+    """
+    path, content_id = await _save_upload(file)
+    source = _upload_source(content_id, document_key)
+
+    duplicate = get_manifest().find_by_content_hash(content_id)
+    if duplicate is not None:
+        path.unlink(missing_ok=True)
+        logger.info("ingest_api.duplicate", filename=file.filename, doc_id=duplicate.doc_id, duplicate_of=duplicate.source)
+        return {"filename": file.filename, "content_id": content_id, "source": source, "duplicate_of": duplicate}
+
+    return {"filename": file.filename, "path": str(path), "content_id": content_id, "source": source}
+
+@router.post("/pdf", response_model=Job, status_code=202)
+async def upload_pdf(file: UploadFile = File(...), document_key: str | None = Form(None)):
     """
-    Upload e ingere um PDF diretamente.
-    Retorna ID do documento e número de chunks criados.
+    Recebe um PDF e enfileira a ingestão em background.
+    `document_key` (opcional) identifica o documento entre versões: um novo upload
+    com a mesma chave substitui os chunks da versão anterior.
+    Retorna o job imediatamente; acompanhe em GET /ingest/jobs/{job_id}.
     """
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Arquivo deve ser um PDF")
-    
-    try:
-        pipeline = IngestionPipeline()
-        
-        # Salvar arquivo temporário
-        with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = Path(tmp.name)
-        
-        # Processar PDF
-        logger.info("ingest_api.start", filename=file.filename)
-        pipeline.ingest_pdf(tmp_path)
-        
-        # Limpeza
-        tmp_path.unlink()
-        
-        logger.info("ingest_api.success", filename=file.filename)
-        return IngestionResponse(
-            success=True,
-            message=f"PDF '{file.filename}' ingerido com sucesso"
-        )
-        
-    except Exception as e:
-        logger.error("ingest_api.error", filename=file.filename, error=str(e))
-        return IngestionResponse(
-            success=False,
-            message=f"Erro ao ingerir PDF: {str(e)}",
-            error=str(e)
-        )
-
-@router.post("/batch", response_model=BatchIngestionResponse)
+
+    entry = await _upload_entry(file, document_key)
+    queue = get_job_queue()
+    job_id = queue.submit([entry])
+
+    logger.info("ingest_api.queued", filename=file.filename, job_id=job_id)
+    return queue.store.get(job_id)
+
+@router.post("/batch", response_model=Job, status_code=202)
 async def batch_ingest(files: List[UploadFile] = File(...)):
     """
-    Ingere múltiplos PDFs em lote.
+    Enfileira múltiplos PDFs num único job.
+    Arquivos que não são PDF entram no job já marcados como falhos;
+    duplicatas de documentos já ingeridos entram como concluídas.
     """
-    results = []
-    successful = 0
-    
+    entries: List[Dict] = []
     for file in files:
         if not file.filename.endswith(".pdf"):
-            results.append(IngestionResponse(
-                success=False,
-                message=f"Arquivo {file.filename} não é PDF",
-                error="Invalid file type"
-            ))
+            entries.append({"filename": file.filename, "error": "Invalid file type"})
             continue
-        
-        try:
-            pipeline = IngestionPipeline()
-            
-            with NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                content = await file.read()
-                tmp.write(content)
-                tmp_path = Path(tmp.name)
-            
-            logger.info("ingest_api_batch.start", filename=file.filename)
-            pipeline.ingest_pdf(tmp_path)
-            tmp_path.unlink()
-            
-            results.append(IngestionResponse(
-                success=True,
-                message=f"PDF '{file.filename}' ingerido com sucesso"
-            ))
-            successful += 1
-            
-        except Exception as e:
-            logger.error("ingest_api_batch.error", filename=file.filename, error=str(e))
-            results.append(IngestionResponse(
-                success=False,
-                message=f"Erro ao ingerir '{file.filename}'",
-                error=str(e)
-            ))
-    
-    return BatchIngestionResponse(
-        total=len(files),
-        successful=successful,
-        failed=len(files) - successful,
-        results=results
-    )
+        entries.append(await _upload_entry(file))
+
+    queue = get_job_queue()
+    job_id = queue.submit(entries)
+
+    logger.info("ingest_api_batch.queued", job_id=job_id, n_files=len(entries))
+    return queue.store.get(job_id)
+
+@router.get("/jobs", response_model=List[Job])
+def list_jobs(limit: int = Query(50, ge=1, le=500)):
+    """
+    Jobs de ingestão mais recentes primeiro.
+    """
+    return get_job_store().list_jobs(limit=limit)
+
+@router.get("/jobs/{job_id}", response_model=Job)
+def get_job(job_id: str):
+    """
+    Status do job com estágio, tempos e erro por arquivo.
+    """
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
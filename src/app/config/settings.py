@@ -9,16 +9,135 @@ class Settings(BaseModel):
     raw_dir: Path = data_dir / "raw"
     staged_dir: Path = data_dir / "staged"
     chroma_dir: Path = data_dir / "chroma"
+    manifest_path: Path = data_dir / "manifest.sqlite3"
+    jobs_path: Path = data_dir / "jobs.sqlite3"
+    uploads_dir: Path = staged_dir / "uploads"
 
     # embeddings
     embedding_provider: str = os.getenv("EMBEDDING_PROVIDER", "openai") 
     openai_embedding_model: str = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
 
     local_embedding_model: str = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    # textos por forward do modelo local (lotes do encode)
+    local_embedding_batch_size: int = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+
+    # EMBEDDING_PROVIDER=onnx: mesmo modelo local exportado p/ ONNX (scripts/export_onnx.py)
+    onnx_model_dir: Path = Path(os.getenv("ONNX_MODEL_DIR", str(data_dir / "models" / "all-MiniLM-L6-v2-onnx")))
+    onnx_quantized: bool = os.getenv("ONNX_QUANTIZED", "true").lower() == "true"
+    onnx_intra_op_threads: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = padrão do ONNX Runtime
+    onnx_workers: int = int(os.getenv("ONNX_WORKERS", "1"))
+    onnx_max_length: int = int(os.getenv("ONNX_MAX_LENGTH", "256"))
+
+    # cache persistente de embeddings (content-addressed)
+    embedding_cache_enabled: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    embedding_cache_path: Path = data_dir / "cache" / "embeddings.sqlite3"
+    embedding_cache_max_entries: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+    # cache de respostas do /ask (match exato + semântico)
+    answer_cache_enabled: bool = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+    answer_cache_max_entries: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+    answer_cache_ttl_s: float = float(os.getenv("ANSWER_CACHE_TTL_S", "3600"))
+    answer_cache_similarity: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+    # classificador local de prompt injection (1º estágio do risk_agent)
+    # margem = sim(protótipo malicioso) - sim(protótipo seguro)
+    risk_local_enabled: bool = os.getenv("RISK_LOCAL_ENABLED", "true").lower() == "true"
+    risk_safe_margin: float = float(os.getenv("RISK_SAFE_MARGIN", "-0.10"))
+    risk_block_margin: float = float(os.getenv("RISK_BLOCK_MARGIN", "0.15"))
+    # modelo dos protótipos (margens calibradas p/ o all-MiniLM), independente do
+    # EMBEDDING_PROVIDER: auto = ONNX se exportado, senão sentence-transformers;
+    # onnx/local forçam um deles; none = só padrões, o resto vai ao LLM
+    risk_embedding_provider: str = os.getenv("RISK_EMBEDDING_PROVIDER", "auto")
+    # shadow: o LLM sempre decide e o veredito local só é comparado nos logs
+    risk_shadow_mode: bool = os.getenv("RISK_SHADOW_MODE", "false").lower() == "true"
+
+    # extração local de filtros (o planner LLM só roda abaixo da confiança mínima)
+    orchestrator_local_enabled: bool = os.getenv("ORCHESTRATOR_LOCAL_ENABLED", "true").lower() == "true"
+    orchestrator_local_min_confidence: float = float(os.getenv("ORCHESTRATOR_LOCAL_MIN_CONFIDENCE", "0.8"))
+
+    # planner (intenção + filtros + queries numa única chamada)
+    retrieval_top_k: int = int(os.getenv("RETRIEVAL_TOP_K", "10"))
+    planner_max_top_k: int = int(os.getenv("PLANNER_MAX_TOP_K", "20"))
+
+    # caches do retriever: vetores de queries (LRU) e resultados (por versão da coleção)
+    query_vector_cache_max_entries: int = int(os.getenv("QUERY_VECTOR_CACHE_MAX_ENTRIES", "2048"))
+    retrieval_cache_enabled: bool = os.getenv("RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+    retrieval_cache_max_entries: int = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1024"))
+    retrieval_cache_ttl_s: float = float(os.getenv("RETRIEVAL_CACHE_TTL_S", "300"))
+
+    # /ask/batch: chamadas LLM simultâneas e tamanho máximo do lote
+    ask_batch_concurrency: int = int(os.getenv("ASK_BATCH_CONCURRENCY", "8"))
+    ask_batch_max_questions: int = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "200"))
+
+    # ingestão em lote (scripts/ingest.py)
+    ingest_convert_workers: int = int(os.getenv("INGEST_CONVERT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+    ingest_chunk_workers: int = int(os.getenv("INGEST_CHUNK_WORKERS", "2"))
+    ingest_embed_workers: int = int(os.getenv("INGEST_EMBED_WORKERS", "2"))
+    ingest_queue_size: int = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+    embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+    # fila de ingestão em background da API (/ingest/*)
+    ingest_job_workers: int = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+    ingest_job_convert_workers: int = int(os.getenv("INGEST_JOB_CONVERT_WORKERS", "1"))
+    # arquivo em execução sem heartbeat por mais que isso (worker morto) volta para a fila
+    ingest_job_lease_s: float = float(os.getenv("INGEST_JOB_LEASE_S", "60"))
+
+    # contabilidade de tokens: usage real sempre; estimativa tiktoken é opcional
+    token_estimation_enabled: bool = os.getenv("TOKEN_ESTIMATION_ENABLED", "false").lower() == "true"
+    token_usage_flush_s: float = float(os.getenv("TOKEN_USAGE_FLUSH_S", "60"))
+
+    # LLM de chat (um cliente compartilhado por todos os agentes)
+    openai_chat_model: str = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
+
+    # componentes construídos no startup da API (ver core/registry.py), em background:
+    # a API aceita requests logo após o import; o que não estiver pronto é construído sob demanda
+    warm_on_startup: bool = os.getenv("WARM_ON_STARTUP", "true").lower() == "true"
+    warm_components: list[str] = [
+        c.strip() for c in os.getenv(
+            "WARM_COMPONENTS", "prompts,llm,planner_llm,embeddings,store,manifest,risk_classifier"
+        ).split(",") if c.strip()
+    ]
+    # /ready responde 503 até o warm-up terminar (ex: readiness probe de réplicas novas)
+    ready_requires_warm: bool = os.getenv("READY_REQUIRES_WARM", "false").lower() == "true"
 
     # chroma/hnsw
     chroma_collection: str = os.getenv("CHROMA_COLLECTION", "documents")
 
+    # modo do cliente: "embedded" (PersistentClient em chroma_dir, um processo)
+    # ou "http" (servidor Chroma compartilhado por vários workers/réplicas da API)
+    chroma_mode: str = os.getenv("CHROMA_MODE", "embedded")
+    chroma_host: str = os.getenv("CHROMA_HOST", "localhost")
+    chroma_port: int = int(os.getenv("CHROMA_PORT", "8000"))
+    chroma_ssl: bool = os.getenv("CHROMA_SSL", "false").lower() == "true"
+    chroma_http_timeout_s: float = float(os.getenv("CHROMA_HTTP_TIMEOUT_S", "30"))
+    chroma_http_connect_timeout_s: float = float(os.getenv("CHROMA_HTTP_CONNECT_TIMEOUT_S", "5"))
+    chroma_http_max_connections: int = int(os.getenv("CHROMA_HTTP_MAX_CONNECTIONS", "32"))
+    chroma_http_keepalive_s: float = float(os.getenv("CHROMA_HTTP_KEEPALIVE_S", "40"))
+    chroma_http_retries: int = int(os.getenv("CHROMA_HTTP_RETRIES", "3"))
+    chroma_http_retry_backoff_s: float = float(os.getenv("CHROMA_HTTP_RETRY_BACKOFF_S", "0.2"))
+    chroma_write_batch_size: int = int(os.getenv("CHROMA_WRITE_BATCH_SIZE", "256"))
+    # modo http: versão, lock de rebuild, facetas e BM25 ficam no DATA_DIR local →
+    # uma única instalação (host) por coleção. true = assume a coleção (ex: DATA_DIR
+    # movido para outro host); o dono anterior passa a ser recusado na subida
+    chroma_claim_collection: bool = os.getenv("CHROMA_CLAIM_COLLECTION", "false").lower() == "true"
+
+    # catálogo de facetas da coleção (ao lado do diretório do Chroma)
+    facets_path: Path = data_dir / "facets.sqlite3"
+    facet_fields: list[str] = ["company", "doc_type", "doc_date", "chunk_kind"]
+    # versão da coleção compartilhada entre processos + lock de rebuild dos índices
+    store_state_path: Path = data_dir / "store_state.sqlite3"
+
+    # montagem do contexto do qa_agent (MMR + orçamento de tokens)
+    qa_context_token_budget: int = int(os.getenv("QA_CONTEXT_TOKEN_BUDGET", "3000"))
+    mmr_lambda: float = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+    # escolha do retriever: "vector" (padrão) | "hybrid" (opt-in: exige o índice
+    # lexical BM25, construído a partir da coleção inteira na 1ª subida)
+    retriever: str = os.getenv("RETRIEVER", "vector")
+    bm25_enabled: bool = os.getenv("BM25_ENABLED", "true" if retriever == "hybrid" else "false").lower() == "true"
+    bm25_path: Path = data_dir / "bm25.sqlite3"
+    rrf_k: int = int(os.getenv("RRF_K", "60"))
+
     hnsw_space: str = os.getenv("HNSW_SPACE", "cosine")
     hnsw_ef_construction: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
     hnsw_ef_search: int = int(os.getenv("HNSW_EF_SEARCH", "64"))
@@ -0,0 +1,75 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from src.app.core.logging import get_logger
+from src.app.core.registry import ComponentRegistry
+
+logger = get_logger(__name__)
+
+
+class AppContext:
+    """
+    Estado do processo da API, criado no lifespan do FastAPI.
+
+    Importar a API não constrói nada: prompts, cliente LLM, modelo de
+    embeddings, Chroma etc. vêm do registry na primeira vez em que são usados.
+    O warm-up (opcional) constrói os componentes em background, sem segurar
+    o startup; /ready e /warmup expõem esse estado.
+    """
+
+    def __init__(self, registry: ComponentRegistry, components: List[str], require_warm: bool = False):
+        self.registry = registry
+        self.components = list(components)
+        self.require_warm = require_warm
+        self.started_at = time.perf_counter()
+        self.warm_elapsed_s: Optional[float] = None
+        self._warm_task: Optional[asyncio.Task] = None
+
+    @property
+    def warm(self) -> bool:
+        return all(self.registry.is_built(name) for name in self.components)
+
+    @property
+    def ready(self) -> bool:
+        return self.warm or not self.require_warm
+
+    def start_warmup(self) -> asyncio.Task:
+        """
+        Dispara o warm-up em background (idempotente enquanto estiver rodando).
+        """
+        if self._warm_task is None or self._warm_task.done():
+            self._warm_task = asyncio.create_task(self._warm())
+        return self._warm_task
+
+    async def warmup(self) -> Dict[str, Any]:
+        """
+        Constrói os componentes que faltam e espera terminar.
+        """
+        await asyncio.shield(self.start_warmup())
+        return self.status()
+
+    async def _warm(self) -> None:
+        started = time.perf_counter()
+        # builds bloqueantes (modelo, cliente Chroma...) → threadpool
+        await asyncio.to_thread(self.registry.warm, self.components)
+        self.warm_elapsed_s = round(time.perf_counter() - started, 3)
+        logger.info("app.warm", warm=self.warm, elapsed_s=self.warm_elapsed_s)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warm": self.warm,
+            "warming": self._warm_task is not None and not self._warm_task.done(),
+            "warm_elapsed_s": self.warm_elapsed_s,
+            "uptime_s": round(time.perf_counter() - self.started_at, 3),
+            "components": {name: self.registry.is_built(name) for name in self.components},
+        }
+
+    async def close(self) -> None:
+        if self._warm_task is not None and not self._warm_task.done():
+            self._warm_task.cancel()
+            try:
+                await self._warm_task
+            except asyncio.CancelledError:
+                pass
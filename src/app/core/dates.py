@@ -0,0 +1,94 @@
+import re
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+MONTHS = {
+    m.lower(): i
+    for i, m in enumerate(
+        ["January", "February", "March", "April", "May", "June", "July",
+         "August", "September", "October", "November", "December"],
+        start=1,
+    )
+}
+
+_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+_MONTH_YEAR = re.compile(r"^([A-Za-z]+)\.?\s+(\d{4})$")
+_QUARTER_YEAR = re.compile(r"^Q([1-4])\s*(\d{4})$", flags=re.IGNORECASE)
+_YEAR_QUARTER = re.compile(r"^(\d{4})\s*Q([1-4])$", flags=re.IGNORECASE)
+_YEAR = re.compile(r"^(\d{4})$")
+
+# um período é [início, fim) em epoch (segundos, UTC)
+Period = Tuple[int, int]
+
+# doc_epoch de documentos sem data reconhecível: o Chroma não tem $exists,
+# então os filtros de data precisam de um valor concreto para mantê-los ($or)
+UNDATED_EPOCH = -1
+
+
+def _epoch(year: int, month: int = 1, day: int = 1) -> int:
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+
+
+def _next_month(year: int, month: int) -> Tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def date_period(value: str | None) -> Optional[Period]:
+    """
+    Converte os formatos de data usados na ingestão em um período:
+      - "2024-12-11"    → o dia
+      - "December 2024" → o mês
+      - "Q32024" / "Q3 2024" / "2024Q3" → o trimestre
+      - "2024"          → o ano
+    Retorna None se não reconhecer o formato.
+    """
+    if not value:
+        return None
+    text = str(value).strip()
+
+    m = _ISO.match(text)
+    if m:
+        year, month, day = (int(g) for g in m.groups())
+        try:
+            start = _epoch(year, month, day)
+        except ValueError:
+            return None
+        return start, start + 86400
+
+    m = _MONTH_YEAR.match(text)
+    if m and m.group(1).lower() in MONTHS:
+        year, month = int(m.group(2)), MONTHS[m.group(1).lower()]
+        return _epoch(year, month), _epoch(*_next_month(year, month))
+
+    m = _QUARTER_YEAR.match(text) or _YEAR_QUARTER.match(text)
+    if m:
+        groups = m.groups()
+        quarter, year = (int(groups[0]), int(groups[1])) if m.re is _QUARTER_YEAR else (int(groups[1]), int(groups[0]))
+        month = 3 * (quarter - 1) + 1
+        end = _epoch(year + 1) if quarter == 4 else _epoch(year, month + 3)
+        return _epoch(year, month), end
+
+    m = _YEAR.match(text)
+    if m:
+        year = int(m.group(1))
+        return _epoch(year), _epoch(year + 1)
+
+    return None
+
+
+def date_fields(value: str | None) -> Dict[str, int]:
+    """
+    Campos numéricos ordenáveis derivados de doc_date, gravados na metadata
+    dos chunks para permitir filtros $gte/$lte no Chroma:
+      doc_year, doc_quarter (só se determinável) e doc_epoch (início do período;
+      UNDATED_EPOCH quando a data não é reconhecida).
+    """
+    period = date_period(value)
+    if period is None:
+        return {"doc_epoch": UNDATED_EPOCH}
+    start = datetime.fromtimestamp(period[0], tz=timezone.utc)
+    fields = {"doc_year": start.year, "doc_epoch": period[0]}
+    # um ano inteiro não pertence a um trimestre
+    if period[1] - period[0] < 100 * 86400:
+        fields["doc_quarter"] = (start.month - 1) // 3 + 1
+    return fields
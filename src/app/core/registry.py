@@ -0,0 +1,291 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable
+
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# relativo à raiz do repositório (cwd da API e dos scripts)
+PROMPTS_PATH = "src/app/prompts/prompts.yml"
+
+
+class ComponentRegistry:
+    """
+    Registro de componentes pesados do processo (modelo de embeddings,
+    cliente Chroma, conversor Docling...).
+
+    Cada componente é construído uma única vez, sob demanda ou no warm-up,
+    e compartilhado entre requests/threads.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks[name] = threading.Lock()
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Componente não registrado: {name}")
+
+        # lock por componente: um build lento não bloqueia os demais
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                started = time.perf_counter()
+                instance = self._factories[name]()
+                self._instances[name] = instance
+                logger.info("registry.built", component=name, elapsed_s=round(time.perf_counter() - started, 3))
+        return instance
+
+    def warm(self, names: Iterable[str]) -> None:
+        """
+        Constrói antecipadamente os componentes (ex: no startup da API).
+        Falhas são logadas e o componente volta a ser construído sob demanda.
+        """
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error("registry.warm_failed", component=name, error=str(e))
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+
+def _build_document_converter():
+    try:
+        from docling.document_converter import DocumentConverter  # type: ignore
+    except Exception as e:
+        raise RuntimeError("Docling não disponível. Instale e valide a API do seu ambiente.") from e
+
+    converter = DocumentConverter()  # configure conforme necessário, sem OCR
+
+    # carrega os modelos de layout agora, e não na primeira conversão
+    initialize = getattr(converter, "initialize_pipeline", None)
+    if initialize is not None:
+        from docling.datamodel.base_models import InputFormat  # type: ignore
+        initialize(InputFormat.PDF)
+    return converter
+
+
+def _build_embeddings():
+    from src.app.storage.embeddings import build_embeddings
+    return build_embeddings()
+
+
+def _build_store():
+    from src.app.storage.chroma_store import ChromaHnswStore
+    return ChromaHnswStore()
+
+
+def _build_manifest():
+    from src.app.config.settings import settings
+    from src.app.ingestion.manifest import DocumentManifest
+    return DocumentManifest(settings.manifest_path)
+
+
+def _build_answer_cache():
+    from src.app.agents.answer_cache import AnswerCache
+    from src.app.config.settings import settings
+    from src.app.ingestion.pipeline import add_write_listener
+
+    cache = AnswerCache(
+        get_embeddings(),
+        max_entries=settings.answer_cache_max_entries,
+        ttl_s=settings.answer_cache_ttl_s,
+        threshold=settings.answer_cache_similarity,
+        # match semântico só entre perguntas com as mesmas entidades/períodos
+        signature_fn=lambda question: get_filter_extractor().signature(question),
+        # escritas de outros processos (versão compartilhada do store) descartam o cache
+        foreign_writes_fn=lambda: get_store().state.foreign_writes(),
+    )
+    # documentos gravados pela ingestão deste processo invalidam respostas afetadas
+    add_write_listener(cache.invalidate)
+    return cache
+
+
+def _build_prompts():
+    import yaml
+
+    with open(PROMPTS_PATH, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def _build_llm():
+    # langchain_openai (~1.7s de import) só é carregado aqui
+    from langchain_openai import ChatOpenAI
+    from src.app.config.settings import settings
+
+    return ChatOpenAI(model=settings.openai_chat_model, temperature=0)
+
+
+def _build_planner_llm():
+    from src.app.agents.planner import RetrievalPlan
+
+    # structured output com JSON schema estrito, validado pelo pydantic
+    # (include_raw: a mensagem bruta traz o usage real de tokens)
+    return get_llm().with_structured_output(
+        RetrievalPlan, method="json_schema", strict=True, include_raw=True
+    )
+
+
+def _build_risk_classifier():
+    from src.app.agents.risk_classifier import LocalRiskClassifier
+    from src.app.config.settings import settings
+
+    prototypes = get_prompts()["risk_classifier"]
+
+    # protótipos embedados com o all-MiniLM local (CPU), em que as margens foram
+    # calibradas. Se o índice já usa esse modelo, reaproveita o provider; com
+    # provider remoto (openai) carrega o modelo local só para o classificador.
+    # RISK_EMBEDDING_PROVIDER=none deixa só a camada de padrões (resto vai ao LLM)
+    risk_provider = settings.risk_embedding_provider.lower()
+    embeddings = None
+    if risk_provider == "none":
+        logger.info("risk_classifier.semantic_disabled", provider=risk_provider)
+    else:
+        try:
+            index_provider = settings.embedding_provider.lower()
+            if index_provider in ("local", "onnx") and risk_provider in ("auto", index_provider):
+                embeddings = get_embeddings()
+            else:
+                from src.app.storage.embeddings import build_local_embeddings
+                embeddings = build_local_embeddings(risk_provider)
+        except Exception as e:
+            logger.error("risk_classifier.embeddings_unavailable", provider=risk_provider, error=str(e))
+
+    return LocalRiskClassifier(
+        embeddings,
+        safe_prototypes=prototypes["safe"],
+        malicious_prototypes=prototypes["malicious"],
+        safe_margin=settings.risk_safe_margin,
+        block_margin=settings.risk_block_margin,
+    )
+
+
+def _build_retriever():
+    from src.app.config.settings import settings
+    from src.app.retrieval.retrieval_cache import QueryVectorCache, RetrievalResultCache
+
+    caches = {
+        "query_cache": (
+            QueryVectorCache(settings.query_vector_cache_max_entries)
+            if settings.query_vector_cache_max_entries > 0 else None
+        ),
+        "result_cache": (
+            RetrievalResultCache(settings.retrieval_cache_max_entries, settings.retrieval_cache_ttl_s)
+            if settings.retrieval_cache_enabled else None
+        ),
+    }
+    if settings.retriever == "hybrid":
+        from src.app.retrieval.hybrid_retriever import HybridRetriever
+        return HybridRetriever(get_store(), get_embeddings(), rrf_k=settings.rrf_k, **caches)
+    if settings.retriever == "vector":
+        from src.app.retrieval.chroma_retriever import ChromaRetriever
+        return ChromaRetriever(get_store(), get_embeddings(), **caches)
+    raise ValueError(f"Retriever não suportado: {settings.retriever}")
+
+
+def _build_context_packer():
+    from src.app.config.settings import settings
+    from src.app.core.token_logger import get_encoding
+    from src.app.retrieval.context_packer import ContextPacker
+
+    return ContextPacker(
+        get_encoding(),
+        token_budget=settings.qa_context_token_budget,
+        mmr_lambda=settings.mmr_lambda,
+    )
+
+
+def _build_filter_extractor():
+    from src.app.agents.filter_extractor import LocalFilterExtractor
+    return LocalFilterExtractor(get_store())
+
+
+def _build_ingestion_pipeline():
+    from src.app.ingestion.pipeline import IngestionPipeline
+    return IngestionPipeline()
+
+
+registry = ComponentRegistry()
+registry.register("prompts", _build_prompts)
+registry.register("llm", _build_llm)
+registry.register("planner_llm", _build_planner_llm)
+registry.register("document_converter", _build_document_converter)
+registry.register("embeddings", _build_embeddings)
+registry.register("store", _build_store)
+registry.register("manifest", _build_manifest)
+registry.register("ingestion_pipeline", _build_ingestion_pipeline)
+registry.register("answer_cache", _build_answer_cache)
+registry.register("risk_classifier", _build_risk_classifier)
+registry.register("filter_extractor", _build_filter_extractor)
+registry.register("retriever", _build_retriever)
+registry.register("context_packer", _build_context_packer)
+
+
+def get_prompts():
+    return registry.get("prompts")
+
+def get_llm():
+    """
+    Cliente ChatOpenAI único do processo, compartilhado por todos os agentes
+    (mesmo pool de conexões HTTP).
+    """
+    return registry.get("llm")
+
+def get_planner_llm():
+    return registry.get("planner_llm")
+
+def get_document_converter():
+    return registry.get("document_converter")
+
+def get_embeddings():
+    return registry.get("embeddings")
+
+def get_store():
+    return registry.get("store")
+
+def get_manifest():
+    return registry.get("manifest")
+
+def get_ingestion_pipeline():
+    return registry.get("ingestion_pipeline")
+
+def get_risk_classifier():
+    return registry.get("risk_classifier")
+
+def get_retriever():
+    return registry.get("retriever")
+
+def get_context_packer():
+    return registry.get("context_packer")
+
+def get_filter_extractor():
+    return registry.get("filter_extractor")
+
+def get_answer_cache():
+    from src.app.config.settings import settings
+    if not settings.answer_cache_enabled:
+        return None
+    return registry.get("answer_cache")
+
+
+def warm_document_converter() -> None:
+    """
+    Initializer dos process pools de conversão: cada processo carrega
+    os modelos do Docling uma vez, ao subir.
+    """
+    registry.warm(["document_converter"])
@@ -1,21 +1,163 @@
+import threading
 import time
 import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Optional
 import structlog
-import tiktoken
+
+from src.app.config.settings import settings
+from src.app.core.metrics import TOKENS
 
 logger = structlog.get_logger()
 
+# id do request atual (propagado para tasks asyncio e asyncio.to_thread)
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+
+USAGE_KEYS = ("calls", "prompt_tokens", "completion_tokens", "total_tokens")
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str = "gpt-4o-mini"):
+    """
+    Encoding do tiktoken, carregado uma vez por modelo no processo.
+    """
+    import tiktoken
+    return tiktoken.encoding_for_model(model_name)
+
+
+def _empty_usage() -> Dict[str, int]:
+    return {k: 0 for k in USAGE_KEYS}
+
+
+def _add(target: Dict[str, int], usage: Dict[str, int]) -> None:
+    for k in USAGE_KEYS:
+        target[k] += usage.get(k, 0)
+
+
+class TokenAccountant:
+    """
+    Totais de tokens reais (usage das respostas do LLM) em memória:
+      - por agente: acumulado do processo + janela desde o último flush
+      - por request: enquanto o request está aberto (track_request)
+    Um thread daemon faz o flush periódico da janela para o log.
+    """
+
+    def __init__(self, flush_interval_s: float = 60.0):
+        self.flush_interval_s = flush_interval_s
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._window: Dict[str, Dict[str, int]] = {}
+        self._requests: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, agent: str, usage: Dict[str, int], request_id: Optional[str] = None) -> None:
+        usage = {**usage, "calls": 1}
+        TOKENS.inc(usage.get("prompt_tokens", 0), agent=agent, kind="prompt")
+        TOKENS.inc(usage.get("completion_tokens", 0), agent=agent, kind="completion")
+        with self._lock:
+            _add(self._totals.setdefault(agent, _empty_usage()), usage)
+            _add(self._window.setdefault(agent, _empty_usage()), usage)
+            if request_id is not None and request_id in self._requests:
+                _add(self._requests[request_id].setdefault(agent, _empty_usage()), usage)
+        self._ensure_flusher()
+
+    def begin_request(self, request_id: str) -> None:
+        with self._lock:
+            self._requests[request_id] = {}
+
+    def end_request(self, request_id: str) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            per_agent = self._requests.pop(request_id, {})
+        total = _empty_usage()
+        for usage in per_agent.values():
+            _add(total, usage)
+        if per_agent:
+            logger.info("token_usage.request", request_id=request_id, agents=per_agent, **total)
+        return per_agent
+
+    def totals(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {agent: dict(usage) for agent, usage in self._totals.items()}
+
+    def flush(self) -> None:
+        with self._lock:
+            window, self._window = self._window, {}
+        if window:
+            logger.info("token_usage.flush", agents=window)
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None or self.flush_interval_s <= 0:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name="token-usage-flush", daemon=True)
+                self._flusher.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval_s):
+            self.flush()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.flush()
+
+
+accountant = TokenAccountant(flush_interval_s=settings.token_usage_flush_s)
+
+
+@contextmanager
+def track_request(request_id: Optional[str] = None):
+    """
+    Abre a contabilidade de tokens de um request (ex: uma chamada ao /ask).
+    """
+    request_id = request_id or str(uuid.uuid4())
+    accountant.begin_request(request_id)
+    token = current_request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        current_request_id.reset(token)
+        accountant.end_request(request_id)
+
+
+def usage_from_response(response: Any) -> Optional[Dict[str, int]]:
+    """
+    Usage real de uma resposta do LangChain (AIMessage):
+    usage_metadata (input/output_tokens) ou response_metadata["token_usage"].
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return {
+            "prompt_tokens": usage.get("input_tokens", 0),
+            "completion_tokens": usage.get("output_tokens", 0),
+            "total_tokens": usage.get("total_tokens", 0),
+        }
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+    if token_usage:
+        return {k: token_usage.get(k, 0) for k in ("prompt_tokens", "completion_tokens", "total_tokens")}
+    return None
+
+
 class TokenEstimator:
     """
-    Estimador de tokens baseado em TikToken.
-    Usa prompt_tokens estimados antes da chamada real ao LLM.
-    completion_tokens é sempre 0 (estimado).
+    Contabilidade de tokens de um agente.
+    - record_usage: usage real lido da resposta do LLM (sempre)
+    - log_estimated / log_text_estimated: estimativa via TikToken antes da
+      chamada, só se TOKEN_ESTIMATION_ENABLED (evita tokenizar contextos
+      grandes no caminho quente). completion_tokens é sempre 0 na estimativa.
     """
 
     def __init__(self, agent_name: str, model_name: str = "gpt-4o-mini"):
         self.agent_name = agent_name
+        self.model_name = model_name
         self.trace_id = str(uuid.uuid4())
-        self.encoding = tiktoken.encoding_for_model(model_name)
+        self.started = time.perf_counter()
+
+    @property
+    def encoding(self):
+        return get_encoding(self.model_name)
 
     def count_tokens(self, messages) -> int:
         """
@@ -28,12 +170,7 @@ class TokenEstimator:
             total_tokens += len(self.encoding.encode(msg["role"]))
         return total_tokens
 
-    def log_estimated(self, messages):
-        """
-        Calcula tokens estimados e loga antes da chamada real ao modelo.
-        """
-        prompt_tokens = self.count_tokens(messages)
-
+    def _log_estimate(self, prompt_tokens: int) -> int:
         logger.info(
             "agent_llm_call_estimated",
             trace_id=self.trace_id,
@@ -42,22 +179,39 @@ class TokenEstimator:
             completion_tokens=0,
             total_tokens=prompt_tokens,
         )
-
         return prompt_tokens
 
+    def log_estimated(self, messages):
+        """
+        Calcula tokens estimados e loga antes da chamada real ao modelo.
+        """
+        if not settings.token_estimation_enabled:
+            return None
+        return self._log_estimate(self.count_tokens(messages))
+
     def log_text_estimated(self, text: str):
         """
         Estima tokens de um texto simples (compatível com agent calls).
         """
-        prompt_tokens = len(self.encoding.encode(text))
+        if not settings.token_estimation_enabled:
+            return None
+        return self._log_estimate(len(self.encoding.encode(text)))
 
+    def record_usage(self, response) -> Optional[Dict[str, int]]:
+        """
+        Registra o usage real da resposta do LLM (por agente e por request).
+        """
+        usage = usage_from_response(response)
+        if usage is None:
+            return None
+        request_id = current_request_id.get()
+        accountant.record(self.agent_name, usage, request_id)
         logger.info(
-            "agent_llm_call_estimated",
+            "agent_llm_call",
             trace_id=self.trace_id,
+            request_id=request_id,
             agent=self.agent_name,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=0,
-            total_tokens=prompt_tokens,
+            elapsed_ms=round((time.perf_counter() - self.started) * 1000, 1),
+            **usage,
         )
-
-        return prompt_tokens
+        return usage
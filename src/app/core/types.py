@@ -3,10 +3,15 @@ from typing import Literal, List, Optional, Dict
 
 class DocumentMeta(BaseModel):
     doc_id: str
+    content_id: Optional[str] = None  # sha256 do PDF (ID baseado no conteúdo)
     source_path: str
     company: Optional[str] = None
     doc_type: Optional[str] = None
     doc_date: Optional[str] = None  # ISO string quando possível
+    # campos numéricos derivados de doc_date (filtros por intervalo)
+    doc_year: Optional[int] = None
+    doc_quarter: Optional[int] = None
+    doc_epoch: Optional[int] = None  # início do período, em segundos UTC
     extra: Dict[str, str] = Field(default_factory=dict)
 
 class Chunk(BaseModel):
@@ -16,4 +21,14 @@ class Chunk(BaseModel):
     chunk_kind: Literal["text", "table"] = "text"
     section_path: List[str] = Field(default_factory=list)
     order: int = 0
-    metadata: Dict[str, str] = Field(default_factory=dict)
+    metadata: Dict[str, str | int] = Field(default_factory=dict)
+
+class IngestResult(BaseModel):
+    doc_id: str
+    content_id: Optional[str] = None
+    source: str
+    n_chunks: int = 0
+    skipped: bool = False      # documento sem alterações desde a última ingestão
+    n_added: int = 0
+    n_updated: int = 0         # chunks mantidos cuja metadata mudou (ex: order)
+    n_deleted: int = 0         # chunks órfãos removidos do índice
@@ -1,6 +1,9 @@
 import hashlib
+import re
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+from src.app.core.dates import UNDATED_EPOCH, date_period
 
 def sha1_text(text: str) -> str:
     return hashlib.sha1(text.encode("utf-8")).hexdigest()
@@ -11,52 +14,173 @@ def stable_doc_id(path: Path) -> str:
     payload = f"{path.name}|{stat.st_size}|{int(stat.st_mtime)}"
     return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    # hash do conteúdo lido em blocos (memória constante)
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
 def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
+# filtros de igualdade aceitos → campo na metadata do chunk
+EQUALITY_FIELDS = {
+    "company": "company",
+    "doc_type": "doc_type",
+    "chunk_kind": "chunk_kind",
+    "section": "section_path",
+}
+
+def _is_empty(value: Any) -> bool:
+    return value in (None, "", "null", [], {})
+
+def _canonical_doc_type(value: str) -> str | None:
+    # "10-Q" → "10-Q Filing" (mesmo vocabulário da ingestão); desconhecido → None
+    from src.app.ingestion.metadata import DOC_TYPE_HINTS
+
+    wanted = value.strip().lower()
+    for key, dtype in DOC_TYPE_HINTS:
+        if wanted in (key.lower(), dtype.lower()):
+            return dtype
+    return None
+
+def _equality(field: str, value: Any) -> Dict[str, Any] | None:
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    values = [str(v).strip() for v in values if not _is_empty(v)]
+    if field == "doc_type":
+        values = [v for v in map(_canonical_doc_type, values) if v]
+    values = list(dict.fromkeys(values))
+    if not values:
+        return None
+    if len(values) == 1:
+        return {field: {"$eq": values[0]}}
+    return {field: {"$in": values}}
+
+def _quarter(value: Any) -> int | None:
+    m = re.search(r"[1-4]", str(value or ""))
+    return int(m.group(0)) if m else None
+
+def _date_conditions(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    doc_date / quarter / date_from / date_to → intervalos sobre doc_epoch
+    (e doc_quarter quando só o trimestre é conhecido). Chunks sem data
+    (doc_epoch = UNDATED_EPOCH) continuam elegíveis via $or.
+    """
+    conditions = _date_ranges(filters)
+    if not conditions:
+        return []
+    return [{"$or": [_combine(conditions, "$and"), {"doc_epoch": {"$eq": UNDATED_EPOCH}}]}]
+
+def _date_ranges(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    conditions: List[Dict[str, Any]] = []
+    doc_date = None if _is_empty(filters.get("doc_date")) else str(filters["doc_date"]).strip()
+    quarter = _quarter(filters.get("quarter"))
+
+    # "2024" + "Q3" → Q3 2024
+    if quarter and doc_date and re.fullmatch(r"\d{4}", doc_date):
+        doc_date = f"Q{quarter}{doc_date}"
+    period = date_period(doc_date)
+    if period:
+        conditions += [{"doc_epoch": {"$gte": period[0]}}, {"doc_epoch": {"$lt": period[1]}}]
+    elif quarter:
+        conditions.append({"doc_quarter": {"$eq": quarter}})
+
+    date_from = date_period(filters.get("date_from"))
+    if date_from:
+        conditions.append({"doc_epoch": {"$gte": date_from[0]}})
+    date_to = date_period(filters.get("date_to"))
+    if date_to:
+        conditions.append({"doc_epoch": {"$lt": date_to[1]}})
+    return conditions
+
+def _combine(conditions: List[Dict[str, Any]], operator: str) -> Dict[str, Any]:
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {operator: conditions}
+
 def sanitize_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Chroma (v0.5+) só permite um filtro por operação.
-    Prioridade:
-      1. Se existir 'company', use somente ela.
-      2. Se não existir 'company', use o primeiro filtro válido.
-      3. Se nada existir, return {}.
+    Converte os filtros do planner num `where` composto do Chroma:
+      - company, doc_type, chunk_kind, section → $eq (ou $in para listas)
+      - doc_date, quarter, date_from, date_to  → $gte/$lt sobre doc_epoch
+        (campos numéricos gravados na ingestão, ver core/dates.py)
+      - "$or": [filtros, ...]                   → $or dos filtros sanitizados
+    Tudo combinado com $and. Valores vazios ou desconhecidos são ignorados;
+    sem nada válido, return {}.
+
+    `section_path` (lista de dicas de seção do planner) não vira filtro:
+    é só uma pista semântica e um $eq exato zeraria o recall.
     """
+    conditions: List[Dict[str, Any]] = []
 
-    # Remover valores inválidos
-    cleaned = {k: v for k, v in filters.items() if v not in (None, "", [], {})}
+    for key, field in EQUALITY_FIELDS.items():
+        if not _is_empty(filters.get(key)):
+            condition = _equality(field, filters[key])
+            if condition:
+                conditions.append(condition)
 
-    # Caso 1: company tem prioridade
-    if "company" in cleaned:
-        return {"company": {"$eq": cleaned["company"]}}
+    conditions += _date_conditions(filters)
 
-    # Caso 3: sem filtros
-    return {}
+    alternatives = [sanitize_filters(f) for f in filters.get("$or") or [] if isinstance(f, dict)]
+    alternatives = [a for a in alternatives if a]
+    # um ramo vazio do $or casaria com tudo → o $or não restringe nada
+    if alternatives and len(alternatives) == len(filters["$or"]):
+        conditions.append(_combine(alternatives, "$or"))
 
+    return _combine(conditions, "$and")
 
-def get_unique_companies(store):
+
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$gt": lambda value, arg: value > arg,
+    "$gte": lambda value, arg: value >= arg,
+    "$lt": lambda value, arg: value < arg,
+    "$lte": lambda value, arg: value <= arg,
+}
+
+def matches_where(where: Dict[str, Any], metadata: Dict[str, Any]) -> bool:
     """
-    Percorre toda a coleção e retorna uma lista de companies únicos.
+    Avalia um `where` do Chroma (ex: saída de sanitize_filters) contra uma metadata.
+    Campos ausentes na metadata não excluem: na dúvida, casa (uso conservador,
+    ex: invalidação de cache).
     """
-    results = store.collection.get(include=["metadatas"])
-    companies = set()
+    for key, condition in (where or {}).items():
+        if key == "$and":
+            ok = all(matches_where(c, metadata) for c in condition)
+        elif key == "$or":
+            ok = any(matches_where(c, metadata) for c in condition)
+        else:
+            value = metadata.get(key)
+            if value is None:
+                continue
+            ok = all(_OPERATORS[op](value, arg) for op, arg in condition.items() if op in _OPERATORS)
+        if not ok:
+            return False
+    return True
 
-    for meta in results["metadatas"]:
-        if "company" in meta and meta["company"]:
-            companies.add(meta["company"])
 
-    return sorted(list(companies))
+def get_unique_companies(store):
+    """
+    Companies distintas da coleção, lidas do catálogo de facetas do store (O(1)).
+    """
+    return store.facets.values("company")
 
 def get_metadata_fields(store):
     """
-    Coleta todas as chaves de metadados encontrados na coleção.
+    Chaves de metadados encontradas na coleção, lidas do catálogo de facetas.
     """
-    results = store.collection.get(include=["metadatas"])
-    keys = set()
-
-    for meta in results["metadatas"]:
-        keys |= set(meta.keys())
-
-    return sorted(list(keys))
+    return store.facets.keys()
 
+def get_facet_counts(store, field: str) -> Dict[str, int]:
+    """
+    Valores distintos de um campo (company, doc_type, doc_date, chunk_kind) e suas contagens.
+    """
+    return store.facets.counts(field)
@@ -0,0 +1,280 @@
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.app.core.logging import logger
+from src.app.core.registry import warm_document_converter
+from src.app.core.types import IngestResult
+from src.app.ingestion.pdf_to_md import convert_pdf
+from src.app.ingestion.pipeline import IngestionPipeline
+
+# marcador de fim de fila
+_DONE = object()
+
+# tentativas no pool compartilhado antes da conversão isolada
+SHARED_CONVERT_ATTEMPTS = 2
+
+
+class BulkReport(BaseModel):
+    total: int = 0
+    ingested: int = 0
+    skipped: int = 0
+    failed: int = 0
+    n_chunks: int = 0
+    elapsed_s: float = 0.0
+    results: List[IngestResult] = Field(default_factory=list)
+    errors: Dict[str, str] = Field(default_factory=dict)  # source → erro
+
+
+class _Progress:
+    """
+    Contabiliza documentos concluídos e loga progresso/throughput.
+    """
+
+    def __init__(self, total: int):
+        self.report = BulkReport(total=total)
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _log(self) -> None:
+        r = self.report
+        elapsed = time.perf_counter() - self.started
+        done = r.ingested + r.skipped + r.failed
+        logger.info(
+            "bulk_ingest.progress",
+            done=done,
+            total=r.total,
+            ingested=r.ingested,
+            skipped=r.skipped,
+            failed=r.failed,
+            docs_per_s=round(done / elapsed, 3) if elapsed else 0.0,
+            chunks_per_s=round(r.n_chunks / elapsed, 1) if elapsed else 0.0,
+        )
+
+    def ok(self, result: IngestResult) -> None:
+        with self._lock:
+            self.report.results.append(result)
+            if result.skipped:
+                self.report.skipped += 1
+            else:
+                self.report.ingested += 1
+                self.report.n_chunks += result.n_added
+            self._log()
+
+    def fail(self, source: str, stage: str, error: Exception) -> None:
+        with self._lock:
+            self.report.failed += 1
+            self.report.errors[source] = f"{stage}: {error}"
+            logger.error("bulk_ingest.failed", source=source, stage=stage, error=str(error))
+            self._log()
+
+    def finish(self) -> BulkReport:
+        self.report.elapsed_s = round(time.perf_counter() - self.started, 2)
+        self._log()
+        return self.report
+
+
+class _ConvertPool:
+    """
+    Process pool da conversão Docling que sobrevive à queda de um processo
+    (OOM, segfault): o pool quebrado é recriado e os arquivos em voo são
+    reenviados. Todos os futures em voo quebram juntos, então não dá para saber
+    o culpado: após SHARED_CONVERT_ATTEMPTS quedas, o arquivo é convertido
+    sozinho num processo próprio, e só uma queda ali o marca como falho.
+    """
+
+    def __init__(self, workers: int, out_dir: str):
+        self.workers = workers
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self._isolated_lock = threading.Lock()
+        self._pool = self._new_pool(workers)
+
+    @staticmethod
+    def _new_pool(workers: int) -> ProcessPoolExecutor:
+        # "spawn": os processos são criados sob demanda a partir da thread de feed,
+        # com as threads de chunk/embed já rodando (fork com threads é inseguro)
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_document_converter,
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        # só o primeiro a perceber recria
+        with self._lock:
+            if self._pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._new_pool(self.workers)
+        logger.warning("bulk_ingest.pool_restarted")
+
+    def submit(self, pdf: Path) -> Tuple[ProcessPoolExecutor, Future]:
+        while True:
+            with self._lock:
+                pool = self._pool
+            try:
+                return pool, pool.submit(convert_pdf, str(pdf), self.out_dir)
+            except BrokenProcessPool:
+                self._restart(pool)
+
+    def result(self, pdf: Path, submitted: Tuple[ProcessPoolExecutor, Future]) -> str:
+        pool, future = submitted
+        for attempt in range(1, SHARED_CONVERT_ATTEMPTS + 1):
+            try:
+                return future.result()
+            except (BrokenProcessPool, CancelledError):
+                self._restart(pool)
+                logger.warning("bulk_ingest.convert_retry", pdf=pdf.name, attempt=attempt)
+                if attempt < SHARED_CONVERT_ATTEMPTS:
+                    pool, future = self.submit(pdf)
+        return self._convert_isolated(pdf)
+
+    def _convert_isolated(self, pdf: Path) -> str:
+        # um suspeito por vez, num processo só dele: uma queda aqui é do próprio arquivo
+        with self._isolated_lock:
+            with self._new_pool(1) as pool:
+                return pool.submit(convert_pdf, str(pdf), self.out_dir).result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._pool.shutdown(wait=True)
+
+
+class BulkIngestor:
+    """
+    Ingestão em lote com estágios em paralelo e filas limitadas:
+
+        check (manifest) → conversão Docling (process pool)
+            → chunking + metadata (threads) → embeddings em lotes (threads)
+            → writer único (Chroma + manifest)
+
+    Falha em um documento é registrada e não interrompe os demais, inclusive
+    a queda de um processo de conversão (ver _ConvertPool).
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        convert_workers: int = 2,
+        chunk_workers: int = 2,
+        embed_workers: int = 2,
+        embed_batch_size: int = 64,
+        queue_size: int = 8,
+    ):
+        self.pipeline = pipeline
+        self.convert_workers = max(1, convert_workers)
+        self.chunk_workers = max(1, chunk_workers)
+        self.embed_workers = max(1, embed_workers)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.queue_size = max(1, queue_size)
+
+    def run(self, pdfs: List[Path], force: bool = False) -> BulkReport:
+        progress = _Progress(total=len(pdfs))
+        logger.info(
+            "bulk_ingest.start",
+            total=len(pdfs),
+            convert_workers=self.convert_workers,
+            chunk_workers=self.chunk_workers,
+            embed_workers=self.embed_workers,
+            embed_batch_size=self.embed_batch_size,
+        )
+
+        convert_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        embed_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        write_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+
+        converter = _ConvertPool(self.convert_workers, str(self.pipeline.converter.out_dir))
+
+        def feed() -> None:
+            try:
+                for pdf in pdfs:
+                    try:
+                        check = self.pipeline.check(pdf, force=force)
+                    except Exception as e:
+                        progress.fail(pdf.name, "check", e)
+                        continue
+                    if check.skipped:
+                        progress.ok(check.skipped)
+                        continue
+                    try:
+                        submitted = converter.submit(pdf)
+                    except Exception as e:
+                        progress.fail(check.source, "convert", e)
+                        continue
+                    # fila limitada → no máximo `queue_size` conversões em voo
+                    convert_q.put((check, submitted))
+            finally:
+                # sempre libera os estágios seguintes, mesmo se o feed quebrar
+                for _ in range(self.chunk_workers):
+                    convert_q.put(_DONE)
+
+        def chunk_stage() -> None:
+            while True:
+                item = convert_q.get()
+                if item is _DONE:
+                    break
+                check, submitted = item
+                try:
+                    md_text = Path(converter.result(check.pdf_path, submitted)).read_text(encoding="utf-8")
+                except Exception as e:
+                    progress.fail(check.source, "convert", e)
+                    continue
+                try:
+                    embed_q.put(self.pipeline.plan(check, md_text))
+                except Exception as e:
+                    progress.fail(check.source, "chunk", e)
+
+        def embed_stage() -> None:
+            while True:
+                plan = embed_q.get()
+                if plan is _DONE:
+                    break
+                try:
+                    write_q.put((plan, self.pipeline.embed(plan, self.embed_batch_size)))
+                except Exception as e:
+                    progress.fail(plan.check.source, "embed", e)
+
+        def write_stage() -> None:
+            while True:
+                item = write_q.get()
+                if item is _DONE:
+                    break
+                plan, vectors = item
+                try:
+                    progress.ok(self.pipeline.apply(plan, vectors))
+                except Exception as e:
+                    progress.fail(plan.check.source, "write", e)
+
+        try:
+            feeder = threading.Thread(target=feed, name="bulk-feed")
+            chunkers = [threading.Thread(target=chunk_stage, name=f"bulk-chunk-{i}") for i in range(self.chunk_workers)]
+            embedders = [threading.Thread(target=embed_stage, name=f"bulk-embed-{i}") for i in range(self.embed_workers)]
+            writer = threading.Thread(target=write_stage, name="bulk-write")
+
+            for t in [feeder, *chunkers, *embedders, writer]:
+                t.start()
+
+            # encerramento em cascata: cada estágio termina e sinaliza o próximo
+            feeder.join()
+            for t in chunkers:
+                t.join()
+            for _ in embedders:
+                embed_q.put(_DONE)
+            for t in embedders:
+                t.join()
+            write_q.put(_DONE)
+            writer.join()
+        finally:
+            converter.shutdown()
+
+        report = progress.finish()
+        logger.info("bulk_ingest.done", **report.model_dump(exclude={"results", "errors"}))
+        return report
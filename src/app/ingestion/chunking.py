@@ -1,5 +1,5 @@
 import re
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 from langchain_text_splitters import MarkdownHeaderTextSplitter
 
 from src.app.core.types import Chunk, DocumentMeta
@@ -157,6 +157,7 @@ class AdaptiveMarkdownChunker:
 
         final_chunks: List[Chunk] = []
         order = 0
+        seen: Dict[str, int] = {}
 
         for section in sections:
             section_path = self._section_path(section.metadata)
@@ -174,18 +175,18 @@ class AdaptiveMarkdownChunker:
                 if kind == "table":
                     # Flush texto antes
                     if buffer_text.strip():
-                        final_chunks.append(self._make_chunk(buffer_text, "text", section_path, meta, order))
+                        final_chunks.append(self._make_chunk(buffer_text, "text", section_path, meta, order, seen))
                         order += 1
                         buffer_text = ""
 
                     # Adiciona tabela como chunk isolado
-                    final_chunks.append(self._make_chunk(block, "table", section_path, meta, order))
+                    final_chunks.append(self._make_chunk(block, "table", section_path, meta, order, seen))
                     order += 1
                     continue
 
                 # Texto normal
                 if len(buffer_text) + len(block) > self.max_chars and buffer_text.strip():
-                    final_chunks.append(self._make_chunk(buffer_text, "text", section_path, meta, order))
+                    final_chunks.append(self._make_chunk(buffer_text, "text", section_path, meta, order, seen))
                     order += 1
                     buffer_text = block
                 else:
@@ -193,7 +194,7 @@ class AdaptiveMarkdownChunker:
 
             # resto pendente
             if buffer_text.strip():
-                final_chunks.append(self._make_chunk(buffer_text, "text", section_path, meta, order))
+                final_chunks.append(self._make_chunk(buffer_text, "text", section_path, meta, order, seen))
                 order += 1
 
         logger.info("chunking.done", doc_id=meta.doc_id, n_chunks=len(final_chunks))
@@ -203,12 +204,27 @@ class AdaptiveMarkdownChunker:
     #   CRIAÇÃO DO CHUNK FINAL
     # ---------------------------
 
-    def _make_chunk(self, text: str, kind: str, section_path: List[str], meta: DocumentMeta, order: int) -> Chunk:
-        chunk_id = sha1_text(f"{meta.doc_id}|{order}|{text[:120]}")
+    def _make_chunk(
+        self,
+        text: str,
+        kind: str,
+        section_path: List[str],
+        meta: DocumentMeta,
+        order: int,
+        seen: Dict[str, int],
+    ) -> Chunk:
+        # ID derivado do conteúdo (e não da posição): uma alteração no início
+        # do documento não muda o ID dos chunks que continuam iguais.
+        # `seen` desambigua blocos idênticos dentro da mesma seção.
+        text = text.strip()
+        key = f"{meta.doc_id}|{' > '.join(section_path)}|{sha1_text(text)}"
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        chunk_id = sha1_text(f"{key}|{occurrence}")
         return Chunk(
             chunk_id=chunk_id,
             doc_id=meta.doc_id,
-            text=text.strip(),
+            text=text,
             chunk_kind=kind,
             section_path=section_path,
             order=order,
@@ -216,5 +232,13 @@ class AdaptiveMarkdownChunker:
                 "company": meta.company or "",
                 "doc_type": meta.doc_type or "",
                 "doc_date": meta.doc_date or "",
+                # numéricos só quando existem (Chroma não aceita None)
+                **{
+                    k: v for k, v in (
+                        ("doc_year", meta.doc_year),
+                        ("doc_quarter", meta.doc_quarter),
+                        ("doc_epoch", meta.doc_epoch),
+                    ) if v is not None
+                },
             },
         )
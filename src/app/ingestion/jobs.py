@@ -0,0 +1,557 @@
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.app.config.settings import settings
+from src.app.core.logging import logger
+from src.app.core.metrics import ERRORS, STAGE_SECONDS
+from src.app.core.registry import get_ingestion_pipeline, warm_document_converter
+from src.app.core.utils import ensure_dir
+from src.app.ingestion.pdf_to_md import convert_pdf
+
+# estados de um arquivo dentro de um job
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# vezes que um arquivo pode derrubar o processo de conversão antes de falhar
+MAX_CONVERT_CRASHES = 2
+
+
+class JobFile(BaseModel):
+    idx: int
+    filename: str
+    source: str | None = None       # chave do documento no manifest
+    status: str = QUEUED
+    stage: str = QUEUED        # queued → check → convert → chunk → index → done
+    doc_id: str | None = None
+    content_id: str | None = None   # sha256 calculado durante o upload
+    n_chunks: int | None = None
+    skipped: bool = False
+    error: str | None = None
+    timings: Dict[str, float] = Field(default_factory=dict)  # segundos por estágio
+    started_at: float | None = None
+    finished_at: float | None = None
+
+
+class Job(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    finished_at: float | None = None
+    total: int
+    successful: int
+    failed: int
+    files: List[JobFile] = Field(default_factory=list)
+
+
+class JobStore:
+    """
+    Fila de ingestão persistida em SQLite.
+    Um job agrupa um ou mais arquivos; cada arquivo é processado de forma independente.
+
+    Segura com vários processos (workers do uvicorn) no mesmo arquivo:
+      - claim atômico (BEGIN IMMEDIATE + UPDATE ... RETURNING)
+      - cada arquivo em execução guarda o dono ("host:pid:token") e um heartbeat;
+        só volta para a fila se o dono morreu ou o lease venceu
+      - um documento (source) com arquivo em execução não é reclamado de novo
+    """
+
+    def __init__(self, path: Path):
+        ensure_dir(path.parent)
+        self._lock = threading.Lock()
+        # identifica este processo nos arquivos que ele reclamar
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id     TEXT PRIMARY KEY,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_files (
+                job_id      TEXT NOT NULL,
+                idx         INTEGER NOT NULL,
+                filename    TEXT NOT NULL,
+                source      TEXT,
+                path        TEXT NOT NULL,
+                status      TEXT NOT NULL,
+                stage       TEXT NOT NULL,
+                doc_id      TEXT,
+                content_id  TEXT,
+                n_chunks    INTEGER,
+                skipped     INTEGER NOT NULL DEFAULT 0,
+                error       TEXT,
+                timings     TEXT NOT NULL DEFAULT '{}',
+                started_at  REAL,
+                finished_at REAL,
+                owner       TEXT,
+                heartbeat   REAL,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_files_status ON job_files(status);
+            """
+        )
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(job_files)")}
+        if "content_id" not in columns:
+            self._conn.execute("ALTER TABLE job_files ADD COLUMN content_id TEXT")
+        if "source" not in columns:
+            self._conn.execute("ALTER TABLE job_files ADD COLUMN source TEXT")
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE job_files ADD COLUMN owner TEXT")
+            self._conn.execute("ALTER TABLE job_files ADD COLUMN heartbeat REAL")
+        self._conn.commit()
+
+    def _immediate(self, sql: str, params: tuple):
+        """
+        Executa um statement de escrita sob BEGIN IMMEDIATE (lock de escrita do
+        arquivo desde o início: outros processos esperam em vez de intercalar).
+        Chamar com self._lock. Retorna as linhas do RETURNING, se houver.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(sql, params).fetchall()
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        return rows
+
+    def create(self, files: List[Dict]) -> str:
+        """
+        files: [{"filename", "path", "content_id", "source", opcionais "error" / "duplicate_of"}]
+        - `error`: arquivo já entra como falho (ex: tipo inválido)
+        - `duplicate_of` (ManifestEntry): mesmos bytes já ingeridos, entra como concluído
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        rows = []
+        for idx, f in enumerate(files):
+            error = f.get("error")
+            duplicate = f.get("duplicate_of")
+            if error:
+                status, stage, doc_id, n_chunks, finished_at = FAILED, "rejected", None, None, now
+            elif duplicate:
+                status, stage, doc_id, n_chunks, finished_at = DONE, "duplicate", duplicate.doc_id, len(duplicate.chunk_ids), now
+            else:
+                status, stage, doc_id, n_chunks, finished_at = QUEUED, QUEUED, None, None, None
+            rows.append((
+                job_id, idx, f["filename"], f.get("source"), f.get("path", ""), status, stage,
+                doc_id, f.get("content_id"), n_chunks, int(bool(duplicate)), error, finished_at,
+            ))
+        with self._lock:
+            self._conn.execute("INSERT INTO jobs (job_id, created_at) VALUES (?, ?)", (job_id, now))
+            self._conn.executemany(
+                "INSERT INTO job_files (job_id, idx, filename, source, path, status, stage, "
+                "doc_id, content_id, n_chunks, skipped, error, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        return job_id
+
+    def claim_next(self) -> Optional[Dict]:
+        """
+        Pega o próximo arquivo pendente (FIFO) e marca como em execução por este
+        processo, numa única escrita atômica. Arquivos de um documento (source)
+        que já tem arquivo em execução ficam para depois: check → plan → apply
+        do mesmo documento nunca rodam em paralelo, nem entre processos.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._immediate(
+                "UPDATE job_files SET status = ?, started_at = ?, owner = ?, heartbeat = ? "
+                "WHERE rowid = ("
+                "  SELECT f.rowid FROM job_files f JOIN jobs j ON j.job_id = f.job_id "
+                "  WHERE f.status = ? AND COALESCE(f.source, f.filename) NOT IN ("
+                "    SELECT COALESCE(source, filename) FROM job_files WHERE status = ?"
+                "  ) ORDER BY j.created_at, f.idx LIMIT 1"
+                ") AND status = ? "
+                "RETURNING job_id, idx, filename, path, content_id, source",
+                (RUNNING, now, self.owner, now, QUEUED, RUNNING, QUEUED),
+            )
+        if not rows:
+            return None
+        row = rows[0]
+        return {
+            "job_id": row[0], "idx": row[1], "filename": row[2], "path": row[3],
+            "content_id": row[4], "source": row[5],
+        }
+
+    def update(self, job_id: str, idx: int, **fields) -> None:
+        if "timings" in fields:
+            fields["timings"] = json.dumps(fields["timings"])
+        if "skipped" in fields:
+            fields["skipped"] = int(fields["skipped"])
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE job_files SET {cols} WHERE job_id = ? AND idx = ?",
+                [*fields.values(), job_id, idx],
+            )
+            self._conn.commit()
+
+    def requeue(self, job_id: str, idx: int) -> None:
+        """
+        Devolve um arquivo em execução para a fila (ex: processo de conversão caiu).
+        """
+        self.update(job_id, idx, status=QUEUED, stage=QUEUED, started_at=None, timings={}, owner=None, heartbeat=None)
+
+    def heartbeat(self) -> int:
+        """
+        Renova o lease dos arquivos em execução por este processo.
+        """
+        with self._lock:
+            rows = self._immediate(
+                "UPDATE job_files SET heartbeat = ? WHERE owner = ? AND status = ? RETURNING idx",
+                (time.time(), self.owner, RUNNING),
+            )
+        return len(rows)
+
+    def _owner_alive(self, owner: Optional[str]) -> bool:
+        # pid só é verificável no mesmo host; de outros hosts vale o lease
+        if owner is None:
+            return False
+        if owner == self.owner:
+            return True
+        host, pid, _ = owner.rsplit(":", 2)
+        if host != socket.gethostname():
+            return True
+        if int(pid) == os.getpid():
+            # mesmo pid com outro token: encarnação anterior (ex: container reiniciado)
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def requeue_abandoned(self, lease_s: float) -> int:
+        """
+        Arquivos em execução cujo dono morreu (pid inexistente no mesmo host ou
+        heartbeat mais velho que `lease_s`) voltam para a fila. Arquivos de
+        processos vivos (outros workers da API) não são tocados.
+        """
+        deadline = time.time() - lease_s
+        requeued = 0
+        with self._lock:
+            running = self._conn.execute(
+                "SELECT job_id, idx, owner, heartbeat FROM job_files WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            self._conn.commit()
+            for job_id, idx, owner, heartbeat in running:
+                if self._owner_alive(owner) and (heartbeat or 0.0) >= deadline:
+                    continue
+                # o dono pode ter terminado o arquivo entre o SELECT e aqui
+                requeued += len(self._immediate(
+                    "UPDATE job_files SET status = ?, stage = ?, started_at = NULL, timings = '{}', "
+                    "owner = NULL, heartbeat = NULL "
+                    "WHERE job_id = ? AND idx = ? AND status = ? AND owner IS ? RETURNING idx",
+                    (QUEUED, QUEUED, job_id, idx, RUNNING, owner),
+                ))
+        return requeued
+
+    def pending(self) -> int:
+        with self._lock:
+            (n,) = self._conn.execute(
+                "SELECT COUNT(*) FROM job_files WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()
+        return n
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT job_id, created_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            return self._build(row)
+
+    def list_jobs(self, limit: int = 50) -> List[Job]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, created_at FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [self._build(r) for r in rows]
+
+    def _build(self, row) -> Job:
+        job_id, created_at = row
+        files = [
+            JobFile(
+                idx=r[0], filename=r[1], status=r[2], stage=r[3], doc_id=r[4], content_id=r[5], n_chunks=r[6],
+                skipped=bool(r[7]), error=r[8], timings=json.loads(r[9]), started_at=r[10], finished_at=r[11],
+                source=r[12],
+            )
+            for r in self._conn.execute(
+                "SELECT idx, filename, status, stage, doc_id, content_id, n_chunks, skipped, error, timings, "
+                "started_at, finished_at, source FROM job_files WHERE job_id = ? ORDER BY idx",
+                (job_id,),
+            )
+        ]
+        successful = sum(1 for f in files if f.status == DONE)
+        failed = sum(1 for f in files if f.status == FAILED)
+        finished = successful + failed == len(files)
+
+        if finished:
+            status = FAILED if failed == len(files) else DONE
+        elif any(f.status != QUEUED for f in files):
+            status = RUNNING
+        else:
+            status = QUEUED
+
+        return Job(
+            job_id=job_id,
+            status=status,
+            created_at=created_at,
+            finished_at=max((f.finished_at or 0.0) for f in files) if finished and files else None,
+            total=len(files),
+            successful=successful,
+            failed=failed,
+            files=files,
+        )
+
+
+class IngestionJobQueue:
+    """
+    Pool de workers em background que consome a JobStore.
+
+    - Conversão Docling roda num process pool (não trava o event loop nem disputa o GIL com /ask)
+    - Chunking, embeddings e escrita rodam nas threads dos workers
+      (embeddings em lotes sobrepostos aos upserts no Chroma)
+    - Arquivos do mesmo documento (source) são processados um de cada vez
+      (garantido no claim da JobStore, também entre processos)
+    - Heartbeat periódico mantém o lease dos arquivos em execução; arquivos de
+      workers mortos (deste ou de outro processo) voltam para a fila
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, convert_workers: int = 1):
+        self.store = store
+        self.workers = max(1, workers)
+        self.convert_workers = max(1, convert_workers)
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._pool: ProcessPoolExecutor | None = None
+        self._pool_lock = threading.Lock()
+        # (job_id, idx) → quedas do processo de conversão
+        self._crashes: Dict[tuple, int] = {}
+
+    @property
+    def pipeline(self):
+        # criado sob demanda: a API sobe mesmo sem dependências de ingestão prontas
+        return get_ingestion_pipeline()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        requeued = self.store.requeue_abandoned(settings.ingest_job_lease_s)
+        # o executor só cria os processos (e carrega o Docling) no primeiro submit
+        self._pool = self._new_pool()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"ingest-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat, name="ingest-job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        logger.info("ingest_jobs.started", workers=self.workers, requeued=requeued, pending=self.store.pending())
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # "spawn": fork a partir de um processo com threads (uvicorn) é inseguro
+        return ProcessPoolExecutor(
+            max_workers=self.convert_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_document_converter,
+        )
+
+    def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        """
+        Recria o process pool depois que um processo de conversão morreu
+        (ex: OOM no Docling). Só o primeiro worker a perceber recria.
+        """
+        with self._pool_lock:
+            if self._pool is not broken or self._stop.is_set():
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._new_pool()
+        logger.warning("ingest_jobs.pool_restarted")
+
+    def _heartbeat(self) -> None:
+        """
+        Renova o lease dos arquivos deste processo e devolve à fila os de
+        workers mortos, a cada terço do lease.
+        """
+        lease_s = settings.ingest_job_lease_s
+        while not self._stop.wait(lease_s / 3):
+            try:
+                self.store.heartbeat()
+                requeued = self.store.requeue_abandoned(lease_s)
+            except Exception as e:
+                logger.error("ingest_jobs.heartbeat_failed", error=str(e))
+                continue
+            if requeued:
+                logger.warning("ingest_jobs.abandoned_requeued", n=requeued)
+                with self._wakeup:
+                    self._wakeup.notify_all()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for t in self._threads:
+            t.join(timeout=5)
+        self._threads = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, files: List[Dict]) -> str:
+        job_id = self.store.create(files)
+        logger.info("ingest_jobs.submitted", job_id=job_id, n_files=len(files))
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return job_id
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            item = self.store.claim_next()
+            if item is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=2.0)
+                continue
+            self._process(item)
+
+    def _process(self, item: Dict) -> None:
+        job_id, idx = item["job_id"], item["idx"]
+        pdf_path = Path(item["path"])
+        timings: Dict[str, float] = {}
+        stage = "check"
+        requeued = False
+
+        def enter(name: str) -> float:
+            self.store.update(job_id, idx, stage=name, timings=timings)
+            return time.perf_counter()
+
+        try:
+            pipeline = self.pipeline
+
+            # jobs enfileirados antes da coluna source eram chaveados pelo filename
+            source = item["source"] or item["filename"]
+            # check → plan → apply do mesmo documento nunca em paralelo: enquanto este
+            # arquivo roda, claim_next não entrega outro do mesmo source (plano calculado
+            # a partir da entrada do manifest)
+            t0 = enter(stage)
+            check = pipeline.check(pdf_path, source=source, content_hash=item["content_id"])
+            timings[stage] = round(time.perf_counter() - t0, 3)
+
+            if check.skipped:
+                result = check.skipped
+            else:
+                stage = "convert"
+                t0 = enter(stage)
+                pool = self._pool
+                try:
+                    future = pool.submit(convert_pdf, str(pdf_path), str(pipeline.converter.out_dir))
+                    md_path = future.result()
+                except BrokenProcessPool:
+                    self._restart_pool(pool)
+                    crashes = self._crashes.get((job_id, idx), 0) + 1
+                    self._crashes[(job_id, idx)] = crashes
+                    if crashes >= MAX_CONVERT_CRASHES:
+                        raise
+                    # o arquivo pode não ser o culpado (outra conversão no mesmo pool)
+                    self.store.requeue(job_id, idx)
+                    requeued = True
+                    logger.warning("ingest_jobs.file_requeued", job_id=job_id, filename=item["filename"], crashes=crashes)
+                    return
+                md_text = Path(md_path).read_text(encoding="utf-8")
+                timings[stage] = round(time.perf_counter() - t0, 3)
+
+                stage = "chunk"
+                t0 = enter(stage)
+                plan = pipeline.plan(check, md_text)
+                timings[stage] = round(time.perf_counter() - t0, 3)
+
+                # embeddings em lotes sobrepostos à escrita no Chroma
+                stage = "index"
+                t0 = enter(stage)
+                result = pipeline.apply(plan)
+                timings[stage] = round(time.perf_counter() - t0, 3)
+
+            self.store.update(
+                job_id, idx,
+                status=DONE, stage=DONE, doc_id=result.doc_id, n_chunks=result.n_chunks,
+                skipped=result.skipped, timings=timings, finished_at=time.time(),
+            )
+            logger.info("ingest_jobs.file_done", job_id=job_id, filename=item["filename"], timings=timings)
+
+        except Exception as e:
+            ERRORS.inc(stage=f"ingest_{stage}")
+            self.store.update(
+                job_id, idx,
+                status=FAILED, stage=stage, error=str(e), timings=timings, finished_at=time.time(),
+            )
+            logger.error("ingest_jobs.file_failed", job_id=job_id, filename=item["filename"], stage=stage, error=str(e))
+
+        finally:
+            for name, seconds in timings.items():
+                STAGE_SECONDS.observe(seconds, stage=f"ingest_{name}")
+            if not requeued:
+                self._crashes.pop((job_id, idx), None)
+                pdf_path.unlink(missing_ok=True)
+
+
+_store: JobStore | None = None
+_queue: IngestionJobQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """
+    JobStore do processo, sem iniciar workers (ex: gauge do /metrics).
+    """
+    global _store
+    with _queue_lock:
+        if _store is None:
+            _store = JobStore(settings.jobs_path)
+        return _store
+
+
+def get_job_queue() -> IngestionJobQueue:
+    """
+    Fila de ingestão única do processo. Os workers sobem na primeira chamada:
+    no startup da API se há jobs pendentes (retomados após restart), senão
+    no primeiro upload.
+    """
+    global _queue
+    store = get_job_store()
+    with _queue_lock:
+        if _queue is None:
+            _queue = IngestionJobQueue(
+                store,
+                workers=settings.ingest_job_workers,
+                convert_workers=settings.ingest_job_convert_workers,
+            )
+            _queue.start()
+        return _queue
+
+
+def stop_job_queue() -> None:
+    """
+    Para os workers, se a fila chegou a ser iniciada.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.stop()
+            _queue = None
@@ -0,0 +1,158 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.app.core.utils import ensure_dir
+
+
+class ManifestEntry(BaseModel):
+    source: str                 # nome lógico do documento (arquivo em data/raw ou filename do upload)
+    doc_id: str
+    content_hash: str           # sha256 do PDF
+    fingerprint: str            # stable_doc_id (nome|tamanho|mtime) da última ingestão
+    meta_hash: str = ""         # hash da metadata do documento (company, doc_type, doc_date)
+    chunk_ids: List[str] = Field(default_factory=list)  # na ordem do documento
+    ingested_at: float = 0.0
+
+
+class ManifestAlias(BaseModel):
+    source: str                 # arquivo com os mesmos bytes de um documento já ingerido
+    content_hash: str           # sha256 compartilhado com o documento original
+    fingerprint: str            # stable_doc_id do alias (atalho sem re-hash nas varreduras)
+
+
+class DocumentManifest:
+    """
+    Registro persistente (SQLite) do que já foi ingerido:
+    source → doc_id, hash do conteúdo e IDs dos chunks no índice.
+
+    Permite pular PDFs sem alteração e remover chunks órfãos
+    quando um documento muda. Cópias byte a byte de um documento já ingerido
+    (outro nome/caminho) ficam em `aliases`, sem chunks próprios.
+    """
+
+    def __init__(self, path: Path):
+        ensure_dir(path.parent)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                source       TEXT PRIMARY KEY,
+                doc_id       TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                fingerprint  TEXT NOT NULL,
+                meta_hash    TEXT NOT NULL DEFAULT '',
+                ingested_at  REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash);
+            CREATE TABLE IF NOT EXISTS chunks (
+                doc_id   TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                ord      INTEGER NOT NULL,
+                PRIMARY KEY (doc_id, chunk_id)
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                source       TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                fingerprint  TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def _entry(self, row) -> ManifestEntry:
+        source, doc_id, content_hash, fingerprint, meta_hash, ingested_at = row
+        chunk_ids = [
+            r[0] for r in self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE doc_id = ? ORDER BY ord", (doc_id,)
+            )
+        ]
+        return ManifestEntry(
+            source=source,
+            doc_id=doc_id,
+            content_hash=content_hash,
+            fingerprint=fingerprint,
+            meta_hash=meta_hash,
+            chunk_ids=chunk_ids,
+            ingested_at=ingested_at,
+        )
+
+    def get(self, source: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, doc_id, content_hash, fingerprint, meta_hash, ingested_at "
+                "FROM documents WHERE source = ?",
+                (source,),
+            ).fetchone()
+            return self._entry(row) if row else None
+
+    def find_by_content_hash(self, content_hash: str) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, doc_id, content_hash, fingerprint, meta_hash, ingested_at "
+                "FROM documents WHERE content_hash = ? LIMIT 1",
+                (content_hash,),
+            ).fetchone()
+            return self._entry(row) if row else None
+
+    def put(self, entry: ManifestEntry) -> None:
+        entry.ingested_at = entry.ingested_at or time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(source, doc_id, content_hash, fingerprint, meta_hash, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    entry.source,
+                    entry.doc_id,
+                    entry.content_hash,
+                    entry.fingerprint,
+                    entry.meta_hash,
+                    entry.ingested_at,
+                ),
+            )
+            self._conn.execute("DELETE FROM chunks WHERE doc_id = ?", (entry.doc_id,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (doc_id, chunk_id, ord) VALUES (?, ?, ?)",
+                [(entry.doc_id, cid, i) for i, cid in enumerate(entry.chunk_ids)],
+            )
+            # o source passou a ser um documento próprio
+            self._conn.execute("DELETE FROM aliases WHERE source = ?", (entry.source,))
+            self._conn.commit()
+
+    def get_alias(self, source: str) -> Optional[ManifestAlias]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, content_hash, fingerprint FROM aliases WHERE source = ?",
+                (source,),
+            ).fetchone()
+        if row is None:
+            return None
+        source, content_hash, fingerprint = row
+        return ManifestAlias(source=source, content_hash=content_hash, fingerprint=fingerprint)
+
+    def put_alias(self, alias: ManifestAlias) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO aliases (source, content_hash, fingerprint) VALUES (?, ?, ?)",
+                (alias.source, alias.content_hash, alias.fingerprint),
+            )
+            self._conn.commit()
+
+    def touch(self, source: str, fingerprint: str) -> None:
+        """
+        Atualiza o fingerprint (ex: mtime mudou mas o conteúdo é o mesmo).
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET fingerprint = ? WHERE source = ?",
+                (fingerprint, source),
+            )
+            self._conn.commit()
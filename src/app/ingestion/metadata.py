@@ -1,5 +1,6 @@
 import re
 from pathlib import Path
+from src.app.core.dates import date_fields
 from src.app.core.types import DocumentMeta
 from src.app.core.utils import stable_doc_id
 from src.app.core.logging import logger
@@ -35,8 +36,15 @@ DATE_PATTERNS = [
 ]
 
 class MetadataExtractor:
-    def extract(self, source_pdf: Path, md_text: str) -> DocumentMeta:
-        doc_id = stable_doc_id(source_pdf)
+    def extract(
+        self,
+        source_pdf: Path,
+        md_text: str,
+        doc_id: str | None = None,
+        content_id: str | None = None,
+    ) -> DocumentMeta:
+        # doc_id pode vir do manifest (documento já conhecido sendo reingerido)
+        doc_id = doc_id or stable_doc_id(source_pdf)
 
         company = self._infer_company(source_pdf.name, md_text)
         doc_type = self._infer_doc_type(source_pdf.name, md_text)
@@ -44,13 +52,22 @@ class MetadataExtractor:
 
         meta = DocumentMeta(
             doc_id=doc_id,
+            content_id=content_id,
             source_path=str(source_pdf),
             company=company,
             doc_type=doc_type,
             doc_date=doc_date,
+            **date_fields(doc_date),
             extra={}
         )
-        logger.info("metadata.extracted", doc_id=doc_id, company=company, doc_type=doc_type, doc_date=doc_date)
+        logger.info(
+            "metadata.extracted",
+            doc_id=doc_id,
+            company=company,
+            doc_type=doc_type,
+            doc_date=doc_date,
+            doc_epoch=meta.doc_epoch,
+        )
         return meta
 
     def _infer_company(self, filename: str, text: str) -> str | None:
@@ -72,6 +89,10 @@ class MetadataExtractor:
         return None
 
     def _infer_date(self, filename: str, text: str) -> str | None:
+        """
+        Data do documento como aparece no texto. A normalização para
+        doc_year/doc_quarter/doc_epoch é feita por core.dates.date_fields.
+        """
         hay = f"{filename}\n{text[:8000]}"
         for pat in DATE_PATTERNS:
             m = re.search(pat, hay)
@@ -1,11 +1,17 @@
+import threading
 from pathlib import Path
 from src.app.core.utils import ensure_dir
 from src.app.core.logging import logger
+from src.app.core.registry import get_document_converter
+
+# o DocumentConverter é compartilhado no processo; conversões são serializadas
+_convert_lock = threading.Lock()
 
 class PdfToMarkdownConverter:
     """
     Converte PDF -> Markdown usando Docling.
     Sem OCR (você explicitou que não quer OCR).
+    O DocumentConverter vem do registry (modelos carregados uma vez por processo).
     """
 
     def __init__(self, out_dir: Path):
@@ -20,17 +26,22 @@ class PdfToMarkdownConverter:
 
         # Docling (ajuste conforme sua versão instalada)
         # A ideia aqui é: parsear o PDF e exportar Markdown preservando tabelas.
-        try:
-            from docling.document_converter import DocumentConverter  # type: ignore
-        except Exception as e:
-            raise RuntimeError("Docling não disponível. Instale e valide a API do seu ambiente.") from e
+        converter = get_document_converter()
 
         logger.info("pdf_to_md.start", pdf=str(pdf_path), md=str(md_path))
-        converter = DocumentConverter()  # configure conforme necessário, sem OCR
-
-        doc = converter.convert(str(pdf_path))  # docling retorna um objeto documento
+        with _convert_lock:
+            doc = converter.convert(str(pdf_path))  # docling retorna um objeto documento
         md_text = doc.document.export_to_markdown()  # API típica; ajuste se necessário
 
         md_path.write_text(md_text, encoding="utf-8")
         logger.info("pdf_to_md.done", pdf=str(pdf_path), md=str(md_path))
         return md_path
+
+
+def convert_pdf(pdf_path: str, out_dir: str) -> str:
+    """
+    Função de topo (picklable) para rodar a conversão num process pool:
+    Docling é CPU-bound e não deve disputar o GIL com a API/threads de ingestão.
+    """
+    md_path = PdfToMarkdownConverter(out_dir=Path(out_dir)).convert(Path(pdf_path))
+    return str(md_path)
@@ -1,14 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
 from src.app.config.settings import settings
 from src.app.core.logging import logger
-from src.app.core.utils import ensure_dir
+from src.app.core.metrics import STAGE_SECONDS
+from src.app.core.types import Chunk, DocumentMeta, IngestResult
+from src.app.core.utils import ensure_dir, file_sha256, sha1_text, stable_doc_id
 
 from src.app.ingestion.pdf_to_md import PdfToMarkdownConverter
 from src.app.ingestion.metadata import MetadataExtractor
 from src.app.ingestion.chunking import AdaptiveMarkdownChunker
+from src.app.ingestion.manifest import ManifestAlias, ManifestEntry
+
+from src.app.core.registry import get_embeddings, get_manifest, get_store
+
+
+# callbacks chamados após cada documento gravado no índice (ex: cache de respostas)
+_write_listeners: List[Callable[[DocumentMeta], None]] = []
+
+
+def add_write_listener(listener: Callable[[DocumentMeta], None]) -> None:
+    _write_listeners.append(listener)
+
+
+def _notify_write(meta: DocumentMeta) -> None:
+    for listener in list(_write_listeners):
+        try:
+            listener(meta)
+        except Exception as e:
+            logger.error("ingest.write_listener_failed", doc_id=meta.doc_id, error=str(e))
+
+
+class IngestCheck(BaseModel):
+    """
+    Resultado da verificação de um PDF contra o manifest.
+    Se `skipped` estiver preenchido, não há nada a fazer.
+    """
+    pdf_path: Path
+    source: str
+    fingerprint: str
+    content_hash: str = ""
+    previous: Optional[ManifestEntry] = None
+    skipped: Optional[IngestResult] = None
+
+
+class IngestPlan(BaseModel):
+    """
+    Diferença entre os chunks atuais de um documento e o que está no índice.
+    """
+    check: IngestCheck
+    meta: DocumentMeta
+    meta_hash: str
+    chunks: List[Chunk]
+    added: List[Chunk] = Field(default_factory=list)
+    updated: List[Chunk] = Field(default_factory=list)
+    orphans: List[str] = Field(default_factory=list)
 
-from src.app.storage.embeddings import build_embeddings
-from src.app.storage.chroma_store import ChromaHnswStore
 
 class IngestionPipeline:
     def __init__(self):
@@ -18,19 +70,214 @@ class IngestionPipeline:
         self.converter = PdfToMarkdownConverter(out_dir=settings.staged_dir / "markdown")
         self.meta_extractor = MetadataExtractor()
         self.chunker = AdaptiveMarkdownChunker()
-        self.emb = build_embeddings()
-        self.store = ChromaHnswStore()
+        # componentes pesados compartilhados no processo (ver core/registry.py)
+        self.emb = get_embeddings()
+        self.store = get_store()
+        self.manifest = get_manifest()
+
+    def ingest_pdf(self, pdf_path: Path, source: str | None = None, force: bool = False) -> IngestResult:
+        """
+        Ingestão incremental:
+          - PDF sem alteração desde a última ingestão → pulado
+          - PDF alterado → só chunks novos são embedados; chunks que sumiram são removidos
 
-    def ingest_pdf(self, pdf_path: Path) -> None:
-        logger.info("ingest.start", pdf=str(pdf_path))
+        `source` é o nome lógico do documento (default: nome do arquivo).
+        Uploads via API passam o filename original, já que o PDF chega num arquivo temporário.
+        """
+        logger.info("ingest.start", pdf=str(pdf_path), source=source or pdf_path.name)
+
+        check = self.check(pdf_path, source=source, force=force)
+        if check.skipped:
+            return check.skipped
 
         md_path = self.converter.convert(pdf_path)
         md_text = md_path.read_text(encoding="utf-8")
 
-        meta = self.meta_extractor.extract(pdf_path, md_text)
+        plan = self.plan(check, md_text)
+        return self.apply(plan)
+
+    # ---------------------------
+    #   ETAPAS (usadas também pela ingestão em lote)
+    # ---------------------------
+
+    def check(
+        self,
+        pdf_path: Path,
+        source: str | None = None,
+        force: bool = False,
+        content_hash: str | None = None,
+    ) -> IngestCheck:
+        """
+        `content_hash` (sha256) pode vir pronto do upload, calculado durante a cópia.
+        """
+        source = source or pdf_path.name
+        fingerprint = stable_doc_id(pdf_path)
+        previous = self.manifest.get(source)
+        check = IngestCheck(pdf_path=pdf_path, source=source, fingerprint=fingerprint, previous=previous)
+
+        # 1) Atalho barato: nome/tamanho/mtime iguais → nada mudou
+        if previous and not force and previous.fingerprint == fingerprint:
+            logger.info("ingest.skipped", source=source, doc_id=previous.doc_id, reason="fingerprint")
+            check.skipped = self._skipped(previous, source)
+            return check
+
+        # 1b) Cópia já conhecida de outro documento, com o mesmo fingerprint
+        alias = self.manifest.get_alias(source) if previous is None and not force else None
+        if alias and alias.fingerprint == fingerprint:
+            duplicate = self.manifest.find_by_content_hash(alias.content_hash)
+            if duplicate:
+                logger.info("ingest.skipped", source=source, doc_id=duplicate.doc_id, reason="alias", duplicate_of=duplicate.source)
+                check.skipped = self._skipped(duplicate, source)
+                return check
+
+        check.content_hash = content_hash or file_sha256(pdf_path)
+        if force:
+            return check
+
+        # 2) Conteúdo idêntico (ex: só o mtime mudou)
+        if previous and previous.content_hash == check.content_hash:
+            self.manifest.touch(source, fingerprint)
+            logger.info("ingest.skipped", source=source, doc_id=previous.doc_id, reason="content_hash")
+            check.skipped = self._skipped(previous, source)
+            return check
+
+        # 3) Mesmos bytes já ingeridos sob outro nome
+        if previous is None:
+            duplicate = self.manifest.find_by_content_hash(check.content_hash)
+            if duplicate:
+                # registra o alias: a próxima varredura pula pelo fingerprint, sem re-hash
+                self.manifest.put_alias(
+                    ManifestAlias(source=source, content_hash=check.content_hash, fingerprint=fingerprint)
+                )
+                logger.info("ingest.skipped", source=source, doc_id=duplicate.doc_id, reason="duplicate", duplicate_of=duplicate.source)
+                check.skipped = self._skipped(duplicate, source)
+
+        return check
+
+    @staticmethod
+    def _skipped(entry: ManifestEntry, source: str) -> IngestResult:
+        return IngestResult(
+            doc_id=entry.doc_id,
+            content_id=entry.content_hash,
+            source=source,
+            n_chunks=len(entry.chunk_ids),
+            skipped=True,
+        )
+
+    def plan(self, check: IngestCheck, md_text: str) -> IngestPlan:
+        previous = check.previous
+
+        # Documento conhecido mantém o doc_id → chunks inalterados mantêm o chunk_id
+        meta = self.meta_extractor.extract(
+            check.pdf_path,
+            md_text,
+            doc_id=previous.doc_id if previous else None,
+            content_id=check.content_hash or None,
+        )
+        meta_hash = sha1_text(
+            f"{meta.company}|{meta.doc_type}|{meta.doc_date}|{meta.doc_year}|{meta.doc_quarter}|{meta.doc_epoch}"
+        )
         chunks = self.chunker.chunk(md_text, meta=meta)
 
-        vectors = self.emb.embed([c.text for c in chunks])
-        self.store.upsert(chunks, vectors)
+        old_order = {cid: i for i, cid in enumerate(previous.chunk_ids)} if previous else {}
+        meta_changed = previous is not None and previous.meta_hash != meta_hash
+        new_ids = {c.chunk_id for c in chunks}
+
+        # documento fora do manifest (ex: índice anterior ao manifest): chunks já
+        # gravados com o mesmo doc_id e IDs antigos (por posição) viram órfãos
+        stale = [] if previous else [cid for cid in self.store.ids_for_doc(meta.doc_id) if cid not in new_ids]
+        if stale:
+            logger.info("ingest.reconcile", doc_id=meta.doc_id, n_stale=len(stale))
+
+        return IngestPlan(
+            check=check,
+            meta=meta,
+            meta_hash=meta_hash,
+            chunks=chunks,
+            added=[c for c in chunks if c.chunk_id not in old_order],
+            updated=[
+                c for c in chunks
+                if c.chunk_id in old_order and (meta_changed or old_order[c.chunk_id] != c.order)
+            ],
+            orphans=[cid for cid in old_order if cid not in new_ids] + stale,
+        )
+
+    def _embed_batch(self, chunks: List[Chunk]) -> np.ndarray:
+        started = time.perf_counter()
+        # matriz float32 contígua; as linhas seguem como views até o Chroma
+        vectors = self.emb.embed_array([c.text for c in chunks])
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage="ingest_embed_batch")
+        logger.info("ingest.embed_batch", n=len(chunks), elapsed_ms=round(elapsed * 1000, 1))
+        return vectors
+
+    def embed(self, plan: IngestPlan, batch_size: int | None = None) -> List[np.ndarray]:
+        """
+        Embeddings dos chunks novos, em lotes de `batch_size` textos.
+        """
+        return [v for _, v in self.embed_stream(plan.added, batch_size, prefetch=False)]
+
+    def embed_stream(
+        self,
+        chunks: List[Chunk],
+        batch_size: int | None = None,
+        prefetch: bool = True,
+    ) -> Iterator[Tuple[Chunk, np.ndarray]]:
+        """
+        Gera pares (chunk, vetor) lote a lote. Com `prefetch`, o lote seguinte
+        é embedado em background enquanto o consumidor grava o atual.
+        """
+        batch_size = max(1, batch_size or settings.embed_batch_size)
+        batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+        if not batches:
+            return
+
+        if not prefetch:
+            for batch in batches:
+                yield from zip(batch, self._embed_batch(batch))
+            return
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-prefetch") as executor:
+            future = executor.submit(self._embed_batch, batches[0])
+            for i, batch in enumerate(batches):
+                vectors = future.result()
+                if i + 1 < len(batches):
+                    future = executor.submit(self._embed_batch, batches[i + 1])
+                yield from zip(batch, vectors)
+
+    def apply(self, plan: IngestPlan, vectors=None) -> IngestResult:
+        """
+        Grava no índice e atualiza o manifest.
+        `vectors` (mesma ordem de `plan.added`) pode vir pronto; se omitido,
+        os embeddings são gerados em lotes sobrepostos à escrita no Chroma.
+        """
+        check = plan.check
+        if vectors is None:
+            self.store.upsert_stream(self.embed_stream(plan.added))
+        else:
+            self.store.upsert_stream(zip(plan.added, vectors))
+        self.store.update_metadata(plan.updated)
+        self.store.delete(plan.orphans)
+
+        self.manifest.put(ManifestEntry(
+            source=check.source,
+            doc_id=plan.meta.doc_id,
+            content_hash=check.content_hash,
+            fingerprint=check.fingerprint,
+            meta_hash=plan.meta_hash,
+            chunk_ids=[c.chunk_id for c in plan.chunks],
+        ))
+        if plan.added or plan.updated or plan.orphans:
+            _notify_write(plan.meta)
 
-        logger.info("ingest.done", pdf=str(pdf_path), doc_id=meta.doc_id, n_chunks=len(chunks))
+        result = IngestResult(
+            doc_id=plan.meta.doc_id,
+            content_id=check.content_hash,
+            source=check.source,
+            n_chunks=len(plan.chunks),
+            n_added=len(plan.added),
+            n_updated=len(plan.updated),
+            n_deleted=len(plan.orphans),
+        )
+        logger.info("ingest.done", pdf=str(check.pdf_path), **result.model_dump(exclude={"source"}))
+        return result
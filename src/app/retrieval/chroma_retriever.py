@@ -1,19 +1,73 @@
-from typing import List, Dict, Any
+import json
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
+
+import numpy as np
+
 from src.app.core.logging import get_logger
+from src.app.core.metrics import stage_timer
 
+from src.app.retrieval.retrieval_cache import QueryVectorCache, ResultKey, RetrievalResultCache, result_key
 from src.app.retrieval.retriever import Retriever
-from src.app.storage.chroma_store import ChromaHnswStore
 from src.app.core.utils import sanitize_filters
 
+if TYPE_CHECKING:
+    from src.app.storage.chroma_store import ChromaHnswStore
+
 logger = get_logger(__name__)
 
 
 class ChromaRetriever(Retriever):
     """
     Retriever baseado em Chroma + embeddings.
+    Opcionalmente com cache de vetores de queries (LRU) e de resultados
+    (invalidado pela versão da coleção a cada escrita no store).
     """
-    def __init__(self, store: ChromaHnswStore, embeddings):
+    def __init__(
+        self,
+        store: "ChromaHnswStore",
+        embeddings,
+        query_cache: QueryVectorCache | None = None,
+        result_cache: RetrievalResultCache | None = None,
+    ):
         super().__init__(store, embeddings)
+        self.query_cache = query_cache
+        self.result_cache = result_cache
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        with stage_timer("embedding"):
+            return self.embeddings.embed_array(texts)
+
+    def _query_vectors(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        if self.query_cache is not None:
+            return self.query_cache.embed(self._embed, texts)
+        return dict(zip(texts, self._embed(texts)))
+
+    def _query_include(self) -> List[str]:
+        # vetores dos resultados: usados pelo ContextPacker (MMR)
+        return ["documents", "metadatas", "distances", "embeddings"]
+
+    def _attach_vectors(self, rankings: List[List[Dict[str, Any]]]) -> None:
+        """
+        Busca, num único get, os vetores dos resultados que ainda não os têm.
+        """
+        missing = list(dict.fromkeys(
+            item["id"] for ranking in rankings for item in ranking if item.get("vector") is None
+        ))
+        if not missing:
+            return
+        raw = self.store.collection.get(ids=missing, include=["embeddings"])
+        by_id = dict(zip(raw["ids"], raw["embeddings"]))
+        for ranking in rankings:
+            for item in ranking:
+                if item.get("vector") is None:
+                    item["vector"] = by_id.get(item["id"])
+
+    def _cached(self, key: ResultKey, version: int) -> List[Dict[str, Any]] | None:
+        return self.result_cache.get(key, version) if self.result_cache is not None else None
+
+    def _remember(self, key: ResultKey, version: int, results: List[Dict[str, Any]]) -> None:
+        if self.result_cache is not None:
+            self.result_cache.put(key, version, results)
 
     def retrieve(
         self,
@@ -24,31 +78,132 @@ class ChromaRetriever(Retriever):
 
         logger.info("retriever.start", query=query, top_k=top_k)
 
-        # 1) Embedding da query
-        query_vec = self.embeddings.embed([query])[0]
-
-        # 2) Sanitizar filtros para formato aceito pelo Chroma
+        # 1) Sanitizar filtros para formato aceito pelo Chroma
         where = sanitize_filters(metadata_filters or {})
 
-        # 3) Executar consulta
-        raw = self.store.collection.query(
-            query_embeddings=[query_vec],
-            n_results=top_k,
-            where=where,
-            include=["documents", "metadatas", "distances"],
-        )
+        # 2) Resultado já calculado para esta versão da coleção
+        key = result_key(query, where, top_k)
+        version = self.store.version
+        cached = self._cached(key, version)
+        if cached is not None:
+            logger.info("retriever.done", n_results=len(cached), cached=True)
+            return cached
+
+        # 3) Busca (o resultado final, já fundido em subclasses, é o que vai ao cache)
+        results = self._search(query, where, top_k)
+        self._remember(key, version, results)
+        logger.info("retriever.done", n_results=len(results), cached=False)
+        return results
 
-        docs = raw.get("documents", [[]])[0]
-        metas = raw.get("metadatas", [[]])[0]
-        dists = raw.get("distances", [[]])[0]
+    def _search(self, query: str, where: Dict[str, Any], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Busca vetorial sem cache: embedding da query + collection.query.
+        """
+        query_vec = self._query_vectors([query])[query]
+        with stage_timer("chroma_query"):
+            raw = self.store.collection.query(
+                query_embeddings=[query_vec],
+                n_results=top_k,
+                where=where or None,
+                include=self._query_include(),
+            )
+        return self._results(raw, 0)
 
-        results = []
-        for text, meta, dist in zip(docs, metas, dists):
-            results.append({
+    @staticmethod
+    def _results(raw: Dict[str, Any], i: int) -> List[Dict[str, Any]]:
+        """
+        Resultados da i-ésima query_embedding de um collection.query.
+        """
+        ids = raw.get("ids", [[]])[i]
+        docs = raw.get("documents", [[]])[i]
+        metas = raw.get("metadatas", [[]])[i]
+        dists = raw.get("distances", [[]])[i]
+        vectors = raw.get("embeddings")
+        vectors = vectors[i] if vectors is not None else [None] * len(ids)
+
+        return [
+            {
+                "id": chunk_id,
                 "text": text,
                 "metadata": meta,
                 "distance": dist,
-            })
+                # usado pelo ContextPacker (MMR)
+                "vector": vec,
+            }
+            for chunk_id, text, meta, dist, vec in zip(ids, docs, metas, dists, vectors)
+        ]
+
+    def retrieve_batch(
+        self,
+        requests: List[Tuple[str, Dict[str, Any] | None]],
+        top_k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieval em lote:
+          - (query, where) repetidos são buscados uma vez só
+          - resultados já cacheados (mesma versão da coleção) não são buscados
+          - o restante vai num único _search_batch
+        """
+        if not requests:
+            return []
+
+        version = self.store.version
+        wheres = [sanitize_filters(filters or {}) for _, filters in requests]
+        keys = [result_key(query, where, top_k) for (query, _), where in zip(requests, wheres)]
+
+        found: Dict[ResultKey, List[Dict[str, Any]]] = {}
+        pending: Dict[ResultKey, Tuple[str, Dict[str, Any]]] = {}
+        for key, (query, _), where in zip(keys, requests, wheres):
+            if key in found or key in pending:
+                continue
+            cached = self._cached(key, version)
+            if cached is not None:
+                found[key] = cached
+            else:
+                pending[key] = (query, where)
+
+        if pending:
+            for key, results in zip(pending, self._search_batch(list(pending.values()), top_k)):
+                found[key] = results
+                self._remember(key, version, results)
+
+        logger.info(
+            "retriever.batch",
+            n_requests=len(requests),
+            n_unique=len(found),
+            n_cached=len(found) - len(pending),
+            top_k=top_k,
+        )
+        return [found[key] for key in keys]
+
+    def _search_batch(
+        self,
+        items: List[Tuple[str, Dict[str, Any]]],
+        top_k: int
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Busca vetorial em lote, sem cache, para pares (query, where) distintos:
+          - um único embed() para as queries distintas
+          - um collection.query por where, com várias query_embeddings
+        """
+        groups: Dict[str, List[int]] = {}
+        for i, (_, where) in enumerate(items):
+            groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+
+        texts = list(dict.fromkeys(query for query, _ in items))
+        vectors = self._query_vectors(texts)
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in items]
+        for members in groups.values():
+            with stage_timer("chroma_query"):
+                raw = self.store.collection.query(
+                    query_embeddings=[vectors[items[i][0]] for i in members],
+                    n_results=top_k,
+                    where=items[members[0]][1] or None,
+                    include=self._query_include(),
+                )
+            for j, i in enumerate(members):
+                results[i] = self._results(raw, j)
 
-        logger.info("retriever.done", n_results=len(results))
+        logger.info("retriever.search_batch", n_embedded=len(texts), n_queries=len(groups), top_k=top_k)
         return results
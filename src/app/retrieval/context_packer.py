@@ -0,0 +1,119 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+SEPARATOR = "\n\n"
+
+
+class ContextPacker:
+    """
+    Monta o contexto do qa_agent a partir dos chunks recuperados:
+      1. MMR: escolhe chunks relevantes e diversos (evita quase-duplicatas
+         da mesma seção), usando os vetores retornados pelo Chroma
+      2. para quando o orçamento de tokens (tiktoken) ou `max_chunks` acaba
+      3. junta chunks vizinhos do mesmo doc_id/section_path pela `order`
+
+    A relevância de cada candidato vem da sua posição no ranking recebido
+    (já fundido por RRF), não da distância ao query vector.
+    """
+
+    def __init__(self, encoding, token_budget: int = 3000, mmr_lambda: float = 0.7):
+        self.encoding = encoding
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+
+    def _tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    @staticmethod
+    def _vectors(items: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not items or any(item.get("vector") is None for item in items):
+            return None
+        vectors = np.asarray([item["vector"] for item in items], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        return self.encoding.decode(self.encoding.encode(text)[:tokens])
+
+    def select(self, items: List[Dict[str, Any]], max_chunks: int) -> List[Dict[str, Any]]:
+        """
+        Seleção gulosa por MMR dentro do orçamento de tokens.
+        """
+        vectors = self._vectors(items)
+        n = len(items)
+        relevance = [1.0 - i / max(n, 1) for i in range(n)]
+        similarity = vectors @ vectors.T if vectors is not None else None
+
+        selected: List[int] = []
+        remaining = list(range(n))
+        used = 0
+        while remaining and len(selected) < max_chunks:
+            def mmr(i: int) -> float:
+                if similarity is None or not selected:
+                    return relevance[i]
+                redundancy = max(similarity[i, j] for j in selected)
+                return self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy
+
+            best = max(remaining, key=mmr)
+            remaining.remove(best)
+            tokens = self._tokens(items[best]["text"])
+
+            if used + tokens > self.token_budget:
+                if not selected:
+                    # o melhor chunk sozinho já estoura o orçamento → entra truncado
+                    items[best] = {**items[best], "text": self._truncate(items[best]["text"], self.token_budget)}
+                    selected.append(best)
+                    used = self.token_budget
+                    break
+                continue
+            selected.append(best)
+            used += tokens
+
+        logger.info(
+            "context.packed",
+            n_candidates=n,
+            n_selected=len(selected),
+            tokens=used,
+            budget=self.token_budget,
+        )
+        return [items[i] for i in selected]
+
+    @staticmethod
+    def collapse(items: List[Dict[str, Any]]) -> List[str]:
+        """
+        Junta chunks consecutivos (order, order+1, ...) do mesmo doc_id/section_path
+        num único bloco. Os blocos seguem a ordem do melhor chunk de cada um.
+        """
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for item in items:
+            meta = item.get("metadata") or {}
+            key = (meta.get("doc_id"), meta.get("section_path"))
+            groups.setdefault(key, []).append(item)
+
+        blocks: List[tuple] = []  # (posição do melhor chunk, texto)
+        position = {id(item): i for i, item in enumerate(items)}
+        for members in groups.values():
+            members.sort(key=lambda item: (item.get("metadata") or {}).get("order", 0))
+            run = [members[0]]
+            for item in members[1:]:
+                prev = (run[-1].get("metadata") or {}).get("order")
+                order = (item.get("metadata") or {}).get("order")
+                if prev is not None and order is not None and order == prev + 1:
+                    run.append(item)
+                    continue
+                blocks.append((min(position[id(m)] for m in run), "\n".join(m["text"] for m in run)))
+                run = [item]
+            blocks.append((min(position[id(m)] for m in run), "\n".join(m["text"] for m in run)))
+
+        return [text for _, text in sorted(blocks, key=lambda block: block[0])]
+
+    def render(self, selected: List[Dict[str, Any]]) -> str:
+        return SEPARATOR.join(self.collapse(selected))
+
+    def pack(self, items: List[Dict[str, Any]], max_chunks: int) -> str:
+        return self.render(self.select(items, max_chunks))
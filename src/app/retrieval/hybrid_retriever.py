@@ -0,0 +1,97 @@
+from typing import Any, Dict, List, Tuple
+
+from src.app.core.logging import get_logger
+from src.app.core.metrics import stage_timer
+from src.app.retrieval.chroma_retriever import ChromaRetriever
+from src.app.retrieval.retriever import rrf_fuse
+
+logger = get_logger(__name__)
+
+
+class HybridRetriever(ChromaRetriever):
+    """
+    Retriever híbrido: busca vetorial (HNSW) + lexical (BM25 do store),
+    ambas com os mesmos filtros de metadados, fundidas por RRF. O cache de
+    resultados (chave query, where, top_k + versão da coleção) guarda o
+    resultado fundido.
+
+    Termos exatos (tickers, nomes de linhas de tabela, números) que o
+    embedding captura mal entram pelo BM25, o que permite um top_k menor.
+    """
+
+    def __init__(self, store, embeddings, rrf_k: int = 60, candidates: int = 2, query_cache=None, result_cache=None):
+        super().__init__(store, embeddings, query_cache=query_cache, result_cache=result_cache)
+        self.rrf_k = rrf_k
+        # cada lado busca `candidates` × top_k antes da fusão
+        self.candidates = candidates
+
+    def _query_include(self) -> List[str]:
+        if self.store.lexical is None:
+            return super()._query_include()
+        # só top_k dos `candidates` × top_k de cada lado sobrevivem à fusão:
+        # os vetores (MMR) são buscados depois, só para eles (_attach_vectors)
+        return ["documents", "metadatas", "distances"]
+
+    def _lexical(self, query: str, where: Dict[str, Any], n: int) -> List[Dict[str, Any]]:
+        try:
+            with stage_timer("bm25"):
+                hits = self.store.lexical.search(query, where=where, top_k=n)
+        except ValueError as e:
+            logger.error("retriever.lexical_failed", error=str(e))
+            return []
+        if not hits:
+            return []
+        ids = [chunk_id for chunk_id, _ in hits]
+        raw = self.store.collection.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {i: (doc, meta) for i, doc, meta in zip(raw["ids"], raw["documents"], raw["metadatas"])}
+        return [
+            {
+                "id": chunk_id,
+                "text": by_id[chunk_id][0],
+                "metadata": by_id[chunk_id][1],
+                "vector": None,
+                "bm25": score,
+            }
+            for chunk_id, score in hits
+            if chunk_id in by_id
+        ]
+
+    def _search(self, query: str, where: Dict[str, Any], top_k: int) -> List[Dict[str, Any]]:
+        # o resultado fundido é o que o ChromaRetriever guarda no cache de resultados
+        if self.store.lexical is None:
+            return super()._search(query, where, top_k)
+
+        n = top_k * self.candidates
+        vector = super()._search(query, where, n)
+        lexical = self._lexical(query, where, n)
+
+        fused = rrf_fuse([vector, lexical], k=self.rrf_k)[:top_k]
+        self._attach_vectors([fused])
+        logger.info(
+            "retriever.hybrid",
+            n_vector=len(vector),
+            n_lexical=len(lexical),
+            n_overlap=len({r["id"] for r in vector} & {r["id"] for r in lexical}),
+            n_results=len(fused),
+        )
+        return fused
+
+    def _search_batch(
+        self,
+        items: List[Tuple[str, Dict[str, Any]]],
+        top_k: int
+    ) -> List[List[Dict[str, Any]]]:
+        if self.store.lexical is None:
+            return super()._search_batch(items, top_k)
+
+        n = top_k * self.candidates
+        vector = super()._search_batch(items, n)
+
+        # pares (query, where) já distintos → BM25 uma vez por par
+        fused = [
+            rrf_fuse([vector_hits, self._lexical(query, where, n)], k=self.rrf_k)[:top_k]
+            for (query, where), vector_hits in zip(items, vector)
+        ]
+        self._attach_vectors(fused)
+        logger.info("retriever.hybrid_batch", n_requests=len(items))
+        return fused
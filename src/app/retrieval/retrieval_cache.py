@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app.core.logging import get_logger
+from src.app.core.metrics import CACHE_REQUESTS
+from src.app.core.utils import sha1_text
+
+logger = get_logger(__name__)
+
+ResultKey = Tuple[str, str, int]
+
+
+def result_key(query: str, where: Dict[str, Any], top_k: int) -> ResultKey:
+    """
+    Chave do cache de resultados: (hash da query, where sanitizado, top_k).
+    """
+    return sha1_text(query), json.dumps(where, sort_keys=True, ensure_ascii=False), top_k
+
+
+class QueryVectorCache:
+    """
+    LRU em memória de vetores de queries (texto exato → vetor), na frente
+    do provider de embeddings: queries repetidas pelo planner não pagam o
+    round-trip do embedding.
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, embed_fn: Callable[[List[str]], np.ndarray], texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Vetores de `texts` (distintos): os ausentes vão numa única chamada a embed_fn.
+        """
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for text in texts:
+                vec = self._entries.get(text)
+                if vec is not None:
+                    self._entries.move_to_end(text)
+                    found[text] = vec
+        missing = [t for t in texts if t not in found]
+
+        CACHE_REQUESTS.inc(len(found), cache="query_vector", result="hit")
+        CACHE_REQUESTS.inc(len(missing), cache="query_vector", result="miss")
+        if not missing:
+            return found
+
+        fresh = dict(zip(missing, embed_fn(missing)))
+        with self._lock:
+            for text, vec in fresh.items():
+                self._entries[text] = vec
+                self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        found.update(fresh)
+        return found
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RetrievalResultCache:
+    """
+    Cache em memória dos resultados de collection.query.
+    Cada entrada guarda a versão da coleção (ChromaHnswStore.version, compartilhada
+    entre os processos do host) em que foi calculada: qualquer upsert/update/delete
+    muda a versão e a entrada deixa de ser servida. O TTL limita entradas obsoletas
+    quando a coleção é escrita de outro host (réplicas com Chroma HTTP).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        # chave → (versão da coleção, criado em, resultados)
+        self._entries: "OrderedDict[ResultKey, Tuple[int, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: ResultKey, version: int) -> Optional[List[Dict[str, Any]]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] != version or now - entry[1] > self.ttl_s):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc(cache="retrieval", result="hit" if entry is not None else "miss")
+        return list(entry[2]) if entry is not None else None
+
+    def put(self, key: ResultKey, version: int, results: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._entries[key] = (version, time.time(), list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
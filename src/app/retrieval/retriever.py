@@ -1,9 +1,25 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence, Tuple
 from src.app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
 
+def rrf_fuse(rankings: Sequence[Sequence[Dict[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Reciprocal-rank fusion: score(d) = Σ 1 / (k + rank_i(d)).
+    Cada ranking é uma lista de resultados com "id"; o primeiro resultado
+    visto para cada id é o mantido (com o score fundido em "score").
+    """
+    scores: Dict[str, float] = {}
+    items: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item["id"]] = scores.get(item["id"], 0.0) + 1.0 / (k + rank)
+            items.setdefault(item["id"], item)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [{**items[i], "score": scores[i]} for i in ordered]
+
+
 class Retriever:
     """
     Classe base responsável por definir a interface de retrieval.
@@ -22,3 +38,15 @@ class Retriever:
     ) -> List[Dict[str, Any]]:
         logger.info("retriever.base_called")
         raise NotImplementedError("Implement retrieve() in subclasses.")
+
+    def retrieve_batch(
+        self,
+        requests: List[Tuple[str, Dict[str, Any] | None]],
+        top_k: int = 5
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Várias buscas (query, metadata_filters) de uma vez, resultados na mesma ordem.
+        Implementação padrão: uma chamada a retrieve() por busca.
+        """
+        return [self.retrieve(query, filters, top_k) for query, filters in requests]
+
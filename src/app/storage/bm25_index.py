@@ -0,0 +1,294 @@
+import heapq
+import math
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from src.app.core.logging import get_logger
+from src.app.core.utils import ensure_dir
+
+logger = get_logger(__name__)
+
+# limite de variáveis por statement do SQLite (versões antigas: 999)
+_SQL_BATCH = 500
+
+# metadados copiados para colunas → os mesmos filtros `where` do Chroma valem aqui
+FILTER_COLUMNS = {
+    "company": "TEXT",
+    "doc_type": "TEXT",
+    "chunk_kind": "TEXT",
+    "section_path": "TEXT",
+    "doc_year": "INTEGER",
+    "doc_quarter": "INTEGER",
+    "doc_epoch": "INTEGER",
+}
+
+_OPERATORS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+# termos numéricos/tickers ficam inteiros: "10-q", "1,234.5", "q3", "ebitda"
+_TOKEN = re.compile(r"\w+(?:[-.,/]\w+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the to was were will with "
+    "what which who how does did do this these those "
+    "o os as um uma de da do das dos e em no na nos nas para por com que qual quais foi é ao à se"
+    .split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [t for t in _TOKEN.findall(text) if t not in STOPWORDS]
+
+
+def where_to_sql(where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """
+    Traduz o `where` do Chroma (saída de sanitize_filters) para SQL sobre `docs`.
+    Suporta $and/$or, $eq/$ne/$gt/$gte/$lt/$lte e $in/$nin.
+    """
+    if not where:
+        return "1", []
+
+    clauses: List[str] = []
+    params: List[Any] = []
+    for key, value in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_to_sql(sub) for sub in value]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(sql for sql, _ in parts) + ")")
+            for _, p in parts:
+                params += p
+            continue
+
+        if key not in FILTER_COLUMNS:
+            raise ValueError(f"Campo de filtro não suportado no índice BM25: {key}")
+        conditions = value if isinstance(value, dict) else {"$eq": value}
+        for op, operand in conditions.items():
+            if op in _OPERATORS:
+                clauses.append(f"d.{key} {_OPERATORS[op]} ?")
+                params.append(operand)
+            elif op in ("$in", "$nin"):
+                marks = ",".join("?" * len(operand)) or "NULL"
+                clauses.append(f"d.{key} {'IN' if op == '$in' else 'NOT IN'} ({marks})")
+                params += list(operand)
+            else:
+                raise ValueError(f"Operador não suportado no índice BM25: {op}")
+    return "(" + " AND ".join(clauses) + ")", params
+
+
+class BM25Index:
+    """
+    Índice invertido (BM25) dos chunks, persistido em SQLite e mantido
+    incrementalmente a cada upsert/update/delete do ChromaHnswStore.
+
+    Postings compactas: tabela WITHOUT ROWID com chaves inteiras
+    (term_id, doc_num, tf). Os metadados filtráveis ficam em colunas de
+    `docs`, então a busca respeita os mesmos filtros do Chroma.
+    """
+
+    def __init__(self, path: Path, k1: float = 1.2, b: float = 0.75):
+        ensure_dir(path.parent)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ",\n".join(f"{name} {kind}" for name, kind in FILTER_COLUMNS.items())
+        self._conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_num  INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                length   INTEGER NOT NULL,
+                {columns}
+            );
+            CREATE TABLE IF NOT EXISTS terms (
+                term_id INTEGER PRIMARY KEY,
+                term    TEXT NOT NULL UNIQUE,
+                df      INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER NOT NULL,
+                doc_num INTEGER NOT NULL,
+                tf      INTEGER NOT NULL,
+                PRIMARY KEY (term_id, doc_num)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_num);
+            CREATE TABLE IF NOT EXISTS stats (
+                key   TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO stats (key, value) VALUES ('n_docs', 0), ('total_length', 0);
+            """
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (n,) = self._conn.execute("SELECT value FROM stats WHERE key = 'n_docs'").fetchone()
+        return n
+
+    # ---------------------------
+    #   ESCRITA (chamada pelo store)
+    # ---------------------------
+
+    def _bump_stats(self, n_docs: int, total_length: int) -> None:
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'n_docs'", (n_docs,))
+        self._conn.execute("UPDATE stats SET value = value + ? WHERE key = 'total_length'", (total_length,))
+
+    def _remove(self, ids: Sequence[str]) -> None:
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = list(ids[start:start + _SQL_BATCH])
+            marks = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT doc_num, length FROM docs WHERE chunk_id IN ({marks})", batch
+            ).fetchall()
+            if not rows:
+                continue
+            nums = [num for num, _ in rows]
+            num_marks = ",".join("?" * len(nums))
+            df = Counter(term_id for (term_id,) in self._conn.execute(
+                f"SELECT term_id FROM postings WHERE doc_num IN ({num_marks})", nums
+            ))
+            self._conn.executemany("UPDATE terms SET df = df - ? WHERE term_id = ?", [(n, t) for t, n in df.items()])
+            self._conn.executemany("DELETE FROM terms WHERE term_id = ? AND df <= 0", [(t,) for t in df])
+            self._conn.execute(f"DELETE FROM postings WHERE doc_num IN ({num_marks})", nums)
+            self._conn.execute(f"DELETE FROM docs WHERE doc_num IN ({num_marks})", nums)
+            self._bump_stats(-len(rows), -sum(length for _, length in rows))
+
+    def _term_ids(self, terms: Iterable[str]) -> Dict[str, int]:
+        terms = list(terms)
+        found: Dict[str, int] = {}
+        for start in range(0, len(terms), _SQL_BATCH):
+            batch = terms[start:start + _SQL_BATCH]
+            marks = ",".join("?" * len(batch))
+            found.update(self._conn.execute(f"SELECT term, term_id FROM terms WHERE term IN ({marks})", batch))
+        missing = [t for t in terms if t not in found]
+        if missing:
+            self._conn.executemany("INSERT INTO terms (term, df) VALUES (?, 0)", [(t,) for t in missing])
+            for start in range(0, len(missing), _SQL_BATCH):
+                batch = missing[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                found.update(self._conn.execute(f"SELECT term, term_id FROM terms WHERE term IN ({marks})", batch))
+        return found
+
+    @staticmethod
+    def _filter_values(meta: Dict[str, Any]) -> List[Any]:
+        return [meta.get(name) for name in FILTER_COLUMNS]
+
+    def record_upsert(self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        if not ids:
+            return
+        counts = [Counter(tokenize(text)) for text in texts]
+        with self._lock:
+            # chunk_id é derivado do conteúdo, mas o upsert pode repetir ids → substitui
+            self._remove(ids)
+            term_ids = self._term_ids({t for c in counts for t in c})
+
+            columns = ", ".join(FILTER_COLUMNS)
+            marks = ", ".join("?" * len(FILTER_COLUMNS))
+            postings: List[Tuple[int, int, int]] = []
+            df: Counter = Counter()
+            total_length = 0
+            for chunk_id, tf, meta in zip(ids, counts, metadatas):
+                length = sum(tf.values())
+                total_length += length
+                cur = self._conn.execute(
+                    f"INSERT INTO docs (chunk_id, length, {columns}) VALUES (?, ?, {marks})",
+                    [chunk_id, length, *self._filter_values(meta)],
+                )
+                doc_num = cur.lastrowid
+                for term, n in tf.items():
+                    postings.append((term_ids[term], doc_num, n))
+                    df[term_ids[term]] += 1
+
+            self._conn.executemany("INSERT INTO postings (term_id, doc_num, tf) VALUES (?, ?, ?)", postings)
+            self._conn.executemany("UPDATE terms SET df = df + ? WHERE term_id = ?", [(n, t) for t, n in df.items()])
+            self._bump_stats(len(ids), total_length)
+            self._conn.commit()
+
+    def record_update(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        if not ids:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in FILTER_COLUMNS)
+        with self._lock:
+            self._conn.executemany(
+                f"UPDATE docs SET {assignments} WHERE chunk_id = ?",
+                [[*self._filter_values(meta), chunk_id] for chunk_id, meta in zip(ids, metadatas)],
+            )
+            self._conn.commit()
+
+    def record_delete(self, ids: Sequence[str]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            self._remove(ids)
+            self._conn.commit()
+
+    def rebuild(self, pages: Iterable[Tuple[List[str], List[str], List[Dict[str, Any]]]]) -> None:
+        """
+        Reconstrói o índice a partir de páginas (ids, documents, metadatas) da coleção.
+        Usado quando o índice não bate com a coleção (ex: coleção pré-existente).
+        """
+        with self._lock:
+            for table in ("postings", "docs", "terms"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("UPDATE stats SET value = 0")
+            self._conn.commit()
+        n = 0
+        for ids, texts, metas in pages:
+            self.record_upsert(ids, texts, metas)
+            n += len(ids)
+        logger.info("bm25.rebuilt", n_chunks=n)
+
+    # ---------------------------
+    #   BUSCA
+    # ---------------------------
+
+    def search(self, query: str, where: Dict[str, Any] | None = None, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Top-k chunks por BM25 entre os que satisfazem `where`. Retorna (chunk_id, score).
+        """
+        terms = Counter(tokenize(query))
+        if not terms:
+            return []
+        filter_sql, filter_params = where_to_sql(where or {})
+
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT key, value FROM stats"))
+            n_docs = stats["n_docs"]
+            if n_docs == 0:
+                return []
+            avgdl = stats["total_length"] / n_docs
+
+            marks = ",".join("?" * len(terms))
+            known = self._conn.execute(
+                f"SELECT term, term_id, df FROM terms WHERE term IN ({marks})", list(terms)
+            ).fetchall()
+
+            scores: Dict[int, float] = {}
+            for term, term_id, df in known:
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                rows = self._conn.execute(
+                    "SELECT p.doc_num, p.tf, d.length FROM postings p JOIN docs d ON d.doc_num = p.doc_num "
+                    f"WHERE p.term_id = ? AND {filter_sql}",
+                    [term_id, *filter_params],
+                )
+                for doc_num, tf, length in rows:
+                    norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+                    scores[doc_num] = scores.get(doc_num, 0.0) + idf * norm * terms[term]
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            if not best:
+                return []
+            num_marks = ",".join("?" * len(best))
+            chunk_ids = dict(self._conn.execute(
+                f"SELECT doc_num, chunk_id FROM docs WHERE doc_num IN ({num_marks})", [num for num, _ in best]
+            ))
+        return [(chunk_ids[num], score) for num, score in best]
@@ -1,15 +1,143 @@
-from typing import List, Dict, Any, Optional
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import socket
+import time
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Sequence, Tuple
+import httpx
 
 from src.app.config.settings import settings
+from src.app.core.dates import date_fields
+from src.app.core.logging import get_logger
+from src.app.storage.bm25_index import BM25Index
+from src.app.storage.facets import FacetCatalog
+from src.app.storage.store_state import StoreState
 
-class ChromaHnswStore:
-    def __init__(self):
-        self.client = chromadb.PersistentClient(
+logger = get_logger(__name__)
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+# respostas HTTP do servidor Chroma que valem nova tentativa
+RETRYABLE_STATUS = {502, 503, 504}
+
+
+def _transient(error: Optional[BaseException]) -> bool:
+    if error is None:
+        return False
+    if isinstance(error, httpx.TransportError):  # conexão, timeout, protocolo
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    # o cliente do Chroma embrulha alguns erros de conexão (ex: ValueError no connect)
+    return _transient(error.__cause__ or error.__context__)
+
+
+def _with_retries(op: str, fn: Callable, *args, retries: int = 3, backoff_s: float = 0.2, **kwargs):
+    """
+    Executa `fn` com novas tentativas (backoff exponencial) só em falhas transitórias.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt >= retries or not _transient(e):
+                raise
+            delay = backoff_s * 2 ** attempt
+            logger.warning("chroma.retry", op=op, attempt=attempt + 1, delay_s=delay, error=str(e))
+            time.sleep(delay)
+
+
+class RetryingCollection:
+    """
+    Proxy da Collection do cliente HTTP: mesma interface (query, get, upsert...),
+    com novas tentativas em falhas transitórias. Todas as escritas do store são
+    idempotentes (upsert/update/delete por id).
+    """
+    RETRIED = {"query", "get", "upsert", "update", "delete", "count", "peek"}
+
+    def __init__(self, collection, retries: int = 3, backoff_s: float = 0.2):
+        self._collection = collection
+        self._retries = retries
+        self._backoff_s = backoff_s
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._collection, name)
+        if name not in self.RETRIED:
+            return attr
+
+        def call(*args, **kwargs):
+            return _with_retries(name, attr, *args, retries=self._retries, backoff_s=self._backoff_s, **kwargs)
+        return call
+
+
+def _connect():
+    """
+    Cliente Chroma conforme settings.chroma_mode.
+    No modo http o cliente mantém um pool de conexões keep-alive (httpx).
+    O chromadb é importado aqui (~0.6s): importar o módulo não carrega o cliente.
+    """
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    mode = settings.chroma_mode.lower()
+    if mode == "embedded":
+        return chromadb.PersistentClient(
             path=str(settings.chroma_dir),
             settings=ChromaSettings(anonymized_telemetry=False),
         )
+    if mode != "http":
+        raise ValueError(f"CHROMA_MODE não suportado: {settings.chroma_mode}")
+
+    client = _with_retries(
+        "connect",
+        chromadb.HttpClient,
+        host=settings.chroma_host,
+        port=settings.chroma_port,
+        ssl=settings.chroma_ssl,
+        settings=ChromaSettings(
+            anonymized_telemetry=False,
+            chroma_http_keepalive_secs=settings.chroma_http_keepalive_s,
+            chroma_http_max_connections=settings.chroma_http_max_connections,
+            chroma_http_max_keepalive_connections=settings.chroma_http_max_connections,
+        ),
+        retries=settings.chroma_http_retries,
+        backoff_s=settings.chroma_http_retry_backoff_s,
+    )
+    # o cliente do Chroma cria a sessão httpx sem timeout
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if isinstance(session, httpx.Client):
+        session.timeout = httpx.Timeout(
+            settings.chroma_http_timeout_s,
+            connect=settings.chroma_http_connect_timeout_s,
+        )
+    else:
+        logger.warning("chroma.http_timeout_not_set")
+    logger.info(
+        "chroma.http_client",
+        host=settings.chroma_host,
+        port=settings.chroma_port,
+        max_connections=settings.chroma_http_max_connections,
+        timeout_s=settings.chroma_http_timeout_s,
+    )
+    return client
+
+
+class ChromaHnswStore:
+    """
+    Coleção Chroma (HNSW) + índices auxiliares locais (facetas, BM25).
+    Cliente embarcado (PersistentClient) ou HTTP (CHROMA_MODE=http),
+    com a mesma interface de upsert/query para o resto da aplicação.
+    """
+
+    def __init__(self):
+        self.client = _connect()
+        self.remote = settings.chroma_mode.lower() == "http"
 
         collection_config = {
             "hnsw": {
@@ -25,24 +153,190 @@ class ChromaHnswStore:
             name=settings.chroma_collection,
             configuration=collection_config,
         )
+        if self.remote:
+            self.collection = RetryingCollection(
+                self.collection,
+                retries=settings.chroma_http_retries,
+                backoff_s=settings.chroma_http_retry_backoff_s,
+            )
 
-    def upsert(self, chunks, embeddings) -> None:
-        ids = [c.chunk_id for c in chunks]
-        docs = [c.text for c in chunks]
-
-        metas = []
-        for c in chunks:
-            metas.append({
-                "doc_id": c.doc_id,
-                "chunk_kind": c.chunk_kind,
-                "order": c.order,
-                "section_path": " > ".join(c.section_path),
-                **c.metadata,
-            })
-
-        self.collection.upsert(
-            ids=ids,
-            documents=docs,
-            metadatas=metas,
-            embeddings=embeddings,
+        # o Chroma rejeita lotes acima do limite do servidor/SQLite
+        max_batch = getattr(self.client, "get_max_batch_size", lambda: settings.chroma_write_batch_size)()
+        self.write_batch_size = max(1, min(settings.chroma_write_batch_size, max_batch))
+
+        # versão compartilhada entre processos: invalida os resultados cacheados pelo retriever
+        self.state = StoreState(settings.store_state_path)
+        if self.remote:
+            self._claim_collection()
+
+        # facetas (company, doc_type, ...) mantidas a cada escrita → sem full scan por pergunta
+        self.facets = FacetCatalog(settings.facets_path, settings.facet_fields)
+        # índice lexical (BM25) para o retrieval híbrido, mantido junto com as escritas
+        self.lexical = BM25Index(settings.bm25_path) if settings.bm25_enabled else None
+
+        # vários workers sobem juntos: só um reconstrói, os outros encontram os índices em dia
+        with self.state.rebuild_lock():
+            count = self.collection.count()
+            if len(self.facets) != count:
+                self.facets.rebuild(self._iter_metadata_pages())
+            if self.lexical is not None and len(self.lexical) != count:
+                self.lexical.rebuild(
+                    (page["ids"], page["documents"], page["metadatas"])
+                    for page in self._iter_pages(["documents", "metadatas"])
+                )
+
+    def _claim_collection(self) -> None:
+        """
+        Versão, lock de rebuild, facetas e BM25 vivem no DATA_DIR deste host: outra
+        instalação escrevendo na mesma coleção deixaria tudo isso defasado sem aviso.
+        O dono (instance_id do StoreState) fica num registro de uma coleção auxiliar
+        do servidor; uma instalação diferente é recusada na subida.
+        """
+        marker = self.client.get_or_create_collection(
+            name=f"{settings.chroma_collection}_owner",
+            embedding_function=None,
         )
+        found = marker.get(ids=["owner"], include=["documents", "metadatas"])
+        if not found["ids"] or settings.chroma_claim_collection:
+            marker.upsert(
+                ids=["owner"],
+                documents=[self.state.instance_id],
+                metadatas=[{"host": socket.gethostname()}],
+                embeddings=[[0.0]],
+            )
+            # duas instalações novas ao mesmo tempo: a última escrita vence
+            found = marker.get(ids=["owner"], include=["documents", "metadatas"])
+
+        owner = found["documents"][0]
+        if owner != self.state.instance_id:
+            host = (found["metadatas"][0] or {}).get("host")
+            raise RuntimeError(
+                f"Coleção '{settings.chroma_collection}' pertence a outra instalação (host {host}). "
+                "Em CHROMA_MODE=http os índices locais (facetas, BM25, versão) exigem um único "
+                "host por coleção; use outra CHROMA_COLLECTION ou CHROMA_CLAIM_COLLECTION=true "
+                "para assumi-la."
+            )
+        logger.info("chroma.collection_owner", host=socket.gethostname())
+
+    @property
+    def version(self) -> int:
+        return self.state.version
+
+    def _bump_version(self) -> None:
+        self.state.bump()
+
+    def _iter_pages(self, include: List[str]) -> Iterator[Dict[str, Any]]:
+        offset = 0
+        while True:
+            page = self.collection.get(include=include, limit=self.write_batch_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield page
+            offset += len(page["ids"])
+
+    def _iter_metadata_pages(self) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+        for page in self._iter_pages(["metadatas"]):
+            yield page["ids"], page["metadatas"]
+
+    @staticmethod
+    def _chunk_metadata(c) -> Dict[str, Any]:
+        return {
+            "doc_id": c.doc_id,
+            "chunk_kind": c.chunk_kind,
+            "order": c.order,
+            "section_path": " > ".join(c.section_path),
+            **c.metadata,
+        }
+
+    def upsert(self, chunks, embeddings) -> None:
+        self.upsert_stream(zip(chunks, embeddings))
+
+    def upsert_stream(
+        self,
+        pairs: Iterable[Tuple[Any, Sequence[float]]],
+        batch_size: Optional[int] = None,
+    ) -> int:
+        """
+        Grava pares (chunk, vetor) em lotes limitados, consumindo o iterador aos poucos:
+        se o iterador produz embeddings sob demanda, o próximo lote de embeddings
+        é calculado enquanto este lote é gravado. Retorna o total gravado.
+        """
+        batch_size = max(1, min(batch_size or self.write_batch_size, self.write_batch_size))
+        total = 0
+
+        for batch in _batched(pairs, batch_size):
+            started = time.perf_counter()
+            ids = [c.chunk_id for c, _ in batch]
+            metas = [self._chunk_metadata(c) for c, _ in batch]
+            texts = [c.text for c, _ in batch]
+            self.collection.upsert(
+                ids=ids,
+                documents=texts,
+                metadatas=metas,
+                # vetores float32 (np.ndarray) vão direto ao Chroma, sem virar listas
+                embeddings=[v for _, v in batch],
+            )
+            self.facets.record_upsert(ids, metas)
+            if self.lexical is not None:
+                self.lexical.record_upsert(ids, texts, metas)
+            self._bump_version()
+            total += len(batch)
+            logger.info(
+                "chroma.upsert_batch",
+                n=len(batch),
+                total=total,
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+            )
+
+        return total
+
+    def update_metadata(self, chunks) -> None:
+        """
+        Atualiza apenas a metadata de chunks já indexados (sem reenviar vetores).
+        """
+        for batch in _batched(chunks, self.write_batch_size):
+            ids = [c.chunk_id for c in batch]
+            metas = [self._chunk_metadata(c) for c in batch]
+            self.collection.update(ids=ids, metadatas=metas)
+            self.facets.record_upsert(ids, metas)
+            if self.lexical is not None:
+                self.lexical.record_update(ids, metas)
+            self._bump_version()
+
+    def backfill_date_fields(self) -> int:
+        """
+        Grava doc_year/doc_quarter/doc_epoch (derivados de doc_date) nos chunks
+        indexados antes desses campos existirem: sem doc_epoch, os filtros de
+        data os excluem. Retorna quantos chunks foram atualizados.
+        """
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+        for ids, metas in self._iter_metadata_pages():
+            for chunk_id, meta in zip(ids, metas):
+                if meta is not None and "doc_epoch" not in meta:
+                    pending.append((chunk_id, {**meta, **date_fields(meta.get("doc_date"))}))
+
+        # atualiza depois da varredura: não mexe na coleção enquanto pagina por offset
+        for batch in _batched(pending, self.write_batch_size):
+            ids = [chunk_id for chunk_id, _ in batch]
+            metas = [meta for _, meta in batch]
+            self.collection.update(ids=ids, metadatas=metas)
+            self.facets.record_upsert(ids, metas)
+            if self.lexical is not None:
+                self.lexical.record_update(ids, metas)
+            self._bump_version()
+        logger.info("chroma.backfill_date_fields", updated=len(pending))
+        return len(pending)
+
+    def ids_for_doc(self, doc_id: str) -> List[str]:
+        """
+        IDs de todos os chunks do documento presentes na coleção.
+        """
+        return self.collection.get(where={"doc_id": doc_id}, include=[])["ids"]
+
+    def delete(self, ids: List[str]) -> None:
+        for batch in _batched(ids, self.write_batch_size):
+            self.collection.delete(ids=batch)
+            self.facets.record_delete(batch)
+            if self.lexical is not None:
+                self.lexical.record_delete(batch)
+            self._bump_version()
@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.app.core.logging import get_logger
+from src.app.core.metrics import CACHE_REQUESTS
+from src.app.core.utils import ensure_dir, sha1_text
+from src.app.storage.embeddings import EmbeddingsProvider, as_float32_matrix
+
+logger = get_logger(__name__)
+
+# limite de variáveis por statement do SQLite (versões antigas: 999)
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """
+    Cache persistente (SQLite) de embeddings endereçado por conteúdo.
+
+    Chave: (provider, model, sha1_text(texto)).
+    Vetores são gravados como float32 compactos.
+    Quando passa de max_entries, remove as entradas acessadas há mais tempo (LRU).
+    """
+
+    def __init__(self, path: Path, max_entries: int = 500_000):
+        ensure_dir(path.parent)
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                provider    TEXT NOT NULL,
+                model       TEXT NOT NULL,
+                text_hash   TEXT NOT NULL,
+                vector      BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (provider, model, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+
+    def get_many(self, provider: str, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Busca em lote. Retorna {text_hash: vetor float32} apenas para os hits
+        (vetores lidos direto do BLOB, sem passar por listas de floats).
+        """
+        found: Dict[str, np.ndarray] = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+
+        with self._lock:
+            for start in range(0, len(unique), _SQL_BATCH):
+                batch = unique[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE provider = ? AND model = ? AND text_hash IN ({marks})",
+                    [provider, model, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? "
+                    "WHERE provider = ? AND model = ? AND text_hash = ?",
+                    [(now, provider, model, h) for h in found],
+                )
+                self._conn.commit()
+
+        return found
+
+    def put_many(self, provider: str, model: str, items: Dict[str, np.ndarray]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (provider, model, text_hash, np.asarray(vec, dtype=np.float32).tobytes(), now)
+            for text_hash, vec in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (provider, model, text_hash, vector, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN ("
+            "SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        )
+        logger.info("embedding_cache.evicted", n_evicted=excess)
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddingsProvider(EmbeddingsProvider):
+    """
+    Wrapper que consulta o EmbeddingCache antes do provider real.
+    Apenas os misses (deduplicados) são enviados ao modelo.
+    """
+
+    def __init__(self, inner: EmbeddingsProvider, cache: Optional[EmbeddingCache] = None):
+        self.inner = inner
+        self.cache = cache
+        self.provider_name = inner.provider_name
+        self.model_name = inner.model_name
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        hashes = [sha1_text(t) for t in texts]
+        cached = self.cache.get_many(self.provider_name, self.model_name, hashes)
+
+        # textos inéditos, sem repetição, na ordem original
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+
+        if missing:
+            vectors = self.inner.embed_array(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.provider_name, self.model_name, fresh)
+            cached.update(fresh)
+
+        n_hits = len(texts) - sum(1 for h in hashes if h in missing)
+        CACHE_REQUESTS.inc(n_hits, cache="embedding", result="hit")
+        CACHE_REQUESTS.inc(len(missing), cache="embedding", result="miss")
+        logger.info(
+            "embedding_cache.lookup",
+            provider=self.provider_name,
+            n_texts=len(texts),
+            n_hits=n_hits,
+            n_misses=len(missing),
+        )
+        return as_float32_matrix([cached[h] for h in hashes])
@@ -1,10 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import List
+
+import numpy as np
+
 from src.app.config.settings import settings
 
 
+def as_float32_matrix(vectors) -> np.ndarray:
+    """
+    Matriz (n, dim) float32 C-contígua; não copia se já estiver nesse formato.
+    """
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
 class EmbeddingsProvider:
+    """
+    Interface dos providers de embeddings. Subclasses implementam pelo menos
+    um dos dois métodos:
+      - embed_array: matriz float32 (n, dim) contígua — caminho usado pela
+        ingestão, retriever e caches (sem listas de floats Python)
+      - embed: lista de listas, mantida por compatibilidade
+    """
+    # identificam o espaço vetorial (usados como chave do cache de embeddings)
+    provider_name: str = "base"
+    model_name: str = ""
+
     def embed(self, texts: List[str]) -> List[List[float]]:
-        raise NotImplementedError
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        return as_float32_matrix(self.embed(texts))
 
 
 class OpenAIEmbeddingProvider(EmbeddingsProvider):
@@ -12,11 +38,14 @@ class OpenAIEmbeddingProvider(EmbeddingsProvider):
     Usa o embedding mais barato da OpenAI: text-embedding-3-small
     via LangChain.
     """
+    provider_name = "openai"
+
     def __init__(self):
         from langchain_openai import OpenAIEmbeddings
 
+        self.model_name = settings.openai_embedding_model
         kwargs = {
-            "model": settings.openai_embedding_model, 
+            "model": self.model_name,
         }
 
 
@@ -26,35 +55,181 @@ class OpenAIEmbeddingProvider(EmbeddingsProvider):
         # LangChain faz batching automaticamente
         return self.model.embed_documents(texts)
 
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return as_float32_matrix(self.embed(texts))
+
 
 class LocalSentenceTransformerEmbeddings(EmbeddingsProvider):
     """
     Mantenho seu embedding local original caso queira rodar offline.
     """
-    def __init__(self, model_name: str):
+    provider_name = "local"
+
+    def __init__(self, model_name: str, batch_size: int = 32):
         from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
+        # textos por forward do modelo (encode processa a lista em lotes)
+        self.batch_size = max(1, batch_size)
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
         vectors = self.model.encode(
             texts,
+            batch_size=self.batch_size,
             show_progress_bar=False,
             convert_to_numpy=True,
             normalize_embeddings=True,
         )
-        return vectors.tolist()
+        return as_float32_matrix(vectors)
+
+
+# arquivos gerados por scripts/export_onnx.py
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model_quantized.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+class OnnxEmbeddings(EmbeddingsProvider):
+    """
+    Mesmo modelo do LocalSentenceTransformerEmbeddings (all-MiniLM-L6-v2),
+    exportado para ONNX e executado no ONNX Runtime (CPU), sem torch:
+      - tokenizer rápido (tokenizers/Rust) com truncamento em `max_length`
+      - mean pooling + normalização L2, como o SentenceTransformer →
+        vetores compatíveis com a coleção já indexada
+      - modelo int8 (quantização dinâmica) opcional
+      - textos ordenados por tamanho (menos padding) e lotes de `batch_size`,
+        distribuídos em `workers` threads (o ONNX Runtime libera o GIL)
+    """
+    provider_name = "onnx"
+
+    def __init__(
+        self,
+        model_dir: Path,
+        model_name: str,
+        quantized: bool = True,
+        intra_op_threads: int = 0,
+        batch_size: int = 32,
+        workers: int = 1,
+        max_length: int = 256,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = Path(model_dir) / (ONNX_QUANTIZED_FILE if quantized else ONNX_MODEL_FILE)
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"Modelo ONNX não encontrado em {model_path}; gere com scripts/export_onnx.py"
+            )
+
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+
+        self.tokenizer = Tokenizer.from_file(str(Path(model_dir) / TOKENIZER_FILE))
+        # sobrescreve o padding/truncamento fixos do tokenizer.json (ex: 128) pelo do modelo
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self._outputs = [self.session.get_outputs()[0].name]
+        self.dimension = int(self.session.get_outputs()[0].shape[-1])
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        # 1ª saída: last_hidden_state (batch, seq, dim)
+        hidden = self.session.run(self._outputs, {k: v for k, v in feed.items() if k in self._inputs})[0]
+
+        # mean pooling sobre os tokens reais + L2
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        out = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return out
+
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+
+        def run(idx: np.ndarray) -> None:
+            out[idx] = self._encode_batch([texts[i] for i in idx])
+
+        if self.workers == 1 or len(batches) == 1:
+            for idx in batches:
+                run(idx)
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="onnx-embed") as executor:
+                list(executor.map(run, batches))
+        return out
+
+
+def build_local_embeddings(provider: str = "auto") -> EmbeddingsProvider:
+    """
+    Modelo local (settings.local_embedding_model) fora do provider de indexação,
+    ex: protótipos do classificador de risco com EMBEDDING_PROVIDER=openai.
+    "auto" usa o export ONNX se existir, senão o sentence-transformers.
+    """
+    provider = provider.lower()
+    if provider == "auto":
+        model_file = ONNX_QUANTIZED_FILE if settings.onnx_quantized else ONNX_MODEL_FILE
+        provider = "onnx" if (Path(settings.onnx_model_dir) / model_file).exists() else "local"
+
+    if provider == "onnx":
+        return OnnxEmbeddings(
+            settings.onnx_model_dir,
+            settings.local_embedding_model,
+            quantized=settings.onnx_quantized,
+            intra_op_threads=settings.onnx_intra_op_threads,
+            batch_size=settings.local_embedding_batch_size,
+            workers=settings.onnx_workers,
+            max_length=settings.onnx_max_length,
+        )
+    if provider == "local":
+        return LocalSentenceTransformerEmbeddings(
+            settings.local_embedding_model,
+            batch_size=settings.local_embedding_batch_size,
+        )
+    raise ValueError(f"Embedding provider local não suportado: {provider}")
 
 
 def build_embeddings() -> EmbeddingsProvider:
     """
     Fabrica um provider baseado no settings.embedding_provider.
+    Se o cache estiver habilitado, o provider é envolvido pelo
+    CachedEmbeddingsProvider (só os textos inéditos vão ao modelo).
     """
     provider = settings.embedding_provider.lower()
 
     if provider == "openai":
-        return OpenAIEmbeddingProvider()
-
-    if provider == "local":
-        return LocalSentenceTransformerEmbeddings(settings.local_embedding_model)
-
-    raise ValueError(f"Embedding provider não suportado: {provider}")
+        inner = OpenAIEmbeddingProvider()
+    elif provider in ("local", "onnx"):
+        inner = build_local_embeddings(provider)
+    else:
+        raise ValueError(f"Embedding provider não suportado: {provider}")
+
+    if not settings.embedding_cache_enabled:
+        return inner
+
+    from src.app.storage.embedding_cache import CachedEmbeddingsProvider, EmbeddingCache
+    cache = EmbeddingCache(
+        path=settings.embedding_cache_path,
+        max_entries=settings.embedding_cache_max_entries,
+    )
+    return CachedEmbeddingsProvider(inner, cache)
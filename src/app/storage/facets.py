@@ -0,0 +1,177 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from src.app.core.logging import get_logger
+from src.app.core.utils import ensure_dir
+
+logger = get_logger(__name__)
+
+# pseudo-campo usado para contar as chaves de metadata presentes na coleção
+KEYS_FIELD = "__key__"
+
+
+class FacetCatalog:
+    """
+    Catálogo de facetas da coleção, mantido incrementalmente a cada
+    upsert/update/delete no ChromaHnswStore e persistido em SQLite.
+
+    Guarda valores distintos + contagens de campos como company, doc_type,
+    doc_date e chunk_kind (e as chaves de metadata existentes), respondendo
+    em O(1) a partir de um espelho em memória, sem varrer a coleção.
+    """
+
+    def __init__(self, path: Path, fields: Sequence[str]):
+        ensure_dir(path.parent)
+        self.fields = list(fields)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS facet_chunks (
+                chunk_id TEXT PRIMARY KEY,
+                facets   TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS facet_counts (
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (field, value)
+            );
+            """
+        )
+        self._conn.commit()
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._data_version = -1
+        self._reload()
+
+    # ---------------------------
+    #   LEITURA (O(1))
+    # ---------------------------
+
+    def _reload(self) -> None:
+        counts: Dict[str, Dict[str, int]] = {}
+        for field, value, count in self._conn.execute("SELECT field, value, count FROM facet_counts"):
+            counts.setdefault(field, {})[value] = count
+        self._counts = counts
+        (self._data_version,) = self._conn.execute("PRAGMA data_version").fetchone()
+
+    def _refresh(self) -> None:
+        # outro processo (ex: scripts/ingest.py) gravou → recarrega o espelho
+        (version,) = self._conn.execute("PRAGMA data_version").fetchone()
+        if version != self._data_version:
+            self._reload()
+
+    def counts(self, field: str) -> Dict[str, int]:
+        with self._lock:
+            self._refresh()
+            return dict(self._counts.get(field, {}))
+
+    def values(self, field: str) -> List[str]:
+        return sorted(self.counts(field))
+
+    def keys(self) -> List[str]:
+        return self.values(KEYS_FIELD)
+
+    def __len__(self) -> int:
+        with self._lock:
+            (n,) = self._conn.execute("SELECT COUNT(*) FROM facet_chunks").fetchone()
+        return n
+
+    # ---------------------------
+    #   ESCRITA (chamada pelo store)
+    # ---------------------------
+
+    def _facets_of(self, meta: Dict[str, Any]) -> Dict[str, List[str]]:
+        facets = {f: [str(meta[f])] for f in self.fields if meta.get(f) not in (None, "")}
+        facets[KEYS_FIELD] = sorted(meta.keys())
+        return facets
+
+    def _previous(self, ids: Sequence[str]) -> Dict[str, Dict[str, List[str]]]:
+        found = {}
+        for start in range(0, len(ids), 500):
+            batch = list(ids[start:start + 500])
+            marks = ",".join("?" * len(batch))
+            for chunk_id, facets in self._conn.execute(
+                f"SELECT chunk_id, facets FROM facet_chunks WHERE chunk_id IN ({marks})", batch
+            ):
+                found[chunk_id] = json.loads(facets)
+        return found
+
+    def _apply_delta(self, delta: Dict[Tuple[str, str], int]) -> None:
+        """
+        Aplica o delta no SQLite e no espelho em memória
+        (commits da própria conexão não alteram o data_version).
+        """
+        self._refresh()
+        for (field, value), diff in delta.items():
+            if diff == 0:
+                continue
+            self._conn.execute(
+                "INSERT INTO facet_counts (field, value, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(field, value) DO UPDATE SET count = count + excluded.count",
+                (field, value, diff),
+            )
+            values = self._counts.setdefault(field, {})
+            values[value] = values.get(value, 0) + diff
+            if values[value] <= 0:
+                del values[value]
+        self._conn.execute("DELETE FROM facet_counts WHERE count <= 0")
+
+    def record_upsert(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            previous = self._previous(ids)
+            delta: Dict[Tuple[str, str], int] = {}
+            rows = []
+            for chunk_id, meta in zip(ids, metadatas):
+                new = self._facets_of(meta)
+                for field, values in previous.get(chunk_id, {}).items():
+                    for v in values:
+                        delta[(field, v)] = delta.get((field, v), 0) - 1
+                for field, values in new.items():
+                    for v in values:
+                        delta[(field, v)] = delta.get((field, v), 0) + 1
+                rows.append((chunk_id, json.dumps(new)))
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO facet_chunks (chunk_id, facets) VALUES (?, ?)", rows
+            )
+            self._apply_delta(delta)
+            self._conn.commit()
+
+    def record_delete(self, ids: Sequence[str]) -> None:
+        if not ids:
+            return
+        with self._lock:
+            previous = self._previous(ids)
+            delta: Dict[Tuple[str, str], int] = {}
+            for facets in previous.values():
+                for field, values in facets.items():
+                    for v in values:
+                        delta[(field, v)] = delta.get((field, v), 0) - 1
+            self._conn.executemany(
+                "DELETE FROM facet_chunks WHERE chunk_id = ?", [(i,) for i in previous]
+            )
+            self._apply_delta(delta)
+            self._conn.commit()
+
+    def rebuild(self, pages: Iterable[Tuple[List[str], List[Dict[str, Any]]]]) -> None:
+        """
+        Reconstrói o catálogo do zero a partir de páginas (ids, metadatas) da coleção.
+        Usado uma única vez quando o catálogo não bate com a coleção (ex: índice pré-existente).
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM facet_chunks")
+            self._conn.execute("DELETE FROM facet_counts")
+            self._conn.commit()
+            self._counts = {}
+        n = 0
+        for ids, metas in pages:
+            self.record_upsert(ids, metas)
+            n += len(ids)
+        logger.info("facets.rebuilt", n_chunks=n)
@@ -0,0 +1,90 @@
+import fcntl
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from src.app.core.logging import get_logger
+from src.app.core.utils import ensure_dir
+
+logger = get_logger(__name__)
+
+
+class StoreState:
+    """
+    Estado do ChromaHnswStore compartilhado entre processos do mesmo host
+    (workers do uvicorn, scripts/ingest.py), em SQLite ao lado dos índices
+    auxiliares:
+
+    - `version`: contador de escritas na coleção. Muda a cada upsert/update/delete
+      de qualquer processo → invalida os caches de resultados de todos eles
+    - `foreign_writes()`: escritas feitas por outros processos desde que este subiu
+    - `rebuild_lock()`: lock de arquivo para reconstruir facetas/BM25 uma vez só
+    - `instance_id`: identidade deste DATA_DIR (quem é dono da coleção em modo http)
+    """
+
+    def __init__(self, path: Path):
+        ensure_dir(path.parent)
+        self._lock = threading.Lock()
+        self._lock_path = path.with_suffix(".lock")
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS store_state (
+                key   TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO store_state (key, value) VALUES ('version', 0);
+            CREATE TABLE IF NOT EXISTS store_instance (
+                id TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.execute(
+            "INSERT INTO store_instance (id) SELECT ? WHERE NOT EXISTS (SELECT 1 FROM store_instance)",
+            (uuid.uuid4().hex,),
+        )
+        self._conn.commit()
+        (self.instance_id,) = self._conn.execute("SELECT id FROM store_instance").fetchone()
+        self._local_writes = 0
+        self._baseline = self.version
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            (value,) = self._conn.execute("SELECT value FROM store_state WHERE key = 'version'").fetchone()
+        return value
+
+    def bump(self) -> int:
+        with self._lock:
+            (value,) = self._conn.execute(
+                "UPDATE store_state SET value = value + 1 WHERE key = 'version' RETURNING value"
+            ).fetchone()
+            self._conn.commit()
+            self._local_writes += 1
+        return value
+
+    def foreign_writes(self) -> int:
+        """
+        Escritas de outros processos desde a criação deste objeto
+        (incrementos atômicos: total - baseline - escritas locais).
+        """
+        version = self.version
+        with self._lock:
+            return version - self._baseline - self._local_writes
+
+    @contextmanager
+    def rebuild_lock(self) -> Iterator[None]:
+        """
+        Exclusão mútua entre processos (flock): quem chega depois espera e
+        encontra os índices já reconstruídos.
+        """
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -1,6 +1,8 @@
 import streamlit as st
 import requests
+import json
 import os
+import time
 from pathlib import Path
 
 # Configuração da página
@@ -39,6 +41,77 @@ with st.sidebar:
         help="URL base para conexão com a API"
     )
     st.info(f"API conectada em: {api_url_input}")
+    stream_answers = st.checkbox(
+        "Streaming das respostas",
+        value=True,
+        help="Mostra o progresso e a resposta conforme é gerada (/ask/stream)"
+    )
+
+
+def iter_sse(response):
+    """
+    Lê um stream de server-sent events e devolve (evento, dados).
+    """
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if event is not None:
+                yield event, json.loads("\n".join(data)) if data else {}
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def ask_streaming(api_url: str, question: str):
+    """
+    Consome o /ask/stream renderizando progresso e resposta incrementalmente.
+    Retorna o resultado final (evento done).
+    """
+    status = st.status("Buscando resposta...", expanded=False)
+    st.subheader("Resposta")
+    answer_box = st.empty()
+    answer = ""
+    result = None
+
+    with requests.post(
+        f"{api_url}/ask/stream",
+        json={"question": question},
+        stream=True,
+        timeout=(10, 120)
+    ) as response:
+        if response.status_code != 200:
+            status.update(label="Erro na API", state="error")
+            st.error(f"❌ Erro na API: {response.text}")
+            return None
+
+        for event, data in iter_sse(response):
+            if event == "risk":
+                status.write("🛡️ Checagem de segurança ok" if data["passed"] else "⛔ Pergunta bloqueada")
+            elif event == "plan":
+                status.write(f"🧭 Intent: {data['intent']} | filtros: {data['metadata_filters']}")
+            elif event == "retrieval":
+                status.write(f"📚 {data['n_chunks']} chunk(s) recuperado(s)")
+                status.update(label="Gerando resposta...")
+            elif event == "token":
+                answer += data["text"]
+                answer_box.markdown(f"> {answer}▌")
+            elif event == "done":
+                result = data
+            elif event == "error":
+                status.update(label="Erro no pipeline", state="error")
+                st.error(f"❌ Erro na API: {data['detail']}")
+                return None
+
+    if result is None:
+        status.update(label="Resposta incompleta", state="error")
+        return None
+    answer_box.markdown(f"> {result['answer']}")
+    status.update(label="✅ Resposta encontrada!", state="complete")
+    return result
 
 # Tabs principais
 tab1, tab2 = st.tabs(["📤 Ingestão de PDFs", "🔍 Perguntas & Respostas"])
@@ -63,79 +136,82 @@ with tab1:
             if len(uploaded_files) == 1:
                 # Endpoint de PDF único
                 st.info("📄 Usando endpoint de upload único...")
-                
                 pdf_file = uploaded_files[0]
-                
-                try:
-                    with st.spinner(f"Processando {pdf_file.name}..."):
-                        files = {"file": (pdf_file.name, pdf_file, "application/pdf")}
-                        response = requests.post(
-                            f"{api_url_input}/ingest/pdf",
-                            files=files,
-                            timeout=300
-                        )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        st.success(f"✅ {result['message']}")
-                        
-                        with st.expander("📊 Detalhes"):
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.metric("Doc ID", result.get('doc_id', 'N/A'))
-                            with col2:
-                                st.metric("Chunks", result.get('n_chunks', 'N/A'))
-                    else:
-                        st.error(f"❌ Erro: {response.text}")
-                
-                except Exception as e:
-                    st.error(f"❌ Erro na conexão: {str(e)}")
-            
+                endpoint = "pdf"
+                files = {"file": (pdf_file.name, pdf_file, "application/pdf")}
             else:
                 # Endpoint de batch
                 st.info(f"📦 Usando endpoint de batch para {len(uploaded_files)} arquivos...")
-                
-                try:
-                    with st.spinner(f"Processando {len(uploaded_files)} arquivos..."):
-                        files = [
-                            ("files", (f.name, f, "application/pdf"))
-                            for f in uploaded_files
-                        ]
-                        response = requests.post(
-                            f"{api_url_input}/ingest/batch",
-                            files=files,
-                            timeout=600
+                endpoint = "batch"
+                files = [
+                    ("files", (f.name, f, "application/pdf"))
+                    for f in uploaded_files
+                ]
+
+            try:
+                response = requests.post(
+                    f"{api_url_input}/ingest/{endpoint}",
+                    files=files,
+                    timeout=300
+                )
+
+                if response.status_code in (200, 202):
+                    job = response.json()
+                    st.info(f"🧾 Job {job['job_id']} enfileirado")
+
+                    # Acompanha o job até terminar
+                    progress = st.progress(0.0, text="Processando...")
+                    while job["status"] in ("queued", "running"):
+                        time.sleep(2)
+                        job = requests.get(
+                            f"{api_url_input}/ingest/jobs/{job['job_id']}",
+                            timeout=30
+                        ).json()
+                        done = job["successful"] + job["failed"]
+                        stages = ", ".join(
+                            f"{f['filename']}: {f['stage']}"
+                            for f in job["files"] if f["status"] == "running"
                         )
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        
-                        st.success(f"✅ Lote processado!")
-                        
-                        # Resumo
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("Total", result['total'])
-                        with col2:
-                            st.metric("Sucesso", result['successful'], 
-                                     delta=None, delta_color="off")
-                        with col3:
-                            st.metric("Falhas", result['failed'], 
-                                     delta=None, delta_color="off")
-                        
-                        # Detalhes de cada arquivo
-                        st.subheader("Detalhes por Arquivo")
-                        for idx, item in enumerate(result['results'], 1):
-                            status_icon = "✅" if item['success'] else "❌"
-                            with st.expander(f"{status_icon} {uploaded_files[idx-1].name}"):
-                                st.write(item['message'])
-                                if item['error']:
-                                    st.error(f"**Erro:** {item['error']}")
+                        progress.progress(done / max(job["total"], 1), text=stages or "Processando...")
+                    progress.empty()
+
+                    if job["failed"] == 0:
+                        st.success("✅ Ingestão concluída!")
                     else:
-                        st.error(f"❌ Erro na requisição: {response.text}")
-                
-                except Exception as e:
-                    st.error(f"❌ Erro na conexão: {str(e)}")
+                        st.warning("⚠️ Ingestão concluída com falhas")
+
+                    # Resumo
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.metric("Total", job['total'])
+                    with col2:
+                        st.metric("Sucesso", job['successful'], 
+                                 delta=None, delta_color="off")
+                    with col3:
+                        st.metric("Falhas", job['failed'], 
+                                 delta=None, delta_color="off")
+
+                    # Detalhes de cada arquivo
+                    st.subheader("Detalhes por Arquivo")
+                    for item in job['files']:
+                        status_icon = "✅" if item['status'] == "done" else "❌"
+                        with st.expander(f"{status_icon} {item['filename']}"):
+                            if item['skipped']:
+                                st.write("Documento já ingerido e sem alterações")
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                st.metric("Doc ID", item.get('doc_id') or 'N/A')
+                            with col2:
+                                st.metric("Chunks", item.get('n_chunks') or 'N/A')
+                            if item['timings']:
+                                st.write({k: f"{v:.2f}s" for k, v in item['timings'].items()})
+                            if item['error']:
+                                st.error(f"**Erro ({item['stage']}):** {item['error']}")
+                else:
+                    st.error(f"❌ Erro na requisição: {response.text}")
+
+            except Exception as e:
+                st.error(f"❌ Erro na conexão: {str(e)}")
 
 # TAB 2: Q&A
 with tab2:
@@ -154,22 +230,31 @@ with tab2:
             st.warning("⚠️ Digite uma pergunta!")
         else:
             try:
-                with st.spinner("Buscando resposta..."):
-                    response = requests.post(
-                        f"{api_url_input}/ask/",
-                        json={"question": question},
-                        timeout=60
-                    )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    
-                    st.success("✅ Resposta encontrada!")
-                    
-                    # Resposta principal
-                    st.subheader("Resposta")
-                    st.markdown(f"> {result['answer']}")
-                    
+                if stream_answers:
+                    result = ask_streaming(api_url_input, question)
+                    if result is not None:
+                        result["metadata_used"] = result.pop("metadata", None)
+                else:
+                    with st.spinner("Buscando resposta..."):
+                        response = requests.post(
+                            f"{api_url_input}/ask/",
+                            json={"question": question},
+                            timeout=60
+                        )
+
+                    if response.status_code == 200:
+                        result = response.json()
+
+                        st.success("✅ Resposta encontrada!")
+
+                        # Resposta principal
+                        st.subheader("Resposta")
+                        st.markdown(f"> {result['answer']}")
+                    else:
+                        result = None
+                        st.error(f"❌ Erro na API: {response.text}")
+
+                if result is not None:
                     # Detalhes adicionais
                     col1, col2 = st.columns(2)
                     with col1:
@@ -189,9 +274,6 @@ with tab2:
                     })
                     
                     st.divider()
-                    
-                else:
-                    st.error(f"❌ Erro na API: {response.text}")
             
             except Exception as e:
                 st.error(f"❌ Erro na conexão: {str(e)}")
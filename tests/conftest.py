@@ -0,0 +1,43 @@
+import hashlib
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+# settings é lido no import: os testes nunca tocam o data/ do repositório
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="rag-tests-"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from src.app.storage.embeddings import EmbeddingsProvider  # noqa: E402
+
+
+class FakeEmbeddings(EmbeddingsProvider):
+    """
+    Bag-of-words com hashing: determinístico e sem modelo. Textos com palavras
+    em comum ficam próximos (cosseno), o suficiente para protótipos e MMR.
+    """
+    provider_name = "fake"
+    model_name = "hashing-bow"
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def embed_array(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                out[i, int(hashlib.sha1(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1.0, norms)
+
+
+@pytest.fixture
+def fake_embeddings():
+    return FakeEmbeddings()
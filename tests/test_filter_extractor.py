@@ -0,0 +1,63 @@
+from src.app.agents.filter_extractor import EMPTY_CONFIDENCE, LocalFilterExtractor
+
+
+class _Facets:
+    def __init__(self, values):
+        self._values = values
+
+    def values(self, field):
+        return self._values.get(field, [])
+
+
+class _Store:
+    def __init__(self, values):
+        self.facets = _Facets(values)
+
+
+def _active(filters):
+    return {k: v for k, v in filters.metadata_filters.items() if v}
+
+
+def test_company_and_quarter():
+    result = LocalFilterExtractor().extract("Qual foi a receita da Apple no Q3 2024?")
+    assert _active(result) == {"company": "Apple", "quarter": "Q3", "doc_date": "Q32024"}
+    assert result.overall == 0.95
+    assert result.intent == "retrieval"
+
+
+def test_ticker_doc_type_and_month():
+    result = LocalFilterExtractor().extract("What did AAPL report in the 10-K for December 2024?")
+    assert _active(result) == {"company": "Apple", "doc_type": "10-K Filing", "doc_date": "December 2024"}
+
+
+def test_ambiguous_companies_and_year_range():
+    result = LocalFilterExtractor().extract("Compare Apple e Tesla entre 2022 e 2024")
+    assert result.confidence["company"] == 0.4
+    assert result.metadata_filters["date_from"] == "2022"
+    assert result.metadata_filters["date_to"] == "2024"
+    assert result.overall == 0.4
+    assert result.intent == "mixed"
+
+
+def test_no_hints():
+    result = LocalFilterExtractor().extract("what is the weather like")
+    assert _active(result) == {}
+    assert result.overall == EMPTY_CONFIDENCE
+
+
+def test_short_aliases_are_case_sensitive():
+    # "fed" minúsculo não é o Federal Reserve; "Fed" é
+    assert not LocalFilterExtractor().extract("the fed minutes").metadata_filters["company"]
+    assert LocalFilterExtractor().extract("What did the Fed say?").metadata_filters["company"] == "Federal Reserve"
+
+
+def test_facet_values_from_store():
+    extractor = LocalFilterExtractor(_Store({"company": ["Petrobras"]}))
+    assert extractor.extract("lucro da petrobras em 2024").metadata_filters["company"] == "Petrobras"
+
+
+def test_signature():
+    extractor = LocalFilterExtractor()
+    assert extractor.signature("Apple 2023") != extractor.signature("Apple 2024")
+    assert extractor.signature("Apple 2024") != extractor.signature("Microsoft 2024")
+    assert extractor.signature("receita da Apple 2024") == extractor.signature("Qual a receita da Apple em 2024?")
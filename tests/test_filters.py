@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+
+from src.app.core.dates import UNDATED_EPOCH, date_fields, date_period
+from src.app.core.utils import matches_where, sanitize_filters
+
+
+def epoch(year: int, month: int = 1, day: int = 1) -> int:
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+
+
+# ---------------------------
+#   date_period / date_fields
+# ---------------------------
+
+def test_date_period_formats():
+    assert date_period("2024-12-11") == (epoch(2024, 12, 11), epoch(2024, 12, 12))
+    assert date_period("December 2024") == (epoch(2024, 12), epoch(2025, 1))
+    assert date_period("Q3 2024") == date_period("Q32024") == date_period("2024Q3") == (epoch(2024, 7), epoch(2024, 10))
+    assert date_period("Q4 2024") == (epoch(2024, 10), epoch(2025, 1))
+    assert date_period("2024") == (epoch(2024), epoch(2025))
+
+
+def test_date_period_unknown():
+    assert date_period(None) is None
+    assert date_period("") is None
+    assert date_period("ontem") is None
+    assert date_period("2024-02-30") is None
+
+
+def test_date_fields():
+    assert date_fields("Q3 2024") == {"doc_year": 2024, "doc_epoch": epoch(2024, 7), "doc_quarter": 3}
+    assert date_fields("December 2024") == {"doc_year": 2024, "doc_epoch": epoch(2024, 12), "doc_quarter": 4}
+    # um ano inteiro não pertence a um trimestre
+    assert date_fields("2024") == {"doc_year": 2024, "doc_epoch": epoch(2024)}
+    assert date_fields("sem data") == {"doc_epoch": UNDATED_EPOCH}
+
+
+# ---------------------------
+#   sanitize_filters
+# ---------------------------
+
+def test_sanitize_equality_and_quarter():
+    where = sanitize_filters({"company": "Apple", "doc_type": "10-q", "quarter": "Q3", "doc_date": "2024"})
+    assert where == {
+        "$and": [
+            {"company": {"$eq": "Apple"}},
+            {"doc_type": {"$eq": "10-Q Filing"}},
+            {"$or": [
+                {"$and": [{"doc_epoch": {"$gte": epoch(2024, 7)}}, {"doc_epoch": {"$lt": epoch(2024, 10)}}]},
+                {"doc_epoch": {"$eq": UNDATED_EPOCH}},
+            ]},
+        ]
+    }
+
+
+def test_sanitize_lists_and_unknown_values():
+    where = sanitize_filters({"company": ["Apple", "Tesla", "", "Apple"], "doc_type": "nope", "section_path": ["Receita"]})
+    assert where == {"company": {"$in": ["Apple", "Tesla"]}}
+
+
+def test_sanitize_date_range():
+    where = sanitize_filters({"date_from": "2022", "date_to": "2024"})
+    assert where == {"$or": [
+        {"$and": [{"doc_epoch": {"$gte": epoch(2022)}}, {"doc_epoch": {"$lt": epoch(2025)}}]},
+        {"doc_epoch": {"$eq": UNDATED_EPOCH}},
+    ]}
+
+
+def test_sanitize_or_branches():
+    where = sanitize_filters({"$or": [{"company": "Apple"}, {"company": "Tesla"}]})
+    assert where == {"$or": [{"company": {"$eq": "Apple"}}, {"company": {"$eq": "Tesla"}}]}
+    # um ramo vazio casaria com tudo → o $or é descartado
+    assert sanitize_filters({"$or": [{"company": "Apple"}, {"company": None}]}) == {}
+
+
+def test_sanitize_empty():
+    assert sanitize_filters({}) == {}
+    assert sanitize_filters({"company": "null", "doc_date": "", "quarter": None}) == {}
+
+
+# ---------------------------
+#   matches_where
+# ---------------------------
+
+def test_matches_where_operators():
+    meta = {"company": "Apple", "doc_type": "10-Q Filing", "doc_epoch": epoch(2024, 7)}
+    assert matches_where({"company": {"$eq": "Apple"}}, meta)
+    assert not matches_where({"company": {"$eq": "Tesla"}}, meta)
+    assert matches_where({"company": {"$in": ["Apple", "Tesla"]}}, meta)
+    assert not matches_where({"company": {"$nin": ["Apple"]}}, meta)
+    assert matches_where({"doc_epoch": {"$gte": epoch(2024), "$lt": epoch(2025)}}, meta)
+    assert not matches_where({"doc_epoch": {"$gt": epoch(2024, 7)}}, meta)
+
+
+def test_matches_where_sanitized_filters():
+    where = sanitize_filters({"company": "Apple", "doc_date": "Q3 2024"})
+    assert matches_where(where, {"company": "Apple", "doc_epoch": epoch(2024, 8, 1)})
+    assert matches_where(where, {"company": "Apple", "doc_epoch": UNDATED_EPOCH})
+    assert not matches_where(where, {"company": "Apple", "doc_epoch": epoch(2023, 8, 1)})
+    assert not matches_where(where, {"company": "Tesla", "doc_epoch": epoch(2024, 8, 1)})
+
+
+def test_matches_where_missing_field_matches():
+    # conservador: campo ausente na metadata não exclui
+    assert matches_where({"company": {"$eq": "Apple"}}, {"doc_type": "10-K Filing"})
+    assert matches_where({}, {"company": "Apple"})
@@ -0,0 +1,80 @@
+import threading
+
+from src.app.ingestion.jobs import DONE, FAILED, QUEUED, RUNNING, JobStore
+
+
+def _files(*sources):
+    return [{"filename": f"{i}.pdf", "path": f"/tmp/{i}.pdf", "source": s} for i, s in enumerate(sources)]
+
+
+def test_claim_is_fifo_and_marks_running(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    job_id = store.create(_files("a", "b"))
+
+    first = store.claim_next()
+    assert (first["job_id"], first["idx"], first["source"]) == (job_id, 0, "a")
+    file = store.get(job_id).files[0]
+    assert file.status == RUNNING
+    assert store.pending() == 2
+
+
+def test_same_source_is_never_claimed_twice(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    job_id = store.create(_files("a", "a", "b"))
+
+    assert store.claim_next()["idx"] == 0
+    # o 2º arquivo de "a" espera o 1º terminar; "b" passa na frente
+    assert store.claim_next()["idx"] == 2
+    assert store.claim_next() is None
+
+    store.update(job_id, 0, status=DONE)
+    assert store.claim_next()["idx"] == 1
+
+
+def test_concurrent_claims_across_stores(tmp_path):
+    # duas JobStore no mesmo arquivo simulam dois workers do uvicorn
+    path = tmp_path / "jobs.sqlite3"
+    stores = [JobStore(path), JobStore(path)]
+    stores[0].create(_files(*[f"doc-{i}" for i in range(40)]))
+
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(store):
+        while True:
+            item = store.claim_next()
+            if item is None:
+                return
+            with lock:
+                claimed.append((item["job_id"], item["idx"]))
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in stores for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(claimed) == 40
+    assert len(set(claimed)) == 40
+
+
+def test_requeue_abandoned_only_touches_dead_owners(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    alive, dead = JobStore(path), JobStore(path)
+    job_id = alive.create(_files("a", "b"))
+    alive.claim_next()
+    dead.claim_next()
+    # dono no mesmo host com um pid que não existe mais
+    dead_owner = dead.owner.rsplit(":", 2)[0] + ":999999999:deadbeef"
+    dead.update(job_id, 1, owner=dead_owner)
+
+    assert alive.requeue_abandoned(lease_s=60) == 1
+    statuses = [f.status for f in alive.get(job_id).files]
+    assert statuses == [RUNNING, QUEUED]
+
+
+def test_rejected_entry_is_never_claimed(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    job_id = store.create([{"filename": "x.txt", "error": "Invalid file type"}])
+    assert store.get(job_id).files[0].status == FAILED
+    assert store.claim_next() is None
@@ -0,0 +1,144 @@
+import os
+import shutil
+
+import pytest
+
+from src.app.ingestion.chunking import AdaptiveMarkdownChunker
+from src.app.ingestion.manifest import DocumentManifest
+from src.app.ingestion.metadata import MetadataExtractor
+from src.app.ingestion.pipeline import IngestionPipeline
+
+
+def _markdown(**sections):
+    body = "".join(f"## {title}\n\n{(text + ' ') * 20}\n\n" for title, text in sections.items())
+    return f"# Apple 10-Q\n\n{body}"
+
+
+MD = _markdown(
+    Receita="A receita de serviços cresceu no trimestre.",
+    Riscos="Riscos de câmbio afetam a margem operacional.",
+    Caixa="O caixa livre subiu no período.",
+)
+
+
+class FakeStore:
+    """
+    Só o que o pipeline usa do ChromaHnswStore: chunk_id → doc_id.
+    """
+    def __init__(self):
+        self.chunks = {}
+
+    def ids_for_doc(self, doc_id):
+        return [cid for cid, owner in self.chunks.items() if owner == doc_id]
+
+    def upsert_stream(self, pairs):
+        for chunk, _ in pairs:
+            self.chunks[chunk.chunk_id] = chunk.doc_id
+
+    def update_metadata(self, chunks):
+        pass
+
+    def delete(self, ids):
+        for cid in ids:
+            self.chunks.pop(cid, None)
+
+
+@pytest.fixture
+def pipeline(tmp_path, fake_embeddings):
+    # mesmos atributos do __init__, sem Docling, Chroma nem registry
+    p = IngestionPipeline.__new__(IngestionPipeline)
+    p.meta_extractor = MetadataExtractor()
+    p.chunker = AdaptiveMarkdownChunker()
+    p.emb = fake_embeddings
+    p.store = FakeStore()
+    p.manifest = DocumentManifest(tmp_path / "manifest.sqlite3")
+    return p
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "raw" / "AAPL_10-Q_Q3_2024.pdf"
+    path.parent.mkdir()
+    path.write_bytes(b"%PDF-1.7 conteudo")
+    return path
+
+
+def _ingest(pipeline, pdf, md_text, **kwargs):
+    check = pipeline.check(pdf, **kwargs)
+    if check.skipped:
+        return check.skipped
+    return pipeline.apply(pipeline.plan(check, md_text))
+
+
+def test_first_ingestion_records_the_document(pipeline, pdf):
+    result = _ingest(pipeline, pdf, MD)
+    assert not result.skipped
+    assert result.n_added == result.n_chunks == 3
+
+    entry = pipeline.manifest.get(pdf.name)
+    assert entry.doc_id == result.doc_id
+    assert sorted(entry.chunk_ids) == sorted(pipeline.store.chunks)
+
+
+def test_unchanged_file_is_skipped_by_fingerprint(pipeline, pdf, monkeypatch):
+    _ingest(pipeline, pdf, MD)
+    # o atalho do fingerprint não relê o arquivo
+    monkeypatch.setattr("src.app.ingestion.pipeline.file_sha256", pytest.fail)
+    assert pipeline.check(pdf).skipped is not None
+
+
+def test_same_content_new_mtime_is_skipped_and_touched(pipeline, pdf):
+    _ingest(pipeline, pdf, MD)
+    before = pipeline.manifest.get(pdf.name).fingerprint
+    stat = pdf.stat()
+    os.utime(pdf, (stat.st_atime, stat.st_mtime + 60))
+
+    assert pipeline.check(pdf).skipped is not None
+    assert pipeline.manifest.get(pdf.name).fingerprint != before
+
+
+def test_copy_under_another_name_is_an_alias(pipeline, pdf, monkeypatch):
+    original = _ingest(pipeline, pdf, MD)
+    copy = pdf.with_name("copia.pdf")
+    shutil.copy(pdf, copy)
+
+    skipped = pipeline.check(copy).skipped
+    assert skipped.doc_id == original.doc_id
+    assert pipeline.manifest.get(copy.name) is None
+    assert pipeline.manifest.get_alias(copy.name).content_hash == original.content_id
+
+    # varredura seguinte: pula pelo fingerprint do alias, sem re-hash
+    monkeypatch.setattr("src.app.ingestion.pipeline.file_sha256", pytest.fail)
+    assert pipeline.check(copy).skipped.doc_id == original.doc_id
+
+
+def test_changed_document_only_diffs_chunks(pipeline, pdf):
+    first = _ingest(pipeline, pdf, MD)
+    old_ids = set(pipeline.manifest.get(pdf.name).chunk_ids)
+
+    pdf.write_bytes(b"%PDF-1.7 conteudo novo")
+    changed = _markdown(
+        Receita="A receita de serviços cresceu no trimestre.",
+        Riscos="Riscos de juros afetam a margem operacional.",
+        Caixa="O caixa livre subiu no período.",
+    )
+    check = pipeline.check(pdf)
+    assert check.skipped is None
+    plan = pipeline.plan(check, changed)
+
+    # documento conhecido mantém o doc_id; só a seção alterada é reembedada
+    assert plan.meta.doc_id == first.doc_id
+    assert len(plan.added) == 1
+    assert len(plan.orphans) == 1 and plan.orphans[0] in old_ids
+    assert plan.added[0].chunk_id not in old_ids
+
+    result = pipeline.apply(plan)
+    assert (result.n_added, result.n_deleted) == (1, 1)
+    assert set(pipeline.store.chunks) == set(pipeline.manifest.get(pdf.name).chunk_ids)
+
+
+def test_force_reprocesses_unchanged_file(pipeline, pdf):
+    _ingest(pipeline, pdf, MD)
+    check = pipeline.check(pdf, force=True)
+    assert check.skipped is None
+    assert pipeline.plan(check, MD).added == []
@@ -0,0 +1,54 @@
+"""
+Paridade do export ONNX (scripts/export_onnx.py) com o modelo de referência
+(sentence-transformers): mesmos textos e mesmo cosseno mínimo do `--check`.
+Pulado sem o export em ONNX_MODEL_DIR ou sem sentence-transformers.
+"""
+import importlib.util
+
+import numpy as np
+import pytest
+
+from conftest import REPO_ROOT
+from src.app.config.settings import settings
+from src.app.storage.embeddings import ONNX_MODEL_FILE, ONNX_QUANTIZED_FILE, OnnxEmbeddings
+
+if not (settings.onnx_model_dir / ONNX_MODEL_FILE).exists():
+    pytest.skip(f"export ONNX ausente em {settings.onnx_model_dir}", allow_module_level=True)
+
+SentenceTransformer = pytest.importorskip("sentence_transformers").SentenceTransformer
+
+
+def _load_export_script():
+    spec = importlib.util.spec_from_file_location("export_onnx", REPO_ROOT / "scripts" / "export_onnx.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+export_onnx = _load_export_script()
+
+
+@pytest.fixture(scope="module")
+def reference():
+    st = SentenceTransformer(settings.local_embedding_model, device="cpu")
+    vectors = st.encode(export_onnx.PARITY_TEXTS, convert_to_numpy=True, normalize_embeddings=True)
+    return st.max_seq_length, vectors.astype(np.float32)
+
+
+@pytest.mark.parametrize("quantized", [False, True], ids=["fp32", "int8"])
+def test_onnx_matches_reference(reference, quantized):
+    if quantized and not (settings.onnx_model_dir / ONNX_QUANTIZED_FILE).exists():
+        pytest.skip("export sem o modelo int8")
+    max_length, expected = reference
+
+    provider = OnnxEmbeddings(
+        settings.onnx_model_dir,
+        settings.local_embedding_model,
+        quantized=quantized,
+        max_length=max_length,
+    )
+    vectors = provider.embed_array(export_onnx.PARITY_TEXTS)
+
+    assert vectors.shape == expected.shape
+    cosines = (vectors * expected).sum(axis=1)
+    assert cosines.min() >= export_onnx.MIN_PARITY_COSINE, cosines
@@ -0,0 +1,97 @@
+import pytest
+
+from src.app.retrieval.context_packer import SEPARATOR, ContextPacker
+from src.app.retrieval.retriever import rrf_fuse
+
+
+class WordEncoding:
+    """
+    Tokenizer de palavras no lugar do tiktoken (sem download do encoding).
+    """
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+def _item(id, text, vector=None, doc_id="d1", section="Receita", order=0):
+    return {
+        "id": id,
+        "text": text,
+        "vector": vector,
+        "metadata": {"doc_id": doc_id, "section_path": section, "order": order},
+    }
+
+
+# ---------------------------
+#   RRF
+# ---------------------------
+
+def test_rrf_fuse_orders_by_summed_reciprocal_rank():
+    vector = [{"id": "a", "src": "vector"}, {"id": "b", "src": "vector"}, {"id": "c", "src": "vector"}]
+    lexical = [{"id": "b", "src": "lexical"}, {"id": "d", "src": "lexical"}]
+    fused = rrf_fuse([vector, lexical], k=60)
+
+    assert [r["id"] for r in fused] == ["b", "a", "d", "c"]
+    assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+    # o primeiro resultado visto para cada id é o mantido
+    assert fused[0]["src"] == "vector"
+    assert fused[2]["src"] == "lexical"
+
+
+def test_rrf_fuse_empty():
+    assert rrf_fuse([[], []]) == []
+
+
+# ---------------------------
+#   ContextPacker
+# ---------------------------
+
+def test_mmr_skips_near_duplicates(fake_embeddings):
+    texts = [
+        "receita de serviços cresceu no trimestre",
+        "receita de serviços cresceu no trimestre fiscal",
+        "margem bruta caiu com custos maiores",
+    ]
+    vectors = fake_embeddings.embed_array(texts)
+    items = [_item(str(i), t, v, order=10 * i) for i, (t, v) in enumerate(zip(texts, vectors))]
+
+    selected = ContextPacker(WordEncoding(), token_budget=1000, mmr_lambda=0.5).select(items, max_chunks=2)
+    assert [s["id"] for s in selected] == ["0", "2"]
+
+
+def test_without_vectors_keeps_ranking():
+    items = [_item(str(i), f"chunk {i}") for i in range(4)]
+    selected = ContextPacker(WordEncoding(), token_budget=1000).select(items, max_chunks=3)
+    assert [s["id"] for s in selected] == ["0", "1", "2"]
+
+
+def test_token_budget():
+    items = [_item("a", "um dois três"), _item("b", "quatro cinco seis sete"), _item("c", "oito")]
+    selected = ContextPacker(WordEncoding(), token_budget=4).select(items, max_chunks=5)
+    # "b" estoura o orçamento e é pulado; "c" ainda cabe
+    assert [s["id"] for s in selected] == ["a", "c"]
+
+
+def test_oversized_best_chunk_is_truncated():
+    items = [_item("a", "um dois três quatro cinco"), _item("b", "seis")]
+    selected = ContextPacker(WordEncoding(), token_budget=3).select(items, max_chunks=5)
+    assert [(s["id"], s["text"]) for s in selected] == [("a", "um dois três")]
+
+
+def test_collapse_joins_consecutive_chunks():
+    items = [
+        _item("x", "segundo", order=2),
+        _item("y", "outro documento", doc_id="d2", order=0),
+        _item("z", "primeiro", order=1),
+        _item("w", "distante", order=7),
+    ]
+    # blocos na ordem do melhor chunk de cada um; 1 e 2 viram um bloco só
+    assert ContextPacker.collapse(items) == ["primeiro\nsegundo", "outro documento", "distante"]
+
+
+def test_pack_renders_collapsed_blocks():
+    items = [_item("a", "primeiro", order=0), _item("b", "segundo", order=1), _item("c", "fim", section="Riscos")]
+    packed = ContextPacker(WordEncoding(), token_budget=100).pack(items, max_chunks=5)
+    assert packed == SEPARATOR.join(["primeiro\nsegundo", "fim"])